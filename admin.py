@@ -0,0 +1,311 @@
+from flask import Blueprint, Response, current_app, request, jsonify, session, stream_with_context
+from sqlalchemy import Boolean, DateTime, Integer, Numeric, select
+from models import (User, Issue, Order, OrderItem, Feedback, LostFoundItem, Ride, RideBooking, OrderArchive,
+                    OrderItemArchive, FeedbackArchive, db)
+from ride_index import ride_index
+from archive import archivable_orders, move_orders
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import csv
+import io
+import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+admin_bp = Blueprint('admin', __name__)
+
+# table -> (model, date column, status column) used by the from/to/status filters;
+# order items are filtered by the date and status of their order
+EXPORT_TABLES = {
+    'users': (User, User.created_at, None),
+    'issues': (Issue, Issue.created_at, Issue.status),
+    'orders': (Order, Order.created_at, Order.status),
+    'order_items': (OrderItem, Order.created_at, Order.status),
+    'feedback': (Feedback, Feedback.created_at, None),
+    'lost_found_items': (LostFoundItem, LostFoundItem.created_at, LostFoundItem.status),
+    'rides': (Ride, Ride.departure_time, Ride.status),
+    'ride_bookings': (RideBooking, RideBooking.booked_at, RideBooking.status),
+    'orders_archive': (OrderArchive, OrderArchive.created_at, OrderArchive.status),
+    'order_items_archive': (OrderItemArchive, OrderArchive.created_at, OrderArchive.status),
+    'feedback_archive': (FeedbackArchive, FeedbackArchive.created_at, None),
+}
+
+EXCLUDED_COLUMNS = {'password_hash'}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def require_auth(f):
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+def parse_date(value, end=False):
+    """Parse a from/to filter; a bare date as the upper bound includes the whole day"""
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def export_statement(table, start=None, end=None, status=None):
+    model, date_column, status_column = EXPORT_TABLES[table]
+    columns = [column for column in model.__table__.columns if column.name not in EXCLUDED_COLUMNS]
+    stmt = select(*columns)
+    if date_column.table is not model.__table__:
+        stmt = stmt.join_from(model, date_column.class_)
+
+    if start:
+        stmt = stmt.where(date_column >= start)
+    if end:
+        stmt = stmt.where(date_column < end)
+    if status:
+        stmt = stmt.where(status_column == status)
+
+    # Ordered by the indexed date column so the rows come off the index in order
+    return columns, stmt.order_by(date_column, model.id)
+
+def stream_batches(engine, stmt, batch_size):
+    """Yield lists of rows from a server-side cursor, so only one batch is held at a time"""
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        for rows in result.partitions():
+            yield rows
+
+def json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def generate_csv(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns])
+    yield buffer.getvalue()
+
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+def generate_ndjson(columns, batches):
+    names = [column.name for column in columns]
+    for rows in batches:
+        yield ''.join(json.dumps(dict(zip(names, row)), default=json_value) + '\n' for row in rows)
+
+def arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(column.type, Numeric):
+        return pa.decimal128(column.type.precision or 10, column.type.scale or 2)
+    return pa.string()
+
+class ParquetSink:
+    """Write-only file object that hands back what the Parquet writer has produced so far"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def generate_parquet(columns, batches):
+    """One row group per batch, sent as soon as it is encoded"""
+    schema = pa.schema([(column.name, arrow_type(column)) for column in columns])
+    names = schema.names
+    sink = ParquetSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for rows in batches:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, names=names))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+GENERATORS = {
+    'csv': generate_csv,
+    'ndjson': generate_ndjson,
+    'parquet': generate_parquet,
+}
+
+@admin_bp.route('/export/<table>', methods=['GET'])
+@require_auth
+def export_table(table):
+    try:
+        # Check if user is admin
+        user = User.query.get(session['user_id'])
+        if not user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+
+        if table not in EXPORT_TABLES:
+            return jsonify({'error': f'Unknown table. Available: {", ".join(EXPORT_TABLES)}'}), 404
+
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': 'Format must be csv, ndjson or parquet'}), 400
+        if export_format == 'parquet' and pa is None:
+            return jsonify({'error': 'Parquet export requires pyarrow to be installed'}), 501
+
+        try:
+            start = parse_date(request.args['from']) if request.args.get('from') else None
+            end = parse_date(request.args['to'], end=True) if request.args.get('to') else None
+        except ValueError:
+            return jsonify({'error': 'Dates must be YYYY-MM-DD or ISO 8601'}), 400
+
+        status = request.args.get('status')
+        if status and EXPORT_TABLES[table][2] is None:
+            return jsonify({'error': f'{table} cannot be filtered by status'}), 400
+
+        columns, stmt = export_statement(table, start, end, status)
+        # The routing session picks the replica for this endpoint when one is configured
+        engine = db.session.get_bind()
+        batches = stream_batches(engine, stmt, current_app.config['EXPORT_BATCH_SIZE'])
+
+        filename = f"{table}-{datetime.utcnow():%Y%m%d-%H%M%S}.{export_format}"
+        return Response(
+            stream_with_context(GENERATORS[export_format](columns, batches)),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to export data'}), 500
+
+
+# --- Bulk operations ----------------------------------------------------------
+# Set-based statements that return row counts; no rows are loaded.
+# Send {"dry_run": true} to get the counts without applying the change.
+
+def cutoff(data, default_days):
+    """Datetime before which rows are old enough, from an ``older_than_days`` body field"""
+    days = data.get('older_than_days', default_days)
+    if not isinstance(days, int) or isinstance(days, bool) or days < 1:
+        raise ValueError('older_than_days must be a positive integer')
+    return datetime.utcnow() - timedelta(days=days)
+
+def finish_bulk(data, message, counts):
+    dry_run = bool(data.get('dry_run'))
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    return jsonify(dict(counts, message=message, dry_run=dry_run)), 200
+
+@admin_bp.route('/users/<int:user_id>/cancel-rides', methods=['POST'])
+@require_auth
+def cancel_user_rides(user_id):
+    """Cancel every upcoming ride a user is driving, and the bookings on them"""
+    try:
+        # Check if user is admin
+        user = User.query.get(session['user_id'])
+        if not user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+
+        data = request.get_json(silent=True) or {}
+        if not User.query.get(user_id):
+            return jsonify({'error': 'User not found'}), 404
+
+        upcoming = (Ride.driver_id == user_id, Ride.status == 'Active', Ride.departure_time > datetime.utcnow())
+        bookings = RideBooking.query.filter(RideBooking.status.in_(RideBooking.OPEN_STATUSES),
+                                            RideBooking.ride_id.in_(select(Ride.id).where(*upcoming)))\
+                                    .update({'status': 'Cancelled', 'hold_expires_at': None}, synchronize_session=False)
+        rides = Ride.query.filter(*upcoming).update({'status': 'Cancelled'}, synchronize_session=False)
+        if rides and not data.get('dry_run'):
+            ride_index.invalidate()
+
+        return finish_bulk(data, f'Cancelled {rides} rides and {bookings} bookings',
+                           {'rides': rides, 'bookings': bookings})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to cancel rides'}), 500
+
+@admin_bp.route('/issues/close-resolved', methods=['POST'])
+@require_auth
+def close_resolved_issues():
+    """Close issues resolved more than ``older_than_days`` (default 30) days ago"""
+    try:
+        # Check if user is admin
+        user = User.query.get(session['user_id'])
+        if not user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+
+        data = request.get_json(silent=True) or {}
+        try:
+            before = cutoff(data, 30)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        issues = Issue.query.filter(Issue.status == 'Resolved', Issue.updated_at < before)\
+                            .update({'status': 'Closed'}, synchronize_session=False)
+
+        return finish_bulk(data, f'Closed {issues} issues', {'issues': issues})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to close issues'}), 500
+
+@admin_bp.route('/orders/archive', methods=['POST'])
+@require_auth
+def archive_orders():
+    """Move completed and cancelled orders older than ``older_than_days`` into the order archive"""
+    try:
+        # Check if user is admin
+        user = User.query.get(session['user_id'])
+        if not user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+
+        data = request.get_json(silent=True) or {}
+        try:
+            before = cutoff(data, current_app.config['ARCHIVE_AFTER_DAYS'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if data.get('dry_run'):
+            orders = Order.query.filter(*archivable_orders(before)).count()
+            return jsonify({'orders': orders, 'message': f'Would archive {orders} orders', 'dry_run': True}), 200
+
+        # Chunked like the nightly archive job, a transaction per chunk
+        moved = move_orders(before, current_app.config['ARCHIVE_CHUNK_SIZE'], current_app.config['ARCHIVE_MAX_CHUNKS'])
+
+        return jsonify(dict(moved, message=f"Archived {moved['orders']} orders", dry_run=False)), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to archive orders'}), 500
@@ -129,6 +129,20 @@ class ApiService {
         });
     }
     
+    // Uploads API: send the file as the raw request body so the server can stream it to disk
+    async uploadPhoto(file) {
+        return await this.makeRequest('/uploads/', {
+            method: 'POST',
+            headers: { 'Content-Type': file.type || 'application/octet-stream' },
+            body: file
+        });
+    }
+    
+    // Absolute URL for paths returned by the API, e.g. an issue's thumbnail_url
+    mediaURL(path) {
+        return path ? this.baseURL.replace(/\/api$/, '') + path : null;
+    }
+    
     // Feedback APIs
     async getFeedback() {
         return await this.makeRequest('/feedback');
@@ -161,6 +175,13 @@ class ApiService {
         });
     }
     
+    // Sales reports (admin): report is 'top-items', 'demand', 'revenue' or 'forecast';
+    // params e.g. { from: '2026-01-01', to: '2026-01-31', item: 'Coffee', interval: 'day' } or { day: '2026-02-01' }
+    async getSalesReport(report, params = {}) {
+        const query = new URLSearchParams(params).toString();
+        return await this.makeRequest(`/cafeteria/sales/${report}${query ? `?${query}` : ''}`);
+    }
+    
     // Lost & Found APIs
     async getLostFoundItems() {
         return await this.makeRequest('/lost-found');
@@ -197,14 +218,61 @@ class ApiService {
             method: 'POST'
         });
     }
-    
+
+    async joinRideWaitlist(rideId) {
+        return await this.makeRequest(`/transport/rides/${rideId}/waitlist`, {
+            method: 'POST'
+        });
+    }
+
+    async confirmRideHold(bookingId) {
+        return await this.makeRequest(`/transport/bookings/${bookingId}/confirm`, {
+            method: 'PUT'
+        });
+    }
+
+    // Seat holds pushed by the server instead of polling the ride list.
+    // handlers: { hold_offered(data), hold_expired(data) }; returns the EventSource (call .close() to stop)
+    subscribeRideEvents(handlers) {
+        const source = new EventSource(`${this.baseURL}/transport/events`, { withCredentials: true });
+        Object.entries(handlers).forEach(([event, handler]) => {
+            source.addEventListener(event, message => handler(JSON.parse(message.data)));
+        });
+        return source;
+    }
+
     // Dashboard APIs
     async getDashboardStats() {
         return await this.makeRequest('/dashboard/stats');
     }
     
     async getRecentActivity() {
-        return await this.makeRequest('/dashboard/activity');
+        return await this.makeRequest('/dashboard/recent-activity');
+    }
+    
+    // Batch API: several GET requests in one round trip.
+    // requests: { key: '/api/path?query', ... }; resolves to { key: body } (failed entries hold { error, status })
+    async batch(requests) {
+        const keys = Object.keys(requests);
+        const data = await this.makeRequest('/batch', {
+            method: 'POST',
+            body: JSON.stringify({ requests: keys.map(id => ({ id, path: requests[id] })) })
+        });
+        
+        const results = {};
+        data.responses.forEach(item => {
+            results[item.id] = item.status < 400 ? item.body : { ...item.body, status: item.status };
+        });
+        return results;
+    }
+    
+    // Everything the dashboard needs on load; the overview includes stats and recent activity
+    async loadDashboard() {
+        return await this.batch({
+            overview: '/api/dashboard/overview',
+            menu: '/api/cafeteria/menu',
+            rides: '/api/transport/rides'
+        });
     }
     
     // Admin APIs
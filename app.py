@@ -3,8 +3,11 @@ from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
+from sqlalchemy import select
 import os
+import threading
 from config import Config
+from migrations import upgrade
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -16,14 +19,77 @@ CORS(app, supports_credentials=True)
 from models import db, User, Issue, Order, OrderItem, Feedback, LostFoundItem, Ride, RideBooking
 db.init_app(app)
 
+# Compress responses; registered before the other after_request hooks so it runs last
+from compression import init_compression
+init_compression(app)
+
+# Route read-only endpoints to the replica bind when one is configured
+from db_routing import init_db_routing
+init_db_routing(app)
+
+# Per-request SQL statistics, Server-Timing header and slow-query log
+from sql_profiler import init_sql_profiler
+init_sql_profiler(app)
+
+# Request latency histograms, error counts and /api/metrics
+from metrics import init_metrics
+init_metrics(app)
+
+# Schema migrations run once per process: at startup (run.py, ASGI lifespan), or on the first
+# request a worker serves, before the background job hooks registered below
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+def schema_ready():
+    return _schema_ready
+
+def prepare_database():
+    """Apply pending schema migrations and create the default admin user"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    
+    with _schema_lock, app.app_context():
+        if _schema_ready:
+            return
+        
+        if app.config['AUTO_MIGRATE']:
+            upgrade(db.engine)
+        
+        # Create default admin user if it doesn't exist (always on the primary)
+        with db.engine.begin() as conn:
+            users = User.__table__
+            admin_user = conn.execute(select(users.c.id).where(users.c.username == 'admin')).first()
+            if not admin_user:
+                conn.execute(users.insert().values(
+                    username='admin',
+                    email='admin@college.edu',
+                    password_hash=generate_password_hash('admin123'),
+                    is_admin=True,
+                    created_at=datetime.utcnow()
+                ))
+        
+        _schema_ready = True
+
+@app.before_request
+def create_tables():
+    # Health probes must answer (and report problems) without running migrations
+    if request.blueprint != 'health':
+        prepare_database()
+
 # Import routes
-from routes.auth import auth_bp
-from routes.cafeteria import cafeteria_bp
-from routes.issues import issues_bp
-from routes.lost_found import lost_found_bp
-from routes.transport import transport_bp
-from routes.feedback import feedback_bp
-from routes.dashboard import dashboard_bp
+from auth import auth_bp
+from cafeteria import cafeteria_bp
+from issues import issues_bp
+from lost_found import lost_found_bp
+from transport import transport_bp
+from feedback import feedback_bp
+from dashboard import dashboard_bp
+from health import health_bp
+from admin import admin_bp
+from uploads import uploads_bp
+from batch import batch_bp
+from sales import sales_bp
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -33,28 +99,34 @@ app.register_blueprint(lost_found_bp, url_prefix='/api/lost-found')
 app.register_blueprint(transport_bp, url_prefix='/api/transport')
 app.register_blueprint(feedback_bp, url_prefix='/api/feedback')
 app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+app.register_blueprint(health_bp, url_prefix='/api/health')
+app.register_blueprint(admin_bp, url_prefix='/api/admin')
+app.register_blueprint(uploads_bp, url_prefix='/api/uploads')
+app.register_blueprint(batch_bp, url_prefix='/api/batch')
+app.register_blueprint(sales_bp, url_prefix='/api/cafeteria/sales')
+
+# Background jobs, started on the first request (other than a health probe) each worker serves
+from scheduler import init_scheduler
+from ride_sweeper import complete_departed_rides
+from archive import archive_history
+from forecast import refresh_forecasts
+scheduler = init_scheduler(app)
+scheduler.add('complete_departed_rides', complete_departed_rides, interval=app.config['RIDE_SWEEP_INTERVAL_SECONDS'])
+scheduler.add('archive_history', archive_history, at=app.config['ARCHIVE_AT'])
+scheduler.add('refresh_forecasts', refresh_forecasts, at=app.config['FORECAST_AT'])
+
+# Waitlist seat-hold expiry timer
+from ride_waitlist import init_waitlist
+init_waitlist(app)
+
+# Serve the built frontend when STATIC_DIST_FOLDER points at a build
+from static_assets import init_static_assets
+init_static_assets(app)
 
 @app.route('/api/health')
 def health_check():
     return jsonify({'status': 'healthy', 'message': 'College Portal API is running'})
 
-@app.before_first_request
-def create_tables():
-    """Create database tables on first request"""
-    db.create_all()
-    
-    # Create default admin user if it doesn't exist
-    admin_user = User.query.filter_by(username='admin').first()
-    if not admin_user:
-        admin = User(
-            username='admin',
-            email='admin@college.edu',
-            password_hash=generate_password_hash('admin123'),
-            is_admin=True
-        )
-        db.session.add(admin)
-        db.session.commit()
-
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -0,0 +1,249 @@
+"""
+Archival of old orders, order items and feedback.
+
+orders, order_items and feedback only grow. A daily job (archive_history, at
+ARCHIVE_AT UTC) moves rows created more than ARCHIVE_AFTER_DAYS ago into
+orders_archive, order_items_archive and feedback_archive, keeping their ids.
+Only finished (Completed or Cancelled) orders are moved. The same transaction
+adds the moved rows to precomputed aggregates (order_archive_stats,
+feedback_archive_stats, archive_user_stats), so the stats endpoints add a few
+aggregate rows instead of reading archived ones.
+
+Lists read the archive only when their ``from`` filter reaches back to the
+newest archived row; without one they show the live tables alone. Archived
+rows are listed after the live ones.
+
+Each run moves ARCHIVE_CHUNK_SIZE rows per transaction and at most
+ARCHIVE_MAX_CHUNKS chunks per table, so a large backlog is worked off over
+several nights.
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import func, insert, literal, select, tuple_
+from conditional import list_version, make_etag, paginate
+from models import (ArchiveUserStats, Feedback, FeedbackArchive, FeedbackArchiveStats, Order, OrderArchive,
+                    OrderArchiveStats, OrderItem, OrderItemArchive, db)
+import logging
+import math
+
+logger = logging.getLogger('college_portal.archive')
+
+# Orders that can no longer change
+FINISHED_ORDER_STATUSES = ('Completed', 'Cancelled')
+
+
+def archivable_orders(before):
+    return Order.status.in_(FINISHED_ORDER_STATUSES), Order.created_at < before
+
+
+def copy_rows(source, target, criterion, archived_at=None):
+    """INSERT INTO target SELECT source columns WHERE criterion (plus archived_at when given)"""
+    columns = list(source.__table__.columns)
+    names = [column.name for column in columns]
+    if archived_at is not None:
+        columns.append(literal(archived_at))
+        names.append('archived_at')
+    db.session.execute(insert(target.__table__).from_select(names, select(*columns).where(criterion)))
+
+
+def add_to(model, totals):
+    """Add ``totals`` ({primary key tuple: {column: amount}}) to an aggregate table"""
+    key_columns = model.__table__.primary_key.columns
+    names = [column.key for column in key_columns]
+    existing = {tuple(getattr(row, name) for name in names): row
+                for row in model.query.filter(tuple_(*key_columns).in_(list(totals))).with_for_update()}
+
+    for key, amounts in totals.items():
+        row = existing.get(key)
+        if row is None:
+            row = model(**dict(zip(names, key)))
+            db.session.add(row)
+        for column, amount in amounts.items():
+            setattr(row, column, (getattr(row, column) or 0) + amount)
+
+
+def move_orders(before, chunk_size, max_chunks):
+    """Archive finished orders created before ``before`` and their items; returns the counts moved"""
+    orders = items = 0
+    for _ in range(max_chunks):
+        ids = [row.id for row in db.session.query(Order.id).filter(*archivable_orders(before)).limit(chunk_size)]
+        if not ids:
+            break
+
+        selected = Order.id.in_(ids)
+        add_to(OrderArchiveStats, {
+            (status, ): {'orders': count, 'revenue': Decimal(str(revenue or 0))}
+            for status, count, revenue in db.session.query(Order.status, func.count(Order.id),
+                                                           func.sum(Order.total_amount))
+                                                    .filter(selected).group_by(Order.status)
+        })
+        add_to(ArchiveUserStats, {
+            (user_id, ): {'orders': count}
+            for user_id, count in db.session.query(Order.user_id, func.count(Order.id))
+                                            .filter(selected).group_by(Order.user_id)
+        })
+
+        copy_rows(Order, OrderArchive, selected, datetime.utcnow())
+        copy_rows(OrderItem, OrderItemArchive, OrderItem.order_id.in_(ids))
+        items += OrderItem.query.filter(OrderItem.order_id.in_(ids)).delete(synchronize_session=False)
+        orders += Order.query.filter(selected).delete(synchronize_session=False)
+        db.session.commit()
+
+        if len(ids) < chunk_size:
+            break
+    return {'orders': orders, 'order_items': items}
+
+
+def move_feedback(before, chunk_size, max_chunks):
+    """Archive feedback created before ``before``; returns the count moved"""
+    moved = 0
+    for _ in range(max_chunks):
+        ids = [row.id for row in db.session.query(Feedback.id).filter(Feedback.created_at < before).limit(chunk_size)]
+        if not ids:
+            break
+
+        selected = Feedback.id.in_(ids)
+        add_to(FeedbackArchiveStats, {
+            (category, rating): {'feedback': count}
+            for category, rating, count in db.session.query(Feedback.category, Feedback.rating, func.count(Feedback.id))
+                                                     .filter(selected).group_by(Feedback.category, Feedback.rating)
+        })
+        add_to(ArchiveUserStats, {
+            (user_id, ): {'feedback': count}
+            for user_id, count in db.session.query(Feedback.user_id, func.count(Feedback.id))
+                                            .filter(selected).group_by(Feedback.user_id)
+        })
+
+        copy_rows(Feedback, FeedbackArchive, selected, datetime.utcnow())
+        moved += Feedback.query.filter(selected).delete(synchronize_session=False)
+        db.session.commit()
+
+        if len(ids) < chunk_size:
+            break
+    return {'feedback': moved}
+
+
+def delete_archived_feedback(feedback):
+    """Delete an archived feedback row and take it out of the aggregates; call before committing"""
+    add_to(FeedbackArchiveStats, {(feedback.category, feedback.rating): {'feedback': -1}})
+    add_to(ArchiveUserStats, {(feedback.user_id, ): {'feedback': -1}})
+    db.session.delete(feedback)
+
+
+def archive_history():
+    """Scheduled job: archive orders and feedback older than ARCHIVE_AFTER_DAYS"""
+    config = current_app.config
+    before = datetime.utcnow() - timedelta(days=config['ARCHIVE_AFTER_DAYS'])
+    moved = move_orders(before, config['ARCHIVE_CHUNK_SIZE'], config['ARCHIVE_MAX_CHUNKS'])
+    moved.update(move_feedback(before, config['ARCHIVE_CHUNK_SIZE'], config['ARCHIVE_MAX_CHUNKS']))
+    if any(moved.values()):
+        logger.info('Archived %(orders)d orders, %(order_items)d order items and %(feedback)d feedback', moved)
+    return moved
+
+
+# --- Reading ------------------------------------------------------------------
+
+def date_range(args):
+    """(start, end) from ``from`` / ``to`` arguments; a bare ``to`` date includes that day
+
+    Raises ValueError for a malformed date.
+    """
+    start = datetime.fromisoformat(args['from']) if args.get('from') else None
+    end = None
+    if args.get('to'):
+        end = datetime.fromisoformat(args['to'])
+        if len(args['to']) == 10:
+            end += timedelta(days=1)
+    return start, end
+
+
+def within(query, column, start, end):
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column < end)
+    return query
+
+
+def reaches_archive(archive_model, start):
+    """Whether a list from ``start`` on can include archived rows; only then is the archive read"""
+    if start is None:
+        return False
+    newest = db.session.query(func.max(archive_model.created_at)).scalar()
+    return newest is not None and start <= newest
+
+
+def list_version_with_archive(query, model, archive, archive_model):
+    """list_version() over a live list query and its archive counterpart (None: live only)
+
+    Returns ((live total, archived total), etag).
+    """
+    total, etag = list_version(query, model)
+    if archive is None:
+        return (total, 0), etag
+    archived, archive_etag = list_version(archive, archive_model)
+    return (total, archived), make_etag(etag, archive_etag)
+
+
+class ArchivePage:
+    """A page of live rows followed by archived rows, shaped like the Pagination from paginate()"""
+
+    def __init__(self, query, archive, page, per_page, totals):
+        live_total, archived_total = totals
+        self.page = max(page, 1)
+        self.per_page = per_page if per_page > 0 else 20
+        self.total = live_total + archived_total
+        self.pages = math.ceil(self.total / self.per_page)
+        self.has_prev = self.page > 1
+        self.has_next = self.page < self.pages
+
+        offset = (self.page - 1) * self.per_page
+        self.items = []
+        if offset < live_total:
+            self.items = query.offset(offset).limit(self.per_page).all()
+        if len(self.items) < self.per_page and self.total > offset:
+            self.items += archive.offset(max(offset - live_total, 0)).limit(self.per_page - len(self.items)).all()
+
+
+def paginate_with_archive(query, archive, page, per_page, totals):
+    """paginate() for ordered live and archive queries (archive None: live only)"""
+    if archive is None:
+        return paginate(query, page, per_page, totals[0])
+    return ArchivePage(query, archive, page, per_page, totals)
+
+
+def feedback_counts():
+    """(category, rating, count) rows for live and archived feedback"""
+    live = db.session.query(Feedback.category, Feedback.rating, func.count(Feedback.id))\
+                     .group_by(Feedback.category, Feedback.rating)\
+                     .all()
+    archived = db.session.query(FeedbackArchiveStats.category, FeedbackArchiveStats.rating,
+                                FeedbackArchiveStats.feedback)\
+                         .all()
+    return live + archived
+
+
+def feedback_summary(counts):
+    """The /api/feedback/stats numbers from (category, rating, count) rows"""
+    total = 0
+    by_category, by_rating, rating_sums = {}, {}, {}
+    for category, rating, count in counts:
+        total += count
+        by_category[category] = by_category.get(category, 0) + count
+        by_rating[rating] = by_rating.get(rating, 0) + count
+        rating_sums[category] = rating_sums.get(category, 0) + rating * count
+
+    return {
+        'total_feedback': total,
+        'category_stats': by_category,
+        'rating_stats': {f'{rating}_star': count for rating, count in sorted(by_rating.items())},
+        'category_avg_ratings': {category: round(rating_sums[category] / count, 2)
+                                 for category, count in by_category.items()},
+        'overall_avg_rating': round(sum(rating_sums.values()) / total, 2) if total else 0
+    }
+
+
+def archived_order_total():
+    return db.session.query(func.coalesce(func.sum(OrderArchiveStats.orders), 0)).scalar()
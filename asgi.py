@@ -0,0 +1,473 @@
+"""
+College Portal Backend - ASGI entry point
+
+Serves the read-heavy public endpoints (stats and list views) on the event loop
+through an async database driver, and hands every other request to the Flask
+app through a WSGI adapter. The async routes get the same request metrics, SQL
+profiling, compression and error logging as Flask routes. Pending migrations
+are applied at startup, and a browser session inside its read-your-writes
+window (REPLICA_STICKY_SECONDS) is served by Flask from the primary instead of
+the replica. The ride event stream (GET /api/transport/events) is also served
+here, so an open stream costs a coroutine rather than a worker thread. Run with:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from itsdangerous import BadSignature
+from werkzeug.http import parse_accept_header, parse_cookie, parse_etags, quote_etag
+
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import compression
+import metrics
+import sql_profiler
+from app import app, prepare_database, schema_ready
+from archive import feedback_summary
+from conditional import list_etag, version_column
+from fieldsets import parse_fields, project
+from models import Issue, Feedback, FeedbackArchiveStats, LostFoundItem, Ride, RideBooking
+from ride_waitlist import notifier, pushed_event, unannounced_holds
+
+ASYNC_DRIVERS = {
+    'mysql': 'mysql+aiomysql',
+    'mysql+pymysql': 'mysql+aiomysql',
+    'mysql+mysqlconnector': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_database_url(url):
+    """Swap the sync driver in a database URL for its async counterpart"""
+    scheme, sep, rest = url.partition('://')
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+logger = logging.getLogger('college_portal.asgi')
+
+# Reads go to the replica when one is configured
+replica_url = app.config['SQLALCHEMY_BINDS'].get('replica')
+read_url = replica_url or app.config['SQLALCHEMY_DATABASE_URI']
+engine = create_async_engine(async_database_url(read_url), pool_pre_ping=True)
+AsyncSession = async_sessionmaker(engine, expire_on_commit=False)
+
+flask_app = WsgiToAsgi(app)
+
+
+class QueryArgs:
+    """Minimal stand-in for ``request.args`` built from the ASGI scope
+
+    Also carries what the list handlers need for conditional GET.
+    """
+
+    def __init__(self, scope):
+        self._args = parse_qs(scope['query_string'].decode('latin-1'))
+        self.path = scope['path']
+        self.query_string = scope['query_string']
+        self.if_none_match = parse_etags(dict(scope['headers']).get(b'if-none-match', b'').decode('latin-1'))
+
+    def get(self, key, default=None, type=None):
+        if key not in self._args:
+            return default
+        value = self._args[key][0]
+        if type is None:
+            return value
+        try:
+            return type(value)
+        except ValueError:
+            return default
+
+
+def compress_json(scope, body, route_labels):
+    """(body, headers) for a JSON body, compressed as compression.compress_response would"""
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return body, []
+
+    accepted = parse_accept_header(dict(scope['headers']).get(b'accept-encoding', b'').decode('latin-1'))
+    encoding = compression.choose_encoding(accepted)
+    reason = 'not_accepted' if encoding is None else 'small' if len(body) < app.config['COMPRESSION_MIN_SIZE'] else None
+    headers = [(b'vary', b'Accept-Encoding')]
+    if reason:
+        metrics.inc('http_response_compression_skipped_total', route_labels + (('reason', reason),))
+        return body, headers
+
+    started = time.thread_time()
+    compressed = compression.compress_body(body, encoding, app.config)
+    compression.record(route_labels, len(body), len(compressed), time.thread_time() - started)
+    if len(compressed) >= len(body):
+        return body, headers
+    return compressed, headers + [(b'content-encoding', encoding.encode('ascii'))]
+
+
+def cors_headers(scope):
+    """Mirror the Flask-CORS setup (supports_credentials=True)"""
+    origin = dict(scope['headers']).get(b'origin')
+    if not origin:
+        return []
+    return [
+        (b'access-control-allow-origin', origin),
+        (b'access-control-allow-credentials', b'true'),
+        (b'vary', b'Origin'),
+    ]
+
+
+async def send_json(scope, send, payload, status=200, extra_headers=(), route_labels=()):
+    """Send payload as JSON; a None payload (304) is sent without a body"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    headers = list(extra_headers)
+    if payload is not None:
+        body, encoding_headers = compress_json(scope, body, route_labels)
+        headers += encoding_headers + [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii')),
+        ]
+
+    headers += cors_headers(scope)
+
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+
+
+async def paginate(session, query, page, per_page, total=None):
+    # Out-of-range values are corrected like Flask-SQLAlchemy's paginate(error_out=False)
+    page = max(page, 1)
+    if per_page <= 0:
+        per_page = 20
+    if total is None:
+        total = await session.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+    result = await session.scalars(query.limit(per_page).offset((page - 1) * per_page))
+    items = result.all()
+    pages = math.ceil(total / per_page)
+    return items, {
+        'page': page,
+        'pages': pages,
+        'per_page': per_page,
+        'total': total,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
+
+
+async def list_version(session, query, model, args):
+    """(total, etag) for a filtered select(), matching conditional.list_version"""
+    watermark = query.with_only_columns(func.count(model.id), func.max(model.id), func.max(version_column(model)))
+    total, *versions = (await session.execute(watermark)).one()
+    return total, list_etag(args.path, args.query_string, total, *versions)
+
+
+def validator_headers(etag):
+    return [(b'etag', quote_etag(etag, weak=True).encode('ascii')), (b'cache-control', b'no-cache')]
+
+
+async def count(session, model, *criteria):
+    return await session.scalar(select(func.count(model.id)).where(*criteria))
+
+
+async def get_issue_stats(args):
+    async with AsyncSession() as session:
+        categories = await session.execute(select(Issue.category, func.count(Issue.id)).group_by(Issue.category))
+        priorities = await session.execute(select(Issue.priority, func.count(Issue.id)).group_by(Issue.priority))
+
+        return {
+            'total_issues': await count(session, Issue),
+            'pending_issues': await count(session, Issue, Issue.status == 'Pending'),
+            'in_progress_issues': await count(session, Issue, Issue.status == 'In Progress'),
+            'resolved_issues': await count(session, Issue, Issue.status == 'Resolved'),
+            'category_stats': {category: total for category, total in categories},
+            'priority_stats': {priority: total for priority, total in priorities}
+        }
+
+
+async def get_feedback_stats(args):
+    async with AsyncSession() as session:
+        live = await session.execute(select(Feedback.category, Feedback.rating, func.count(Feedback.id))
+                                     .group_by(Feedback.category, Feedback.rating))
+        archived = await session.execute(select(FeedbackArchiveStats.category, FeedbackArchiveStats.rating,
+                                                FeedbackArchiveStats.feedback))
+        return feedback_summary([*live, *archived])
+
+
+async def get_lost_found_stats(args):
+    async with AsyncSession() as session:
+        return {
+            'total_items': await count(session, LostFoundItem),
+            'active_items': await count(session, LostFoundItem, LostFoundItem.status == 'Active'),
+            'resolved_items': await count(session, LostFoundItem, LostFoundItem.status == 'Resolved'),
+            'lost_items': await count(session, LostFoundItem, LostFoundItem.type == 'lost', LostFoundItem.status == 'Active'),
+            'found_items': await count(session, LostFoundItem, LostFoundItem.type == 'found', LostFoundItem.status == 'Active')
+        }
+
+
+async def get_transport_stats(args):
+    async with AsyncSession() as session:
+        return {
+            'total_rides': await count(session, Ride),
+            'active_rides': await count(session, Ride, Ride.status == 'Active', Ride.departure_time > datetime.utcnow()),
+            'total_bookings': await count(session, RideBooking, RideBooking.status.in_(RideBooking.BOOKED_STATUSES))
+        }
+
+
+async def get_issues(args):
+    page = args.get('page', 1, type=int)
+    per_page = args.get('per_page', 20, type=int)
+    try:
+        fields = parse_fields(Issue, args.get('fields'))
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    query = select(Issue)
+    for field in ('category', 'status', 'priority'):
+        if args.get(field):
+            query = query.where(getattr(Issue, field) == args.get(field))
+
+    async with AsyncSession() as session:
+        total, etag = await list_version(session, query, Issue, args)
+        if args.if_none_match.contains_weak(etag):
+            return None, 304, validator_headers(etag)
+
+        query = project(query, Issue, fields).order_by(Issue.created_at.desc())
+        issues, pagination = await paginate(session, query, page, per_page, total)
+        payload = {'issues': [issue.to_dict(fields) for issue in issues], 'pagination': pagination}
+        return payload, 200, validator_headers(etag)
+
+
+async def get_rides(args):
+    page = args.get('page', 1, type=int)
+    per_page = args.get('per_page', 20, type=int)
+    try:
+        fields = parse_fields(Ride, args.get('fields'))
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    query = select(Ride).where(Ride.status == 'Active', Ride.available_seats > 0, Ride.departure_time > datetime.utcnow())
+
+    if args.get('from'):
+        query = query.where(Ride.from_location.ilike(f"%{args.get('from')}%"))
+    if args.get('to'):
+        query = query.where(Ride.to_location.ilike(f"%{args.get('to')}%"))
+    if args.get('date'):
+        try:
+            search_date = datetime.fromisoformat(args.get('date')).date()
+        except ValueError:
+            return {'error': 'Invalid date format'}, 400
+        query = query.where(func.date(Ride.departure_time) == search_date)
+
+    async with AsyncSession() as session:
+        total, etag = await list_version(session, query, Ride, args)
+        if args.if_none_match.contains_weak(etag):
+            return None, 304, validator_headers(etag)
+
+        query = project(query, Ride, fields).order_by(Ride.departure_time)
+        rides, pagination = await paginate(session, query, page, per_page, total)
+        payload = {'rides': [ride.to_dict(fields) for ride in rides], 'pagination': pagination}
+        return payload, 200, validator_headers(etag)
+
+
+# Public read-only endpoints served natively on the event loop
+ASYNC_ROUTES = {
+    '/api/issues/stats': (get_issue_stats, 'Failed to retrieve issue statistics'),
+    '/api/feedback/stats': (get_feedback_stats, 'Failed to retrieve feedback statistics'),
+    '/api/lost-found/stats': (get_lost_found_stats, 'Failed to retrieve statistics'),
+    '/api/transport/stats': (get_transport_stats, 'Failed to retrieve statistics'),
+    '/api/issues/': (get_issues, 'Failed to retrieve issues'),
+    '/api/transport/rides': (get_rides, 'Failed to retrieve rides'),
+}
+
+
+def flask_endpoint(path):
+    endpoint, _ = app.url_map.bind('localhost').match(path, method='GET')
+    return endpoint
+
+
+# Flask endpoint names, for metric labels that match the same routes served by Flask
+ENDPOINTS = {path: flask_endpoint(path) for path in ASYNC_ROUTES}
+
+
+def flask_session(scope):
+    """The Flask session of a request that does not go through Flask, read from its signed cookie"""
+    cookies = parse_cookie(dict(scope['headers']).get(b'cookie', b'').decode('latin-1'))
+    cookie = cookies.get(app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return {}
+
+    serializer = app.session_interface.get_signing_serializer(app)
+    try:
+        return serializer.loads(cookie, max_age=int(app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+
+def recently_wrote(scope):
+    """db_routing.recently_wrote() for a request that does not go through Flask"""
+    last_write = flask_session(scope).get('db_last_write')
+    return last_write is not None and time.time() - last_write < app.config['REPLICA_STICKY_SECONDS']
+
+
+class EventQueue:
+    """A notifier subscriber that hands events published on any thread to an asyncio queue"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    def put(self, item):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+
+async def outstanding_holds(user_id):
+    async with AsyncSession() as session:
+        rows = await session.execute(select(RideBooking.id, RideBooking.ride_id, RideBooking.hold_expires_at)
+                                     .where(RideBooking.passenger_id == user_id, RideBooking.status == 'Held'))
+        return rows.all()
+
+
+async def stream_ride_events(scope, receive, send):
+    """ride_waitlist.event_stream() on the event loop, without a thread per open stream"""
+    user_id = flask_session(scope).get('user_id')
+    if user_id is None:
+        await send_json(scope, send, {'error': 'Authentication required'}, 401)
+        return
+
+    loop = asyncio.get_running_loop()
+    keepalive = app.config['RIDE_EVENTS_KEEPALIVE_SECONDS']
+    closes_at = loop.time() + app.config['RIDE_EVENTS_STREAM_SECONDS']
+    events = EventQueue(loop)
+    announced = set()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        events.queue.put_nowait(None)
+
+    async def send_message(message):
+        await send({'type': 'http.response.body', 'body': message.encode('utf-8'), 'more_body': True})
+
+    labels = (('blueprint', 'transport'), ('route', scope['path']))
+    metrics.inc('http_requests_total', labels + (('method', scope['method']), ('status', '200')))
+    metrics.inc('http_requests_in_flight', labels[:1])
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        with notifier.subscribe(user_id, events):
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ] + cors_headers(scope)})
+            await send_message('retry: 3000\n\n')
+
+            while True:
+                # Holds offered before the stream opened, or by another worker
+                for message in unannounced_holds(await outstanding_holds(user_id), user_id, announced):
+                    await send_message(message)
+
+                remaining = closes_at - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(events.queue.get(), min(keepalive, remaining))
+                except asyncio.TimeoutError:
+                    await send_message(': keepalive\n\n')
+                    continue
+                if item is None:
+                    return  # the client went away
+
+                message = pushed_event(*item, announced)
+                if message is not None:
+                    await send_message(message)
+
+        await send({'type': 'http.response.body', 'body': b''})
+    except Exception:
+        logger.exception('Ride event stream for user %s failed', user_id)
+    finally:
+        watcher.cancel()
+        metrics.inc('http_requests_in_flight', labels[:1], -1)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await asyncio.to_thread(prepare_database)
+            except Exception as e:
+                logger.exception('Schema migrations failed at startup')
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await engine.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def run_handler(scope, send, handler, error_message):
+    """Serve one async route, recording what Flask's metrics and SQL profiler hooks would"""
+    endpoint = ENDPOINTS[scope['path']]
+    labels = (('blueprint', endpoint.rpartition('.')[0] or 'app'), ('route', scope['path']))
+    metrics_enabled = app.config.get('METRICS_ENABLED', True)
+    profile = sampled = None
+    if app.config.get('SQL_PROFILING_ENABLED', True):
+        profile, sampled = sql_profiler.new_profile(app.config, scope['method'], scope['path'], endpoint)
+    token = sql_profiler.async_profile.set(profile)
+    if metrics_enabled:
+        metrics.inc('http_requests_in_flight', labels[:1])
+    started = time.perf_counter()
+
+    try:
+        try:
+            result = await handler(QueryArgs(scope))
+        except Exception:
+            logger.exception('Unhandled error in %s %s', scope['method'], scope['path'])
+            result = {'error': error_message}, 500
+        finally:
+            sql_profiler.async_profile.reset(token)
+
+        # Handlers return a payload, (payload, status) or (payload, status, headers)
+        payload, status, *headers = result if isinstance(result, tuple) else (result, 200)
+        headers = list(headers[0]) if headers else []
+        if sampled:
+            headers.append((b'server-timing', profile.server_timing().encode('latin-1')))
+
+        if metrics_enabled:
+            metrics.inc('http_requests_total', labels + (('method', scope['method']), ('status', str(status))))
+            metrics.observe('http_request_duration_seconds', labels, time.perf_counter() - started)
+            if status >= 500:
+                metrics.inc('http_request_errors_total', labels)
+            if profile is not None and profile.count:
+                metrics.inc('sql_queries_total', labels, profile.count)
+                metrics.inc('sql_query_seconds_total', labels, profile.total_time)
+        await send_json(scope, send, payload, status, headers, labels)
+    finally:
+        if metrics_enabled:
+            metrics.inc('http_requests_in_flight', labels[:1], -1)
+            metrics.flush_if_due(app.config)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+
+    if scope['type'] == 'http' and scope['path'] == '/api/transport/events' and scope['method'] == 'GET':
+        await stream_ride_events(scope, receive, send)
+        return
+
+    route = ASYNC_ROUTES.get(scope.get('path')) if scope['type'] == 'http' else None
+    # Flask migrates on the first request when the server runs without lifespan events,
+    # and serves sessions that just wrote from the primary
+    if route is None or scope['method'] not in ('GET', 'HEAD') or not schema_ready() \
+            or (replica_url and recently_wrote(scope)):
+        await flask_app(scope, receive, send)
+        return
+
+    await run_handler(scope, send, *route)
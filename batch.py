@@ -0,0 +1,119 @@
+"""
+/api/batch: run several GET requests in one round trip.
+
+Each sub-request is matched against the app's URL map and its view is called
+directly, inside a nested request context that reuses the batch request's app
+context and cookie session. All sub-requests therefore share one database
+session, so the user row each view looks up is loaded once and then comes from
+the identity map, and the per-request hooks (profiling, metrics, session
+loading) run once for the whole batch instead of once per call.
+
+Only GET is accepted: sub-requests run one after another on a shared session,
+and a failure part-way through must not leave half of a set of writes applied.
+"""
+
+from flask import Blueprint, current_app, g, request, jsonify, session
+from urllib.parse import urlsplit
+from werkzeug.exceptions import HTTPException, MethodNotAllowed, NotFound
+from werkzeug.routing import RequestRedirect
+from werkzeug.test import EnvironBuilder
+from db_routing import choose_bind
+from models import db
+import metrics
+
+batch_bp = Blueprint('batch', __name__)
+
+# Headers passed through to every sub-request
+FORWARDED_HEADERS = ('Cookie', 'Accept', 'Accept-Language', 'User-Agent')
+
+
+def match(path):
+    """(url rule, view args, path) for a sub-request, following trailing-slash redirects"""
+    adapter = current_app.url_map.bind_to_environ(request.environ)
+    try:
+        rule, view_args = adapter.match(path, method='GET', return_rule=True)
+    except RequestRedirect as redirect:
+        path = urlsplit(redirect.new_url).path
+        rule, view_args = adapter.match(path, method='GET', return_rule=True)
+    return rule, view_args, path
+
+
+def run_subrequest(path, query_string):
+    """Call the view for one GET path and return (status, body)"""
+    try:
+        rule, view_args, path = match(path)
+    except NotFound:
+        return 404, {'error': 'Endpoint not found'}
+    except MethodNotAllowed:
+        return 405, {'error': 'Only GET requests can be batched'}
+
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    environ = EnvironBuilder(path=path, query_string=query_string, method='GET', headers=headers,
+                             base_url=request.host_url).get_environ()
+
+    parent_session = session._get_current_object()
+    use_replica = g.get('use_replica')
+    ctx = current_app.request_context(environ)
+    # Reuse the already-loaded cookie session instead of decoding it again
+    ctx.session = parent_session
+    with ctx:
+        request.url_rule = rule
+        request.view_args = view_args
+        labels = metrics.route_labels()
+        choose_bind()
+        try:
+            response = current_app.make_response(current_app.view_functions[rule.endpoint](**view_args))
+        except HTTPException as e:
+            response = e.get_response()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('Batched request to %s failed', path)
+            response = None
+        finally:
+            g.use_replica = use_replica
+
+    if response is None:
+        status, body = 500, {'error': 'Internal server error'}
+    elif response.is_streamed:
+        response.close()
+        status, body = 400, {'error': 'Streaming endpoints cannot be batched'}
+    elif response.is_json:
+        status, body = response.status_code, response.get_json()
+    else:
+        status, body = response.status_code, response.get_data(as_text=True)
+
+    metrics.inc('batch_subrequests_total', labels + (('status', str(status)),))
+    return status, body
+
+
+@batch_bp.route('', methods=['POST'])
+def run_batch():
+    """Body: {"requests": [{"id": "stats", "path": "/api/dashboard/stats?limit=5"}, ...]}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        requests = data.get('requests')
+        if not isinstance(requests, list) or not requests:
+            return jsonify({'error': 'requests must be a non-empty list'}), 400
+
+        limit = current_app.config['BATCH_MAX_REQUESTS']
+        if len(requests) > limit:
+            return jsonify({'error': f'At most {limit} requests per batch'}), 400
+
+        responses = []
+        for index, sub in enumerate(requests):
+            if not isinstance(sub, dict) or not isinstance(sub.get('path'), str):
+                responses.append({'id': index, 'status': 400, 'body': {'error': 'Each request needs a path'}})
+                continue
+            if sub.get('method', 'GET').upper() != 'GET':
+                responses.append({'id': sub.get('id', index), 'status': 405,
+                                  'body': {'error': 'Only GET requests can be batched'}})
+                continue
+
+            path, _, query_string = sub['path'].partition('?')
+            status, body = run_subrequest(path, query_string)
+            responses.append({'id': sub.get('id', index), 'status': status, 'body': body})
+
+        return jsonify({'responses': responses}), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to run batch'}), 500
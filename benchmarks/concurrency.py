@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Concurrent-connection capacity benchmark: sync workers vs ASGI
+
+Opens N keep-alive connections against a running server, each issuing GET
+requests back to back for a fixed duration, and reports throughput, error
+rate and latency percentiles per concurrency level.
+
+Start the server in one mode, benchmark it, then repeat for the other:
+
+    gunicorn -w 4 -b 127.0.0.1:5000 app:app
+    uvicorn asgi:application --host 127.0.0.1 --port 5000 --workers 4
+
+    python -m benchmarks.concurrency --url http://127.0.0.1:5000/api/transport/stats \\
+        --levels 10,50,100,250,500 --duration 10 --label gunicorn-sync
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response and return its status code"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+
+    length = 0
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value.strip())
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+
+    return status
+
+
+async def client(host, port, request, deadline, latencies, errors):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await read_response(reader)
+            if status >= 500:
+                errors.append(status)
+            else:
+                latencies.append(time.perf_counter() - started)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors.append('connection')
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+
+    if writer is not None:
+        writer.close()
+
+
+async def run_level(url, connections, duration):
+    parts = urlsplit(url)
+    path = parts.path + ('?' + parts.query if parts.query else '')
+    request = (f'GET {path or "/"} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+               f'Connection: keep-alive\r\n\r\n').encode('latin-1')
+
+    latencies = []
+    errors = []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*[
+        client(parts.hostname, parts.port or 80, request, deadline, latencies, errors)
+        for _ in range(connections)
+    ])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'connections': connections,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', default='http://127.0.0.1:5000/api/transport/stats')
+    parser.add_argument('--levels', default='10,50,100,250,500', help='comma separated connection counts')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per level')
+    parser.add_argument('--label', default='server', help='name recorded with the results')
+    parser.add_argument('--output', help='append results as JSON lines to this file')
+    args = parser.parse_args()
+
+    print(f"{'conns':>6} {'req/s':>9} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for level in [int(level) for level in args.levels.split(',')]:
+        result = asyncio.run(run_level(args.url, level, args.duration))
+        result['label'] = args.label
+        print(f"{result['connections']:>6} {result['rps']:>9} {result['errors']:>7} "
+              f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8}")
+        if args.output:
+            with open(args.output, 'a') as f:
+                f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Payload size and latency of list endpoints: card fieldset vs full items
+
+Builds a throwaway SQLite database with the migrations, seeds it (with
+realistic description lengths), then requests each list endpoint through the
+Flask test client with ``?fields=card`` and without, and reports response
+bytes, SQL statements and latency percentiles per variant.
+
+    python -m benchmarks.fieldsets [--rows 5000] [--per-page 50] [--iterations 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ENDPOINTS = [
+    '/api/issues/', '/api/lost-found/items', '/api/feedback/', '/api/transport/rides',
+    '/api/transport/bookings/my', '/api/cafeteria/admin/orders',
+]
+
+DESCRIPTION = 'Water has been leaking from the ceiling near the second floor washroom since Monday. ' * 6
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(client, url, iterations, statements):
+    """(bytes, statements per request, sorted latencies in ms)"""
+    response = client.get(url, headers={'Accept-Encoding': 'identity'})
+    if response.status_code != 200:
+        raise RuntimeError(f'{url}: HTTP {response.status_code}')
+    size = len(response.data)
+
+    statements.clear()
+    client.get(url, headers={'Accept-Encoding': 'identity'})
+    queries = len(statements)
+
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        client.get(url, headers={'Accept-Encoding': 'identity'})
+        latencies.append((time.perf_counter() - started) * 1000)
+    return size, queries, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare card and full list responses')
+    parser.add_argument('--rows', type=int, default=5000, help='rows per table in the seeded database')
+    parser.add_argument('--per-page', type=int, default=50, help='page size requested')
+    parser.add_argument('--iterations', type=int, default=200, help='requests per endpoint and variant')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='fieldsets-'), 'fieldsets.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ.pop('DATABASE_REPLICA_URL', None)
+    os.environ['SCHEDULER_ENABLED'] = 'false'
+
+    from sqlalchemy import create_engine, event
+    from migrations import upgrade
+    from migrations.plancheck import seed, USER, PASSWORD
+    from app import app
+    from models import db
+
+    engine = create_engine(os.environ['DATABASE_URL'])
+    upgrade(engine, log=lambda message: None)
+    with engine.begin() as conn:
+        seed(conn, args.rows)
+        for table in ('issues', 'lost_found_items'):
+            conn.exec_driver_sql(f'UPDATE {table} SET description = ?', (DESCRIPTION,))
+        conn.exec_driver_sql('ANALYZE')
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, parameters, context, executemany: statements.append(statement))
+
+    client = app.test_client()
+    client.post('/api/auth/login', json={'username': USER, 'password': PASSWORD})
+
+    print(f"{'Endpoint':<30}{'fields':<8}{'bytes':>10}{'queries':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for endpoint in ENDPOINTS:
+        results = {}
+        for variant in ('full', 'card'):
+            url = f'{endpoint}?per_page={args.per_page}'
+            if variant == 'card':
+                url += '&fields=card'
+            results[variant] = measure(client, url, args.iterations, statements)
+            size, queries, latencies = results[variant]
+            print(f'{endpoint:<30}{variant:<8}{size:>10,}{queries:>9}'
+                  f'{percentile(latencies, 50):>9.2f}{percentile(latencies, 95):>9.2f}')
+
+        full_size, card_size = results['full'][0], results['card'][0]
+        full_p50, card_p50 = percentile(results['full'][2], 50), percentile(results['card'][2], 50)
+        print(f"{'':<30}{'saved':<8}{1 - card_size / full_size:>10.0%}{'':>9}"
+              f'{1 - card_p50 / full_p50 if full_p50 else 0:>9.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Demand forecasting: NumPy forecast vs the same model in plain Python
+
+Generates a year of synthetic cafeteria orders (lunch peaks, quieter weekends,
+coffee in the morning, a slow upward trend and random noise), sums them into
+hourly rollup rows as order_sales_hourly would, then forecasts the final week
+from the weeks before it. Reports the time taken by forecast.forecast_demand
+and by a loop-per-slot version of the same model, checks they agree, and
+compares the forecast error with two simpler baselines. Exits with status 1
+when the results differ or the forecast is less accurate than the seasonal
+average.
+
+    python -m benchmarks.forecast [--orders-per-day 400] [--weeks 8] [--alpha 0.1]
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from benchmarks.dataset import DAYS_OF_HISTORY, ORDER_HOUR_WEIGHTS
+from forecast import forecast_demand, np
+
+# Relative order volume per weekday, Monday first
+WEEKDAY_WEIGHTS = [1.0, 1.05, 1.0, 1.1, 0.9, 0.45, 0.35]
+
+# Item popularity before noon and from noon on
+MORNING_ITEMS = {'Coffee': 6, 'Tea': 4, 'Club Sandwich': 2, 'Chicken Burger': 1, 'Margherita Pizza': 1}
+LATER_ITEMS = {'Coffee': 2, 'Tea': 2, 'Club Sandwich': 3, 'Chicken Burger': 4, 'Margherita Pizza': 3}
+
+
+def synthetic_history(orders_per_day, first, days, rng):
+    """[(day, hour, item_name, quantity)] for ``days`` days of orders and the number of orders"""
+    totals = Counter()
+    orders = 0
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        trend = 1 + 0.3 * offset / days
+        count = int(orders_per_day * WEEKDAY_WEIGHTS[day.weekday()] * trend * rng.uniform(0.8, 1.2))
+        orders += count
+        for hour in rng.choices(range(24), ORDER_HOUR_WEIGHTS, k=count):
+            popularity = MORNING_ITEMS if hour < 12 else LATER_ITEMS
+            for item in sorted(set(rng.choices(list(popularity), list(popularity.values()), k=rng.randint(1, 3)))):
+                totals[(day, hour, item)] += rng.randint(1, 2)
+    return [(day, hour, item, quantity) for (day, hour, item), quantity in totals.items()], orders
+
+
+def forecast_loops(history, first, weeks, days, alpha):
+    """forecast_demand() one slot at a time, without NumPy"""
+    items = sorted({row[2] for row in history})
+    quantities = {}
+    for day, hour, item, quantity in history:
+        offset = (day - first).days
+        key = (item, offset // 7, offset % 7, hour)
+        quantities[key] = quantities.get(key, 0) + quantity
+
+    forecast = []
+    for item in items:
+        by_hour = [sum(quantities.get((item, week, weekday, hour), 0) for week in range(weeks) for weekday in range(7))
+                   for hour in range(24)]
+        total = sum(by_hour)
+        level_by_day = {}
+        for weekday in range(7):
+            series = [sum(quantities.get((item, week, weekday, hour), 0) for hour in range(24)) for week in range(weeks)]
+            level = sum(series) / weeks
+            for value in series:
+                level = alpha * value + (1 - alpha) * level
+            level_by_day[weekday] = level
+        forecast.append([[max(level_by_day[offset % 7] * by_hour[hour] / total if total > 0 else 0, 0)
+                          for hour in range(24)] for offset in range(days)])
+    return items, forecast
+
+
+def timed(run, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = run()
+    return result, (time.perf_counter() - started) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time and score the cafeteria demand forecast')
+    parser.add_argument('--orders-per-day', type=int, default=400, help='average orders on a weekday')
+    parser.add_argument('--weeks', type=int, default=8, help='weeks of history per forecast')
+    parser.add_argument('--alpha', type=float, default=0.1, help='weight of the latest week')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per timing')
+    args = parser.parse_args()
+
+    if np is None:
+        print('numpy is not installed (pip install numpy)', file=sys.stderr)
+        return 1
+
+    rng = random.Random(11)
+    days = DAYS_OF_HISTORY // 7 * 7
+    first = date.today() - timedelta(days=days)
+    started = time.perf_counter()
+    history, orders = synthetic_history(args.orders_per_day, first, days, rng)
+    print(f'{orders:,} orders over {days} days -> {len(history):,} rollup rows '
+          f'({time.perf_counter() - started:.1f}s to generate)')
+
+    # Forecast the final week from the weeks before it
+    weeks = min(args.weeks, days // 7 - 1)
+    start = first + timedelta(days=days - 7 * (weeks + 1))
+    test_day = first + timedelta(days=days - 7)
+    past = [row for row in history if start <= row[0] < test_day]
+    actual = [row for row in history if row[0] >= test_day]
+
+    (items, forecast), numpy_ms = timed(lambda: forecast_demand(past, start, weeks, 7, args.alpha), args.repeat)
+    (loop_items, loop_forecast), loop_ms = timed(lambda: forecast_loops(past, start, weeks, 7, args.alpha),
+                                                 max(1, args.repeat // 10))
+    same = items == loop_items and np.allclose(forecast, np.array(loop_forecast))
+    print(f'{len(items)} items x 7 days x 24 hours from {weeks} weeks of history')
+    print(f'  numpy      {numpy_ms:8.2f} ms')
+    print(f'  loops      {loop_ms:8.2f} ms  ({loop_ms / numpy_ms:.0f}x slower, results {"match" if same else "DIFFER"})')
+
+    # (item, day, hour) quantities of the held-out week
+    index = {item: position for position, item in enumerate(items)}
+    observed = np.zeros_like(forecast)
+    for day, hour, item, quantity in actual:
+        observed[index[item], (day - test_day).days, hour] += quantity
+    history_cube = np.zeros((len(items), weeks * 7, 24))
+    for day, hour, item, quantity in past:
+        history_cube[index[item], (day - start).days, hour] += quantity
+    by_week = history_cube.reshape(len(items), weeks, 7, 24)
+
+    print(f'Mean absolute error per item-hour over the last week (mean demand {observed.mean():.2f}):')
+    errors = {}
+    for name, predicted in (('smoothed days x hourly profile (forecast.py)', forecast),
+                            ('same hour last week', by_week[:, -1]),
+                            (f'{weeks}-week seasonal average', by_week.mean(axis=1))):
+        errors[name] = np.abs(predicted - observed).mean()
+        print(f'  {name:<46} {errors[name]:.3f}')
+    better = errors['smoothed days x hourly profile (forecast.py)'] < errors[f'{weeks}-week seasonal average']
+    return 0 if same and better else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
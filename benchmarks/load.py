@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+Load test: drive the API with a realistic request mix and report per-route latency
+
+Virtual users log in as seeded accounts (see benchmarks.dataset) and loop over
+a scenario's weighted actions for a fixed duration, each in its own thread.
+Like a browser, they keep their session cookie and revalidate repeated GETs
+with If-None-Match. Requests go through the Flask test client in this process
+(no server needed) or over HTTP to a running server.
+
+    python -m benchmarks.dataset --scale 100k --database-url sqlite:////tmp/bench.db
+    python -m benchmarks.load --scenario lunch_rush --database-url sqlite:////tmp/bench.db --users 20
+    python -m benchmarks.load --scenario friday_rides --url http://127.0.0.1:5000 --users 100 --duration 60
+
+Scenarios:
+  lunch_rush       students browsing the menu, ordering and checking their orders
+  friday_rides     ride search for Friday afternoon, booking, cancelling and offering rides
+  admin_dashboard  admins on the stats pages and sales reports, working through pending
+                   orders and issues
+  campus_day       a mix of every blueprint
+
+``--save-baseline`` writes the results to benchmarks/baselines/<scenario>.json.
+``--compare`` checks a run against that file and exits with status 1 when a
+route's p95 latency rose, or overall throughput fell, by more than --tolerance.
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from urllib.parse import quote, urlsplit
+
+from benchmarks.concurrency import percentile
+from benchmarks.dataset import (ADMIN, PASSWORD, FEEDBACK_CATEGORIES, ISSUE_CATEGORIES, LOCATIONS,
+                                MENU_PRICES)
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+
+# --- Clients ----------------------------------------------------------------
+
+class InProcessClient:
+    """Requests through the Flask test client (keeps cookies)"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, json=body, headers=headers or {})
+        return response.status_code, response.headers.get('ETag'), response.get_json(silent=True)
+
+
+class HttpClient:
+    """Requests over one keep-alive HTTP connection, with a cookie jar of one session"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.connection = None
+        self.cookies = {}
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {}, **{'Accept-Encoding': 'gzip'})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            self.connection.request(method, path, body=data, headers=headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+
+        for cookie in response.headers.get_all('Set-Cookie') or []:
+            name, _, value = cookie.split(';', 1)[0].partition('=')
+            self.cookies[name.strip()] = value
+        if response.getheader('Content-Encoding') == 'gzip':
+            payload = gzip.decompress(payload)
+        try:
+            parsed = json.loads(payload) if payload else None
+        except ValueError:
+            parsed = None
+        return response.status, response.getheader('ETag'), parsed
+
+
+# --- Virtual users ----------------------------------------------------------
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.rejected = defaultdict(int)
+
+    def merge(self, other):
+        for route, values in other.latencies.items():
+            self.latencies[route].extend(values)
+        for route, count in other.errors.items():
+            self.errors[route] += count
+        for route, count in other.rejected.items():
+            self.rejected[route] += count
+
+
+class VirtualUser:
+    def __init__(self, client, username, rng, world):
+        self.client = client
+        self.username = username
+        self.rng = rng
+        self.world = world
+        self.stats = Stats()
+        self.etags = {}  # path -> (etag, payload) of the last 200
+        self.order_ids = []
+        self.booking_ids = []
+        self.found_rides = []
+
+    def call(self, route, method, path, body=None):
+        """Time one request under its route label; returns (status, payload)"""
+        headers = {}
+        cached = self.etags.get(path) if method == 'GET' else None
+        if cached:
+            headers['If-None-Match'] = cached[0]
+
+        started = time.perf_counter()
+        try:
+            status, etag, payload = self.client.request(method, path, body, headers)
+        except (OSError, http.client.HTTPException):
+            self.stats.errors[route] += 1
+            return 0, None
+        elapsed = time.perf_counter() - started
+
+        if status >= 500:
+            self.stats.errors[route] += 1
+            return status, payload
+        self.stats.latencies[route].append(elapsed)
+        if status >= 400:
+            self.stats.rejected[route] += 1
+        elif status == 304 and cached:
+            payload = cached[1]
+        elif method == 'GET' and etag:
+            self.etags[path] = (etag, payload)
+        return status, payload
+
+    def login(self):
+        status, _ = self.call('POST /api/auth/login', 'POST', '/api/auth/login',
+                              {'username': self.username, 'password': PASSWORD})
+        if status != 200:
+            raise RuntimeError(f'Login failed for {self.username}: HTTP {status}')
+
+    def run(self, actions, deadline, think_seconds):
+        names = [action for action, _ in actions]
+        weights = [weight for _, weight in actions]
+        while time.perf_counter() < deadline:
+            self.rng.choices(names, weights)[0](self)
+            if think_seconds:
+                time.sleep(self.rng.uniform(0, 2 * think_seconds))
+
+
+def next_friday():
+    today = date.today()
+    return (today + timedelta(days=(4 - today.weekday()) % 7)).isoformat()
+
+
+# --- Actions ----------------------------------------------------------------
+# Each action makes one request and remembers the ids follow-up actions need.
+
+def browse_menu(user):
+    user.call('GET /api/cafeteria/menu', 'GET', '/api/cafeteria/menu')
+
+
+def place_order(user):
+    names = user.rng.sample(list(MENU_PRICES), user.rng.choice([1, 1, 2, 3]))
+    items = [{'name': name, 'quantity': user.rng.choice([1, 1, 2])} for name in names]
+    status, payload = user.call('POST /api/cafeteria/orders', 'POST', '/api/cafeteria/orders', {'items': items})
+    if status == 201:
+        user.order_ids.append(payload['order']['id'])
+
+
+def my_orders(user):
+    user.call('GET /api/cafeteria/orders', 'GET', '/api/cafeteria/orders')
+
+
+def order_detail(user):
+    if not user.order_ids:
+        return my_orders(user)
+    order_id = user.rng.choice(user.order_ids)
+    user.call('GET /api/cafeteria/orders/<id>', 'GET', f'/api/cafeteria/orders/{order_id}')
+
+
+def cancel_order(user):
+    if not user.order_ids:
+        return place_order(user)
+    order_id = user.order_ids.pop()
+    user.call('PUT /api/cafeteria/orders/<id>/cancel', 'PUT', f'/api/cafeteria/orders/{order_id}/cancel')
+
+
+def search_rides(user):
+    origin, destination = user.rng.sample(LOCATIONS, 2)
+    query = f'from={quote(origin)}&to={quote(destination)}' if user.rng.random() < 0.5 else f'from={quote(origin)}'
+    if user.rng.random() < 0.7:
+        query += f'&date={next_friday()}'
+    status, payload = user.call('GET /api/transport/rides', 'GET', f'/api/transport/rides?{query}&fields=card')
+    if status == 200 and payload:
+        user.found_rides = [ride['id'] for ride in payload['rides']]
+
+
+def browse_rides(user):
+    status, payload = user.call('GET /api/transport/rides', 'GET', '/api/transport/rides')
+    if status == 200 and payload:
+        user.found_rides = [ride['id'] for ride in payload['rides']]
+
+
+def ride_detail(user):
+    ride_id = user.rng.choice(user.found_rides) if user.found_rides else user.rng.randint(1, user.world['rides'])
+    user.call('GET /api/transport/rides/<id>', 'GET', f'/api/transport/rides/{ride_id}')
+
+
+def book_ride(user):
+    if not user.found_rides:
+        return browse_rides(user)
+    ride_id = user.found_rides.pop(user.rng.randrange(len(user.found_rides)))
+    status, payload = user.call('POST /api/transport/rides/<id>/book', 'POST', f'/api/transport/rides/{ride_id}/book')
+    if status == 201:
+        user.booking_ids.append(payload['booking']['id'])
+
+
+def cancel_booking(user):
+    if not user.booking_ids:
+        return my_bookings(user)
+    booking_id = user.booking_ids.pop(0)
+    user.call('PUT /api/transport/bookings/<id>/cancel', 'PUT', f'/api/transport/bookings/{booking_id}/cancel')
+
+
+def my_bookings(user):
+    user.call('GET /api/transport/bookings/my', 'GET', '/api/transport/bookings/my')
+
+
+def offer_ride(user):
+    origin, destination = user.rng.sample(LOCATIONS, 2)
+    # A week ahead, so it is in the future even late on a Friday
+    friday = date.fromisoformat(next_friday()) + timedelta(days=7)
+    departure = f'{friday.isoformat()}T{user.rng.randint(14, 19):02d}:{user.rng.choice(["00", "30"])}:00'
+    user.call('POST /api/transport/rides', 'POST', '/api/transport/rides', {
+        'from_location': origin, 'to_location': destination, 'departure_time': departure,
+        'total_seats': user.rng.randint(1, 4), 'price_per_person': user.rng.choice([0, 30, 50])})
+
+
+def my_rides(user):
+    user.call('GET /api/transport/rides/my', 'GET', '/api/transport/rides/my')
+
+
+def list_issues(user):
+    status = user.rng.choice(['Pending', 'In Progress', ''])
+    user.call('GET /api/issues/', 'GET', f'/api/issues/?fields=card&status={quote(status)}' if status else '/api/issues/?fields=card')
+
+
+def issue_detail(user):
+    issue_id = user.rng.randint(1, user.world['issues'])
+    user.call('GET /api/issues/<id>', 'GET', f'/api/issues/{issue_id}')
+
+
+def upvote_issue(user):
+    issue_id = user.rng.randint(1, user.world['issues'])
+    user.call('POST /api/issues/<id>/upvote', 'POST', f'/api/issues/{issue_id}/upvote')
+
+
+def report_issue(user):
+    user.call('POST /api/issues/', 'POST', '/api/issues/', {
+        'category': user.rng.choice(ISSUE_CATEGORIES), 'title': 'Projector not working',
+        'description': 'The projector in room 204 does not turn on.', 'location': user.rng.choice(LOCATIONS[:4]),
+        'priority': user.rng.choice(['Low', 'Medium', 'High'])})
+
+
+def my_issues(user):
+    user.call('GET /api/issues/my', 'GET', '/api/issues/my')
+
+
+def search_lost_found(user):
+    term = user.rng.choice(['bottle', 'umbrella', 'card', 'charger', 'wallet', ''])
+    path = f'/api/lost-found/items?search={term}' if term else '/api/lost-found/items'
+    user.call('GET /api/lost-found/items', 'GET', path + ('&' if term else '?') + 'fields=card')
+
+
+def lost_found_detail(user):
+    item_id = user.rng.randint(1, user.world['lost_found'])
+    user.call('GET /api/lost-found/items/<id>', 'GET', f'/api/lost-found/items/{item_id}')
+
+
+def report_lost_item(user):
+    user.call('POST /api/lost-found/items', 'POST', '/api/lost-found/items', {
+        'type': user.rng.choice(['lost', 'found']), 'name': 'Blue notebook',
+        'description': 'Blue notebook with lecture notes', 'location': user.rng.choice(LOCATIONS[:4]),
+        'contact': f'{user.username}@college.edu'})
+
+
+def list_feedback(user):
+    user.call('GET /api/feedback/', 'GET', '/api/feedback/')
+
+
+def submit_feedback(user):
+    user.call('POST /api/feedback/', 'POST', '/api/feedback/', {
+        'category': user.rng.choice(FEEDBACK_CATEGORIES), 'rating': user.rng.randint(1, 5),
+        'text': 'The new timetable works well.'})
+
+
+def dashboard(user):
+    user.call('POST /api/batch', 'POST', '/api/batch', {'requests': [
+        {'id': 'overview', 'path': '/api/dashboard/overview'},
+        {'id': 'menu', 'path': '/api/cafeteria/menu'},
+        {'id': 'rides', 'path': '/api/transport/rides'},
+    ]})
+
+
+def recent_activity(user):
+    user.call('GET /api/dashboard/recent-activity', 'GET', '/api/dashboard/recent-activity')
+
+
+def admin_stats(user):
+    user.call('GET /api/dashboard/admin/stats', 'GET', '/api/dashboard/admin/stats')
+
+
+def module_stats(user):
+    path = user.rng.choice(['/api/issues/stats', '/api/feedback/stats', '/api/lost-found/stats', '/api/transport/stats'])
+    user.call(f'GET {path}', 'GET', path)
+
+
+def pending_orders(user):
+    status, payload = user.call('GET /api/cafeteria/admin/orders', 'GET', '/api/cafeteria/admin/orders?status=Pending')
+    if status == 200 and payload:
+        user.order_ids = [order['id'] for order in payload['orders']]
+
+
+def advance_order(user):
+    if not user.order_ids:
+        return pending_orders(user)
+    order_id = user.order_ids.pop(0)
+    user.call('PUT /api/cafeteria/admin/orders/<id>/status', 'PUT', f'/api/cafeteria/admin/orders/{order_id}/status',
+              {'status': user.rng.choice(['Preparing', 'Ready', 'Completed'])})
+
+
+def sales_report(user):
+    path = user.rng.choice(['/api/cafeteria/sales/top-items', '/api/cafeteria/sales/demand',
+                            '/api/cafeteria/sales/revenue', '/api/cafeteria/sales/forecast'])
+    query = ''
+    # Some reports over the whole year rather than the default 30 days
+    if not path.endswith('/forecast') and user.rng.random() < 0.3:
+        query = f'?from={(date.today() - timedelta(days=364)).isoformat()}'
+    user.call(f'GET {path}', 'GET', path + query)
+
+
+def triage_issue(user):
+    issue_id = user.rng.randint(1, user.world['issues'])
+    user.call('PUT /api/issues/<id>/status', 'PUT', f'/api/issues/{issue_id}/status',
+              {'status': user.rng.choice(['In Progress', 'Resolved'])})
+
+
+# scenario -> (log in as admin, [(action, weight)])
+SCENARIOS = {
+    'lunch_rush': (False, [
+        (browse_menu, 30), (place_order, 25), (my_orders, 20), (order_detail, 15), (cancel_order, 2), (dashboard, 8),
+    ]),
+    'friday_rides': (False, [
+        (search_rides, 40), (browse_rides, 10), (ride_detail, 15), (book_ride, 12), (my_bookings, 10),
+        (cancel_booking, 4), (offer_ride, 5), (my_rides, 4),
+    ]),
+    'admin_dashboard': (True, [
+        (admin_stats, 20), (module_stats, 25), (pending_orders, 15), (advance_order, 10), (list_issues, 15),
+        (triage_issue, 5), (list_feedback, 10), (sales_report, 15),
+    ]),
+    'campus_day': (False, [
+        (dashboard, 10), (recent_activity, 4), (browse_menu, 8), (place_order, 6), (my_orders, 4),
+        (search_rides, 8), (ride_detail, 4), (book_ride, 2), (my_bookings, 3), (offer_ride, 1),
+        (list_issues, 8), (issue_detail, 6), (upvote_issue, 3), (report_issue, 1), (my_issues, 3),
+        (search_lost_found, 6), (lost_found_detail, 3), (report_lost_item, 1),
+        (list_feedback, 4), (submit_feedback, 1), (module_stats, 4),
+    ]),
+}
+
+
+# --- Running and reporting --------------------------------------------------
+
+def discover(client):
+    """Row counts used to pick ids for detail requests"""
+    world = {}
+    for key, path, field in (('issues', '/api/issues/stats', 'total_issues'),
+                             ('lost_found', '/api/lost-found/stats', 'total_items'),
+                             ('rides', '/api/transport/stats', 'total_rides')):
+        status, _, payload = client.request('GET', path)
+        if status != 200:
+            raise RuntimeError(f'{path}: HTTP {status}')
+        world[key] = max(1, payload[field])
+    client.request('POST', '/api/auth/login', {'username': ADMIN, 'password': PASSWORD})
+    status, _, payload = client.request('GET', '/api/dashboard/admin/stats')
+    if status != 200:
+        raise RuntimeError(f'Log in as {ADMIN} failed; seed the database with benchmarks.dataset first')
+    world['users'] = payload['system_stats']['total_users']
+    return world
+
+
+def run(make_client, scenario, users, duration, think_seconds, seed=1):
+    as_admin, actions = SCENARIOS[scenario]
+    world = discover(make_client())
+    rng = random.Random(seed)
+
+    virtual_users = []
+    for i in range(users):
+        # Students 2..N; busier ones (low ids) are more likely, as in the seeded data
+        username = ADMIN if as_admin else f'student{int((world["users"] - 1) * rng.random() ** 2) + 2}'
+        user = VirtualUser(make_client(), username, random.Random(seed * 1000 + i), world)
+        user.login()
+        virtual_users.append(user)
+
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [threading.Thread(target=user.run, args=(actions, deadline, think_seconds)) for user in virtual_users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stats = Stats()
+    for user in virtual_users:
+        user.stats.latencies.pop('POST /api/auth/login', None)
+        stats.merge(user.stats)
+    return summarize(stats, elapsed, scenario, users, duration)
+
+
+def summarize(stats, elapsed, scenario, users, duration):
+    routes = {}
+    for route in sorted(set(stats.latencies) | set(stats.errors)):
+        latencies = sorted(stats.latencies.get(route, []))
+        routes[route] = {
+            'requests': len(latencies),
+            'errors': stats.errors.get(route, 0),
+            'rejected': stats.rejected.get(route, 0),
+            'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        }
+    everything = sorted(value for values in stats.latencies.values() for value in values)
+    return {
+        'scenario': scenario,
+        'users': users,
+        'duration': duration,
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'requests': len(everything),
+        'errors': sum(stats.errors.values()),
+        'rps': round(len(everything) / elapsed, 1),
+        'p50_ms': round(percentile(everything, 50) * 1000, 2),
+        'p95_ms': round(percentile(everything, 95) * 1000, 2),
+        'p99_ms': round(percentile(everything, 99) * 1000, 2),
+        'routes': routes,
+    }
+
+
+def print_report(result):
+    print(f"{'route':<46}{'requests':>9}{'errors':>7}{'4xx':>6}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, row in result['routes'].items():
+        print(f"{route:<46}{row['requests']:>9}{row['errors']:>7}{row['rejected']:>6}{row['rps']:>8}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}")
+    print(f"{'total':<46}{result['requests']:>9}{result['errors']:>7}{'':>6}{result['rps']:>8}"
+          f"{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}")
+
+
+def compare(result, baseline, tolerance):
+    """Print regressions against a baseline; returns how many there are"""
+    regressions = []
+    if result['rps'] < baseline['rps'] * (1 - tolerance):
+        regressions.append(f"throughput {baseline['rps']} -> {result['rps']} req/s")
+    for route, old in baseline['routes'].items():
+        new = result['routes'].get(route)
+        # Too few samples for a stable p95
+        if not new or old['requests'] < 20 or new['requests'] < 20:
+            continue
+        if new['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {old['p95_ms']} -> {new['p95_ms']} ms")
+        if new['errors'] > old['errors']:
+            regressions.append(f"{route}: errors {old['errors']} -> {new['errors']}")
+
+    print(f"\nCompared with baseline from {baseline.get('recorded_at', '?')} (tolerance {tolerance:.0%}):")
+    for line in regressions:
+        print(f'REGRESSION {line}')
+    if not regressions:
+        print('no regressions')
+    return len(regressions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive the API with a realistic request mix')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='campus_day')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='base URL of a running server, e.g. http://127.0.0.1:5000')
+    target.add_argument('--database-url', help='run in-process against this (seeded) database')
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run')
+    parser.add_argument('--think-ms', type=float, default=0, help='mean pause between a user\'s requests')
+    parser.add_argument('--output', help='also write the results as JSON to this file')
+    parser.add_argument('--save-baseline', action='store_true', help=f'save as {BASELINE_DIR}/<scenario>.json')
+    parser.add_argument('--compare', nargs='?', const='', metavar='FILE',
+                        help='compare with a baseline (default: the saved one for the scenario)')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed regression, as a fraction')
+    args = parser.parse_args()
+
+    if args.url:
+        def make_client():
+            return HttpClient(args.url)
+    else:
+        os.environ['DATABASE_URL'] = args.database_url
+        os.environ.pop('DATABASE_REPLICA_URL', None)
+        from app import app
+
+        def make_client():
+            return InProcessClient(app)
+
+    result = run(make_client, args.scenario, args.users, args.duration, args.think_ms / 1000)
+    result['mode'] = 'http' if args.url else 'in-process'
+    print_report(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    baseline_path = os.path.join(BASELINE_DIR, f'{args.scenario}.json')
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'Saved baseline to {baseline_path}')
+    if args.compare is not None:
+        with open(args.compare or baseline_path) as f:
+            return 1 if compare(result, json.load(f), args.tolerance) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Commute matching: in-memory ride index vs the SQL substring search
+
+Generates active future rides between the seeded campus locations, loads them
+into the ride index and into an indexed SQLite table, then answers the same
+"rides from A to B within ±window minutes of T" queries both ways and reports
+latency percentiles.
+
+    python -m benchmarks.ride_match [--rides 100000] [--queries 2000] [--window 30]
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from benchmarks.concurrency import percentile
+from benchmarks.dataset import LOCATIONS
+from ride_index import RideIndex
+
+RideRow = namedtuple('RideRow', 'id from_location to_location departure_time available_seats')
+
+
+def make_rides(count, rng, now):
+    rides = []
+    for ride_id in range(1, count + 1):
+        origin, destination = rng.sample(LOCATIONS, 2)
+        departure = now + timedelta(minutes=rng.randint(10, 60 * 24 * 14))
+        rides.append(RideRow(ride_id, origin, destination, departure, rng.randint(0, 4)))
+    return rides
+
+
+def time_queries(run, queries):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        run(*query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare ride index matching with SQL search')
+    parser.add_argument('--rides', type=int, default=100000, help='active future rides')
+    parser.add_argument('--queries', type=int, default=2000, help='match queries per method')
+    parser.add_argument('--window', type=int, default=30, help='± minutes around the requested time')
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    rides = make_rides(args.rides, rng, now)
+    queries = [(*rng.sample(LOCATIONS, 2), now + timedelta(minutes=rng.randint(60, 60 * 24 * 14)))
+               for _ in range(args.queries)]
+
+    started = time.perf_counter()
+    index = RideIndex()
+    index.rebuild(rides)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE rides (id INTEGER PRIMARY KEY, from_location TEXT, to_location TEXT, '
+                 'departure_time TEXT, available_seats INTEGER)')
+    conn.executemany('INSERT INTO rides VALUES (?, ?, ?, ?, ?)',
+                     [(r.id, r.from_location, r.to_location, r.departure_time.isoformat(' '), r.available_seats)
+                      for r in rides])
+    conn.execute('CREATE INDEX ix_rides_departure ON rides (departure_time)')
+
+    def sql_match(origin, destination, when):
+        window = timedelta(minutes=args.window)
+        return conn.execute(
+            'SELECT id FROM rides WHERE from_location LIKE ? AND to_location LIKE ? AND available_seats > 0 '
+            'AND departure_time BETWEEN ? AND ? ORDER BY departure_time LIMIT 20',
+            (f'%{origin}%', f'%{destination}%', (when - window).isoformat(' '), (when + window).isoformat(' '))
+        ).fetchall()
+
+    def index_match(origin, destination, when):
+        return index.match(origin, destination, when, args.window, 20)
+
+    print(f'{args.rides:,} rides, index built in {build_ms:.0f} ms')
+    print(f"{'method':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, run in (('sql', sql_match), ('index', index_match)):
+        latencies = time_queries(run, queries)
+        print(f'{name:<12}{percentile(latencies, 50):>10.3f}{percentile(latencies, 95):>10.3f}'
+              f'{percentile(latencies, 99):>10.3f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
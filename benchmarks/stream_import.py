@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Peak memory of reading a large localStorage export: json.load vs streaming
+
+Writes a synthetic export of the requested size, then reads every collection
+in a fresh subprocess per mode and reports records, time and peak RSS.
+
+    python -m benchmarks.stream_import --size-mb 1024
+    python -m benchmarks.stream_import --size-mb 1024 --modes stream   # skip json.load
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+COLLECTIONS = ['users', 'issues', 'feedback', 'lostFoundItems', 'orders', 'rides']
+
+
+def synthetic_record(collection, i, rng):
+    user_id = str(rng.randint(1, 5000))
+    created = f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00.000Z'
+    if collection == 'users':
+        return {'id': str(i), 'username': f'student{i}', 'email': f'student{i}@college.edu',
+                'password': 'password123', 'registeredAt': created}
+    if collection == 'issues':
+        return {'userId': user_id, 'category': 'Plumbing', 'title': f'Leaking tap #{i}',
+                'description': 'Water leaking in the washroom near the library. ' * 4,
+                'location': 'Block B', 'priority': 'Medium', 'status': 'Pending', 'upvotes': rng.randint(0, 40),
+                'createdAt': created}
+    if collection == 'feedback':
+        return {'userId': user_id, 'category': 'Cafeteria', 'rating': rng.randint(1, 5),
+                'text': 'The food quality has improved a lot this semester. ' * 3, 'createdAt': created}
+    if collection == 'lostFoundItems':
+        return {'userId': user_id, 'type': rng.choice(['lost', 'found']), 'name': 'Blue water bottle',
+                'description': 'Left in the seminar hall after the guest lecture.', 'location': 'Seminar Hall',
+                'contact': '98765 43210', 'createdAt': created}
+    if collection == 'orders':
+        return {'id': str(i), 'userId': user_id, 'status': 'Completed', 'total': 90, 'createdAt': created,
+                'items': [{'name': 'Coffee', 'price': 30, 'quantity': 1}, {'name': 'Club Sandwich', 'price': 40, 'quantity': 1},
+                          {'name': 'Tea', 'price': 20, 'quantity': 1}]}
+    return {'id': str(i), 'userId': user_id, 'from': 'Main Gate', 'to': 'Railway Station', 'dateTime': created,
+            'seats': 4, 'availableSeats': 2, 'price': 50, 'createdAt': created,
+            'passengers': [{'userId': str(rng.randint(1, 5000)), 'bookedAt': created} for _ in range(2)]}
+
+
+def generate(path, size_mb):
+    """Write an export of roughly ``size_mb`` megabytes without holding it in memory"""
+    rng = random.Random(7)
+    per_collection = size_mb * 1024 * 1024 // len(COLLECTIONS)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for index, collection in enumerate(COLLECTIONS):
+            f.write(('' if index == 0 else ',') + json.dumps(collection) + ': [')
+            written = 0
+            i = 0
+            while written < per_collection:
+                record = json.dumps(synthetic_record(collection, i, rng))
+                f.write((',' if i else '') + record)
+                written += len(record) + 1
+                i += 1
+            f.write(']')
+        f.write('}')
+
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(mode, path):
+    started = time.perf_counter()
+    records = 0
+    if mode == 'json.load':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for collection in COLLECTIONS:
+            records += len(data.get(collection, []))
+    else:
+        from json_stream import iter_collection
+        for collection in COLLECTIONS:
+            for _ in iter_collection(path, collection):
+                records += 1
+    print(json.dumps({'mode': mode, 'records': records, 'seconds': round(time.perf_counter() - started, 2),
+                      'peak_rss_mb': round(peak_rss_mb(), 1)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--modes', default='stream,json.load')
+    parser.add_argument('--file', help='reuse an existing export instead of generating one')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.file)
+        return
+
+    path = args.file
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(prefix='stream-import-'), 'localStorage_data.json')
+        print(f'Generating {args.size_mb} MB export at {path} ...')
+        generate(path, args.size_mb)
+    print(f'File size: {os.path.getsize(path) / (1024 * 1024):.0f} MB')
+
+    for mode in args.modes.split(','):
+        result = subprocess.run([sys.executable, '-m', 'benchmarks.stream_import', '--measure', mode, '--file', path],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f'{mode:>10}: failed ({result.stderr.strip().splitlines()[-1] if result.stderr else result.returncode})')
+            continue
+        stats = json.loads(result.stdout)
+        print(f"{mode:>10}: {stats['records']:,} records in {stats['seconds']}s, peak RSS {stats['peak_rss_mb']} MB")
+
+    if not args.file:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
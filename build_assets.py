@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Frontend build: minify, fingerprint and precompress the static assets.
+
+Reads index.html, dashboard.html and admin.html, processes every local file
+they reference (and the images referenced from CSS), and writes to dist/:
+
+- CSS and JS minified (rcssmin / rjsmin when installed, otherwise a
+  conservative built-in pass that only drops comments and whitespace)
+- JPEG/PNG images re-encoded and capped in size when Pillow is installed
+- every asset renamed to ``name.<hash>.ext`` and references rewritten
+- ``.gz`` and ``.br`` (when brotli is installed) siblings for text files
+- asset-manifest.json mapping source names to built names
+
+Then prints the bytes transferred per page load before and after.
+
+    python build_assets.py [--out dist] [--no-images]
+
+Serve the result with STATIC_DIST_FOLDER=dist (see static_assets.py).
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+
+from static_assets import MANIFEST, fingerprint_name
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGES = ['index.html', 'dashboard.html', 'admin.html']
+TEXT_EXTENSIONS = {'.html', '.css', '.js', '.json', '.svg'}
+
+# Menu photos are shown about 300px wide, so 640px covers high-density screens;
+# the page background is full-width
+IMAGE_MAX_WIDTH = {'shahil.jpg': 1920}
+DEFAULT_IMAGE_MAX_WIDTH = 640
+JPEG_QUALITY = 80
+
+HTML_REFERENCE = re.compile(r'''(\b(?:src|href)=["'])([^"'#?]+)(["'])''')
+CSS_REFERENCE = re.compile(r'''(url\(\s*["']?)([^"')#?]+)(["']?\s*\))''')
+
+
+def is_local(reference):
+    return not re.match(r'^(?:[a-z]+:|//|/)', reference) and not reference.endswith('.html')
+
+
+# --- Minification -----------------------------------------------------------
+
+def _skip_string(source, i):
+    """Index just past the quoted string starting at source[i]"""
+    quote = source[i]
+    i += 1
+    while i < len(source) and source[i] != quote:
+        i += 2 if source[i] == '\\' else 1
+    return i + 1
+
+
+def minify_css(source):
+    if rcssmin is not None:
+        return rcssmin.cssmin(source)
+
+    # Alternating code and quoted-string segments; only code is rewritten
+    segments = []
+    code = []
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char in '"\'':
+            end = _skip_string(source, i)
+            segments += [_compact_css(''.join(code)), source[i:end]]
+            code = []
+            i = end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = len(source) if end == -1 else end + 2
+        else:
+            code.append(char)
+            i += 1
+    segments.append(_compact_css(''.join(code)))
+    return ''.join(segments).strip()
+
+
+def _compact_css(code):
+    code = re.sub(r'\s+', ' ', code)
+    # Only around punctuation where whitespace is never significant
+    code = re.sub(r' ?([{};,>]) ?', r'\1', code)
+    code = code.replace(': ', ':').replace(';}', '}')
+    return code
+
+
+# A '/' after these (or at the start) begins a regex literal rather than a division
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = ('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void', 'delete', 'new', 'throw')
+
+
+def _regex_allowed(out):
+    text = ''.join(out[-12:]).rstrip()
+    if not text:
+        return True
+    if text[-1] in REGEX_PRECEDERS:
+        return True
+    return any(text.endswith(keyword) and (len(text) == len(keyword) or not (text[-len(keyword) - 1].isalnum() or text[-len(keyword) - 1] in '_$'))
+               for keyword in REGEX_KEYWORDS)
+
+
+def _skip_regex(source, i):
+    i += 1
+    in_class = False
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            i += 1
+            while i < len(source) and source[i].isalpha():
+                i += 1
+            return i
+        elif char == '\n':
+            break
+        i += 1
+    return i
+
+
+def minify_js(source):
+    """Drop comments, indentation and blank lines; line breaks are kept so ASI still applies"""
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+
+    out = []
+    # Each entry is the brace depth of an open ${ ... } inside a template literal
+    template_stack = []
+    depth = 0
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char in '"\'':
+            end = _skip_string(source, i)
+            out.append(source[i:end])
+            i = end
+        elif char == '`' or (char == '}' and template_stack and template_stack[-1] == depth):
+            if char == '}':
+                template_stack.pop()
+            # Copy template text up to the closing backtick or the next ${
+            start = i
+            i += 1
+            while i < len(source):
+                if source[i] == '\\':
+                    i += 2
+                elif source[i] == '`':
+                    i += 1
+                    break
+                elif source.startswith('${', i):
+                    i += 2
+                    template_stack.append(depth)
+                    break
+                else:
+                    i += 1
+            out.append(source[start:i])
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = len(source) if end == -1 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = len(source) if end == -1 else end + 2
+            out.append(' ')
+        elif char == '/' and _regex_allowed(out):
+            end = _skip_regex(source, i)
+            out.append(source[i:end])
+            i = end
+        else:
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+            out.append(char)
+            i += 1
+
+    lines = (re.sub(r'[ \t]+', ' ', line).strip() for line in ''.join(out).split('\n'))
+    return '\n'.join(line for line in lines if line) + '\n'
+
+
+# --- Images -----------------------------------------------------------------
+
+def optimize_image(name, data):
+    """Re-encode a JPEG/PNG at a capped width; keeps the original if that is smaller"""
+    if Image is None or not name.lower().endswith(('.jpg', '.jpeg', '.png')):
+        return data
+
+    with Image.open(io.BytesIO(data)) as image:
+        max_width = IMAGE_MAX_WIDTH.get(name, DEFAULT_IMAGE_MAX_WIDTH)
+        if image.width > max_width:
+            image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if name.lower().endswith('.png'):
+            image.save(buffer, 'PNG', optimize=True)
+        else:
+            image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+    optimized = buffer.getvalue()
+    return optimized if len(optimized) < len(data) else data
+
+
+# --- Build ------------------------------------------------------------------
+
+def precompress(path, data):
+    """Write .gz / .br siblings for text assets; returns their sizes"""
+    sizes = {}
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        with open(path + '.gz', 'wb') as f:
+            f.write(compressed)
+        sizes['gzip'] = len(compressed)
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(path + '.br', 'wb') as f:
+                f.write(compressed)
+            sizes['br'] = len(compressed)
+    return sizes
+
+
+class Build:
+    def __init__(self, out_dir, optimize_images=True):
+        self.out_dir = out_dir
+        self.optimize_images = optimize_images
+        self.manifest = {}
+        self.sizes = {}  # source name -> {'original', 'built', 'gzip', 'br'}
+        self.references = {}  # source name -> local files it references
+
+    def read(self, name):
+        with open(os.path.join(SOURCE_DIR, name), 'rb') as f:
+            return f.read()
+
+    def write(self, source, built, data):
+        path = os.path.join(self.out_dir, built)
+        with open(path, 'wb') as f:
+            f.write(data)
+        sizes = {'original': len(self.read(source)), 'built': len(data)}
+        if os.path.splitext(built)[1] in TEXT_EXTENSIONS:
+            sizes.update(precompress(path, data))
+        self.sizes[source] = sizes
+
+    def rewrite(self, text, pattern):
+        return pattern.sub(lambda m: m.group(1) + self.manifest.get(m.group(2), m.group(2)) + m.group(3), text)
+
+    def asset(self, name):
+        """Build one referenced file (and what it references) and return its fingerprinted name"""
+        if name in self.manifest:
+            return self.manifest[name]
+
+        data = self.read(name)
+        extension = os.path.splitext(name)[1]
+        if extension == '.css':
+            text = data.decode('utf-8')
+            self.references[name] = [m.group(2) for m in CSS_REFERENCE.finditer(text) if is_local(m.group(2))]
+            for reference in self.references[name]:
+                self.asset(reference)
+            data = self.rewrite(minify_css(text), CSS_REFERENCE).encode('utf-8')
+        elif extension == '.js':
+            data = minify_js(data.decode('utf-8')).encode('utf-8')
+        elif self.optimize_images:
+            data = optimize_image(name, data)
+
+        built = fingerprint_name(name, hashlib.sha256(data).hexdigest())
+        self.manifest[name] = built
+        self.write(name, built, data)
+        return built
+
+    def page(self, name):
+        text = self.read(name).decode('utf-8')
+        self.references[name] = [m.group(2) for m in HTML_REFERENCE.finditer(text) if is_local(m.group(2))]
+        for reference in self.references[name]:
+            self.asset(reference)
+        self.write(name, name, self.rewrite(text, HTML_REFERENCE).encode('utf-8'))
+
+    def run(self):
+        if os.path.isdir(self.out_dir):
+            shutil.rmtree(self.out_dir)
+        os.makedirs(self.out_dir)
+        for name in PAGES:
+            self.page(name)
+        with open(os.path.join(self.out_dir, MANIFEST), 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+
+    def page_files(self, name, seen=None):
+        seen = seen if seen is not None else set()
+        if name not in seen:
+            seen.add(name)
+            for reference in self.references.get(name, []):
+                self.page_files(reference, seen)
+        return seen
+
+    def report(self):
+        """Bytes a first visit to each page downloads, before and after the build"""
+        print(f"{'Page':<16}{'original':>12}{'minified':>12}{'gzip':>12}{'brotli':>12}{'saved':>9}")
+        for page in PAGES:
+            totals = {'original': 0, 'built': 0, 'gzip': 0, 'br': 0}
+            for name in self.page_files(page):
+                sizes = self.sizes[name]
+                totals['original'] += sizes['original']
+                totals['built'] += sizes['built']
+                totals['gzip'] += sizes.get('gzip', sizes['built'])
+                totals['br'] += sizes.get('br', sizes.get('gzip', sizes['built']))
+            best = min(totals['gzip'], totals['br'])
+            saved = 1 - best / totals['original'] if totals['original'] else 0
+            print(f"{page:<16}{totals['original']:>12,}{totals['built']:>12,}{totals['gzip']:>12,}"
+                  f"{totals['br']:>12,}{saved:>9.1%}")
+        if brotli is None:
+            print('(brotli not installed: no .br files written, brotli column shows gzip)')
+        if Image is None:
+            print('(Pillow not installed: images copied unchanged)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Minify, fingerprint and precompress the frontend assets')
+    parser.add_argument('--out', default=os.path.join(SOURCE_DIR, 'dist'), help='output directory')
+    parser.add_argument('--no-images', action='store_true', help='copy images without re-encoding')
+    args = parser.parse_args()
+
+    build = Build(args.out, optimize_images=not args.no_images)
+    build.run()
+    print(f'Built {len(build.manifest)} assets and {len(PAGES)} pages into {args.out}')
+    build.report()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,9 @@
 from flask import Blueprint, request, jsonify, session
-from models import Order, OrderItem, User, db
+from models import Order, OrderArchive, OrderItem, User, db
+from fieldsets import parse_fields, project
+from conditional import check_row, is_current, not_modified, row_response, with_validators
+from archive import date_range, list_version_with_archive, paginate_with_archive, reaches_archive, within
+from sales import change_status, record_order
 from decimal import Decimal
 
 cafeteria_bp = Blueprint('cafeteria', __name__)
@@ -13,6 +17,12 @@ MENU_ITEMS = {
     'Tea': {'price': 20, 'category': 'Beverages'}
 }
 
+def filter_orders(query, model, status, start, end):
+    """The order list filters, for orders or the order archive"""
+    if status:
+        query = query.filter(model.status == status)
+    return within(query, model.created_at, start, end)
+
 def require_auth(f):
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
@@ -70,6 +80,7 @@ def place_order():
         db.session.flush()  # Get the order ID
         
         # Create order items
+        items = []
         for item_data in order_items:
             order_item = OrderItem(
                 order_id=order.id,
@@ -78,7 +89,9 @@ def place_order():
                 price=item_data['price']
             )
             db.session.add(order_item)
+            items.append(order_item)
         
+        record_order(order, items)
         db.session.commit()
         
         return jsonify({
@@ -97,13 +110,35 @@ def get_user_orders():
         user_id = session['user_id']
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        status = request.args.get('status')
         
-        orders = Order.query.filter_by(user_id=user_id)\
-                          .order_by(Order.created_at.desc())\
-                          .paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            start, end = date_range(request.args)
+        except ValueError:
+            return jsonify({'error': 'Invalid date format'}), 400
         
-        return jsonify({
-            'orders': [order.to_dict() for order in orders.items],
+        try:
+            fields = parse_fields(Order, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = filter_orders(project(Order.query, Order, fields).filter_by(user_id=user_id), Order, status, start, end)
+        
+        # Archived orders are only read when the from date reaches back to them
+        archive = None
+        if reaches_archive(OrderArchive, start):
+            archive = filter_orders(project(OrderArchive.query, OrderArchive, fields).filter_by(user_id=user_id),
+                                    OrderArchive, status, start, end)\
+                          .order_by(OrderArchive.created_at.desc())
+        
+        totals, etag = list_version_with_archive(query, Order, archive, OrderArchive)
+        if is_current(etag):
+            return not_modified(etag)
+        
+        orders = paginate_with_archive(query.order_by(Order.created_at.desc()), archive, page, per_page, totals)
+        
+        return with_validators(jsonify({
+            'orders': [order.to_dict(fields) for order in orders.items],
             'pagination': {
                 'page': orders.page,
                 'pages': orders.pages,
@@ -112,7 +147,7 @@ def get_user_orders():
                 'has_next': orders.has_next,
                 'has_prev': orders.has_prev
             }
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve orders'}), 500
@@ -122,12 +157,23 @@ def get_user_orders():
 def get_order(order_id):
     try:
         user_id = session['user_id']
+        cached = check_row(Order, order_id, Order.user_id == user_id)
+        if cached is not None:
+            return cached
+        
         order = Order.query.filter_by(id=order_id, user_id=user_id).first()
         
+        # Archived orders keep their ids
+        if not order:
+            cached = check_row(OrderArchive, order_id, OrderArchive.user_id == user_id)
+            if cached is not None:
+                return cached
+            order = OrderArchive.query.filter_by(id=order_id, user_id=user_id).first()
+        
         if not order:
             return jsonify({'error': 'Order not found'}), 404
         
-        return jsonify({'order': order.to_dict()}), 200
+        return row_response({'order': order.to_dict()}, order), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve order'}), 500
@@ -145,7 +191,9 @@ def cancel_order(order_id):
         if order.status != 'Pending':
             return jsonify({'error': 'Cannot cancel order that is not pending'}), 400
         
-        order.status = 'Cancelled'
+        if not change_status(order, 'Cancelled'):
+            db.session.rollback()
+            return jsonify({'error': 'Cannot cancel order that is not pending'}), 400
         db.session.commit()
         
         return jsonify({
@@ -171,15 +219,32 @@ def get_all_orders():
         per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status')
         
-        query = Order.query
-        if status:
-            query = query.filter_by(status=status)
+        try:
+            start, end = date_range(request.args)
+        except ValueError:
+            return jsonify({'error': 'Invalid date format'}), 400
         
-        orders = query.order_by(Order.created_at.desc())\
-                     .paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            fields = parse_fields(Order, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({
-            'orders': [order.to_dict() for order in orders.items],
+        query = filter_orders(project(Order.query, Order, fields), Order, status, start, end)
+        
+        # Archived orders are only read when the from date reaches back to them
+        archive = None
+        if reaches_archive(OrderArchive, start):
+            archive = filter_orders(project(OrderArchive.query, OrderArchive, fields), OrderArchive, status, start, end)\
+                          .order_by(OrderArchive.created_at.desc())
+        
+        totals, etag = list_version_with_archive(query, Order, archive, OrderArchive)
+        if is_current(etag):
+            return not_modified(etag)
+        
+        orders = paginate_with_archive(query.order_by(Order.created_at.desc()), archive, page, per_page, totals)
+        
+        return with_validators(jsonify({
+            'orders': [order.to_dict(fields) for order in orders.items],
             'pagination': {
                 'page': orders.page,
                 'pages': orders.pages,
@@ -188,7 +253,7 @@ def get_all_orders():
                 'has_next': orders.has_next,
                 'has_prev': orders.has_prev
             }
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve orders'}), 500
@@ -212,7 +277,9 @@ def update_order_status(order_id):
         if not order:
             return jsonify({'error': 'Order not found'}), 404
         
-        order.status = new_status
+        if not change_status(order, new_status):
+            db.session.rollback()
+            return jsonify({'error': 'Order status was changed by another request, try again'}), 409
         db.session.commit()
         
         return jsonify({
@@ -0,0 +1,159 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+Brotli is preferred when the ``brotli`` package is installed and the client
+accepts it, gzip otherwise. Small bodies, non-text content, responses that
+already carry a Content-Encoding and files sent with send_file are left alone.
+Streamed responses (such as admin exports) are compressed chunk by chunk and
+flushed after every chunk, so they keep streaming.
+
+Bytes in and out, CPU time and the compression ratio are recorded per route
+in /api/metrics, along with why responses were skipped, to tune
+COMPRESSION_MIN_SIZE.
+"""
+
+import gzip
+import time
+import zlib
+from flask import current_app, request
+import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+}
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+def choose_encoding(accepted=None):
+    """Preferred encoding from the request's Accept-Encoding (or a parsed ``accepted`` header)"""
+    if accepted is None:
+        accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def skip_reason(response):
+    """Why a response should be sent as it is, or None to compress it"""
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return 'status'
+    if response.direct_passthrough:
+        return 'file'
+    if 'Content-Encoding' in response.headers:
+        return 'encoded'
+    if response.cache_control.no_transform:
+        return 'no_transform'
+    if not is_compressible(response.mimetype):
+        return 'mimetype'
+    if not response.is_streamed and response.content_length is not None \
+            and response.content_length < current_app.config['COMPRESSION_MIN_SIZE']:
+        return 'small'
+    return None
+
+
+def compress_body(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESSION_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESSION_GZIP_LEVEL'], mtime=0)
+
+
+def compressor(encoding, config):
+    """(compress, flush, finish) functions for one incremental stream"""
+    if encoding == 'br':
+        stream = brotli.Compressor(quality=config['COMPRESSION_BROTLI_QUALITY'])
+        return stream.process, stream.flush, stream.finish
+    # wbits 16 + MAX_WBITS writes a gzip header and trailer
+    stream = zlib.compressobj(config['COMPRESSION_GZIP_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return stream.compress, lambda: stream.flush(zlib.Z_SYNC_FLUSH), stream.flush
+
+
+def record(route_labels, original, compressed, cpu_seconds):
+    metrics.inc('http_response_bytes_total', route_labels + (('stage', 'uncompressed'),), original)
+    metrics.inc('http_response_bytes_total', route_labels + (('stage', 'compressed'),), compressed)
+    metrics.inc('http_response_compression_seconds_total', route_labels, cpu_seconds)
+    if compressed:
+        metrics.observe('http_response_compression_ratio', route_labels, original / compressed)
+
+
+def stream_compressed(chunks, encoding, config, route_labels):
+    compress, flush, finish = compressor(encoding, config)
+    original = compressed = 0
+    cpu_seconds = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if not chunk:
+                continue
+            started = time.thread_time()
+            # Flush per chunk so the client receives each piece as it is produced
+            data = compress(chunk) + flush()
+            cpu_seconds += time.thread_time() - started
+            original += len(chunk)
+            compressed += len(data)
+            yield data
+
+        data = finish()
+        compressed += len(data)
+        yield data
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+        record(route_labels, original, compressed, cpu_seconds)
+
+
+def compress_response(response):
+    route_labels = metrics.route_labels()
+    reason = skip_reason(response)
+    encoding = choose_encoding() if reason is None else None
+    if reason is None and encoding is None:
+        reason = 'not_accepted'
+    if is_compressible(response.mimetype):
+        response.vary.add('Accept-Encoding')
+    if reason:
+        metrics.inc('http_response_compression_skipped_total', route_labels + (('reason', reason),))
+        return response
+
+    config = current_app.config
+    if response.is_streamed:
+        response.response = stream_compressed(response.response, encoding, config, route_labels)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESSION_MIN_SIZE']:
+            metrics.inc('http_response_compression_skipped_total', route_labels + (('reason', 'small'),))
+            return response
+
+        started = time.thread_time()
+        compressed = compress_body(data, encoding, config)
+        cpu_seconds = time.thread_time() - started
+        record(route_labels, len(data), len(compressed), cpu_seconds)
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+
+    response.content_encoding = encoding
+    # The compressed bytes differ from what a strong validator was computed on
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Register the compression hook; call before other after_request hooks so it runs last"""
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+    app.after_request(compress_response)
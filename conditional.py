@@ -0,0 +1,109 @@
+"""
+Conditional GET for the detail and list endpoints.
+
+Weak ETags are derived from row versions instead of from the response body, so
+a matching ``If-None-Match`` is answered with 304 before any row is loaded or
+serialized:
+
+- a detail ETag is the row's id and ``updated_at`` (``created_at`` for rows
+  that are never edited). It is looked up with a single-column query, only
+  when the request carries a validator.
+- a list ETag is a watermark of the filtered result set: count, max(id) and
+  max(updated_at), from one aggregate query that also stands in for the
+  pagination count, plus the path and query string (page, filters, fields).
+
+Every UPDATE through the ORM, bulk ``query.update()`` included, bumps
+``updated_at``, so any edit, insert or delete changes the watermark.
+"""
+
+import hashlib
+from flask import current_app, jsonify, request
+from sqlalchemy import func
+from models import db
+
+
+def version_column(model):
+    return model.updated_at if hasattr(model, 'updated_at') else model.created_at
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:24]
+
+
+def has_validators():
+    return bool(request.if_none_match) or request.if_modified_since is not None
+
+
+def is_current(etag, last_modified=None):
+    """Whether the client's cached copy matches; If-None-Match takes precedence"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have whole-second resolution
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def with_validators(response, etag, last_modified=None):
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Cache, but revalidate on every use
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+# --- Detail endpoints -------------------------------------------------------
+
+def row_etag(model, row_id, version):
+    return make_etag(model.__tablename__, row_id, version)
+
+
+def check_row(model, row_id, *criteria):
+    """A 304 response when the client's copy of a row is current, else None
+
+    Only the version column is queried, and only if the request is conditional.
+    """
+    if not has_validators():
+        return None
+    version = db.session.query(version_column(model)).filter(model.id == row_id, *criteria).scalar()
+    if version is None:
+        return None
+    etag = row_etag(model, row_id, version)
+    return not_modified(etag, version) if is_current(etag, version) else None
+
+
+def row_response(payload, row):
+    """jsonify(payload) with the ETag and Last-Modified of ``row``"""
+    model = type(row)
+    version = getattr(row, version_column(model).key)
+    return with_validators(jsonify(payload), row_etag(model, row.id, version), version)
+
+
+# --- List endpoints ---------------------------------------------------------
+
+def list_etag(path, query_string, *watermark):
+    return make_etag(path, query_string, *watermark)
+
+
+def list_version(query, model, *related):
+    """(total, etag) for a filtered list query from one aggregate over its rows
+
+    ``related`` are further models already joined into ``query`` whose
+    versions are part of each item (e.g. the ride nested in a booking).
+    """
+    columns = [func.count(model.id), func.max(model.id), func.max(version_column(model))]
+    columns += [func.max(version_column(other)) for other in related]
+    total, *versions = query.order_by(None).with_entities(*columns).one()
+    return total, list_etag(request.path, request.query_string, total, *versions)
+
+
+def paginate(query, page, per_page, total):
+    """query.paginate() reusing the count from list_version() instead of counting again"""
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False, count=False)
+    pagination.total = total
+    return pagination
@@ -5,6 +5,82 @@ class Config:
     # Database configuration
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'mysql+pymysql://root:@localhost/college_portal'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', 'True').lower() == 'true'  # apply migrations on first request
+    
+    # Read replica (optional). Read-only endpoints are served from it when set.
+    SQLALCHEMY_BINDS = {'replica': os.environ['DATABASE_REPLICA_URL']} if os.environ.get('DATABASE_REPLICA_URL') else {}
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+    REPLICA_READ_ENDPOINTS = [
+        '*stats',
+        'dashboard.*',
+        'issues.get_issues', 'issues.get_my_issues',
+        'feedback.get_feedback', 'feedback.get_my_feedback',
+        'lost_found.get_items', 'lost_found.get_my_items',
+        'transport.get_rides', 'transport.match_rides', 'transport.get_my_rides', 'transport.get_my_bookings',
+        'cafeteria.get_user_orders', 'cafeteria.get_all_orders',
+        'admin.export_table', 'sales.*'
+    ]
+    
+    # SQL profiling and slow-query log
+    SQL_PROFILING_ENABLED = os.environ.get('SQL_PROFILING_ENABLED', 'True').lower() == 'true'
+    SQL_PROFILE_SAMPLE_RATE = float(os.environ.get('SQL_PROFILE_SAMPLE_RATE', 0.05))
+    SQL_PROFILE_TOP_N = int(os.environ.get('SQL_PROFILE_TOP_N', 5))
+    SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 200))
+    SQL_SLOW_QUERY_LOG = os.environ.get('SQL_SLOW_QUERY_LOG')  # file path; defaults to the root logger
+    
+    # Metrics (/api/metrics). Set METRICS_MULTIPROC_DIR under gunicorn so workers are merged.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')
+    METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token for scrapers; admins can always read
+    
+    # Health checks
+    HEALTH_PROBE_CACHE_SECONDS = float(os.environ.get('HEALTH_PROBE_CACHE_SECONDS', 5))
+    HEALTH_MIN_FREE_DISK_MB = int(os.environ.get('HEALTH_MIN_FREE_DISK_MB', 100))
+    
+    # /api/batch
+    BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+    
+    # Response compression (gzip, or brotli when installed)
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))  # bytes
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+    
+    # Background jobs (scheduler.py), one thread per worker
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'True').lower() == 'true'
+    RIDE_SWEEP_INTERVAL_SECONDS = float(os.environ.get('RIDE_SWEEP_INTERVAL_SECONDS', 60))
+    RIDE_SWEEP_CHUNK_SIZE = int(os.environ.get('RIDE_SWEEP_CHUNK_SIZE', 500))  # rides per transaction
+    RIDE_SWEEP_MAX_CHUNKS = int(os.environ.get('RIDE_SWEEP_MAX_CHUNKS', 20))  # per run
+    
+    # Commute matching: the in-memory ride index is rebuilt from the database this often
+    RIDE_INDEX_REFRESH_SECONDS = float(os.environ.get('RIDE_INDEX_REFRESH_SECONDS', 60))
+    
+    # Ride waitlists: how long a freed seat is held for the next passenger (holds are
+    # expired by a timer thread started with the scheduler), and /api/transport/events
+    RIDE_HOLD_SECONDS = int(os.environ.get('RIDE_HOLD_SECONDS', 600))
+    RIDE_EVENTS_KEEPALIVE_SECONDS = float(os.environ.get('RIDE_EVENTS_KEEPALIVE_SECONDS', 15))
+    RIDE_EVENTS_STREAM_SECONDS = float(os.environ.get('RIDE_EVENTS_STREAM_SECONDS', 300))  # then the client reconnects
+    # asgi.py serves /api/transport/events natively; set this to also serve it from Flask,
+    # only with threaded or async workers (gunicorn --threads / gevent), as each stream holds one
+    RIDE_EVENTS_WSGI = os.environ.get('RIDE_EVENTS_WSGI', 'False').lower() == 'true'
+    
+    # Archival (archive.py): finished orders and feedback older than ARCHIVE_AFTER_DAYS move
+    # to archive tables daily at ARCHIVE_AT (UTC)
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+    ARCHIVE_AT = os.environ.get('ARCHIVE_AT', '03:00')
+    ARCHIVE_CHUNK_SIZE = int(os.environ.get('ARCHIVE_CHUNK_SIZE', 1000))  # rows per transaction
+    ARCHIVE_MAX_CHUNKS = int(os.environ.get('ARCHIVE_MAX_CHUNKS', 50))  # per table per run
+    
+    # Cafeteria demand forecasts (forecast.py, needs numpy), refreshed daily at FORECAST_AT (UTC)
+    # from the last FORECAST_HISTORY_WEEKS weeks of the hourly sales rollup
+    FORECAST_AT = os.environ.get('FORECAST_AT', '02:00')
+    FORECAST_HISTORY_WEEKS = int(os.environ.get('FORECAST_HISTORY_WEEKS', 8))
+    FORECAST_DAYS = int(os.environ.get('FORECAST_DAYS', 7))
+    FORECAST_SMOOTHING = float(os.environ.get('FORECAST_SMOOTHING', 0.1))  # weight of the latest week, 0-1
+    
+    # Admin exports: rows fetched from the server-side cursor per batch
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
     
     # Security configuration
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-in-production'
@@ -17,8 +93,14 @@ class Config:
     
     # File upload configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    UPLOAD_FOLDER = 'uploads'
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 2))  # threads generating thumbnails
+    UPLOAD_MAX_PIXELS = int(os.environ.get('UPLOAD_MAX_PIXELS', 40_000_000))  # larger images get no variants
+    UPLOAD_CACHE_SECONDS = 365 * 24 * 3600  # uploads are content-addressed, so never change
+    
+    # Built frontend (python build_assets.py) served at / with precompressed files
+    STATIC_DIST_FOLDER = os.environ.get('STATIC_DIST_FOLDER')  # e.g. 'dist'
     
     # Pagination
     ITEMS_PER_PAGE = 20
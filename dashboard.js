@@ -26,6 +26,7 @@ function initializeDashboard() {
     
     // Load dashboard data
     loadDashboardStats();
+    loadDashboardFromApi();
     loadRecentActivity();
     loadMyIssues();
     loadLostFoundItems();
@@ -177,6 +178,21 @@ function loadDashboardStats() {
     document.getElementById('totalOrders').textContent = userOrders.length;
 }
 
+// Refresh the stat cards from the backend in a single batched request, when it is reachable
+async function loadDashboardFromApi() {
+    try {
+        const { overview } = await apiService.loadDashboard();
+        if (!overview || overview.error) return;
+        
+        document.getElementById('totalIssues').textContent = overview.stats.total_issues;
+        document.getElementById('pendingIssues').textContent = overview.stats.pending_issues;
+        document.getElementById('resolvedIssues').textContent = overview.stats.resolved_issues;
+        document.getElementById('totalOrders').textContent = overview.stats.total_orders;
+    } catch (error) {
+        // Backend not available: keep the locally computed stats
+    }
+}
+
 function loadRecentActivity() {
     const issues = JSON.parse(localStorage.getItem('issues') || '[]');
     const orders = JSON.parse(localStorage.getItem('orders') || '[]');
@@ -383,6 +399,7 @@ function loadMyIssues() {
                 <span><i class="fas fa-calendar"></i> ${formatDate(issue.createdAt)}</span>
                 <span><i class="fas fa-exclamation"></i> ${issue.priority}</span>
             </div>
+            ${issue.thumbnail_url ? `<img class="issue-thumbnail" src="${apiService.mediaURL(issue.thumbnail_url)}" loading="lazy" alt="Issue photo">` : ''}
             <div class="issue-description">${issue.description}</div>
             <div class="issue-actions">
                 <button onclick="upvoteIssue('${issue.id}')" class="btn btn-sm btn-primary">
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify, session
-from models import User, Issue, Order, Feedback, LostFoundItem, Ride, RideBooking, db
+from models import User, Issue, Order, Feedback, LostFoundItem, Ride, RideBooking, ArchiveUserStats, db
+from fieldsets import project
+from archive import archived_order_total, feedback_counts, feedback_summary
 from datetime import datetime, timedelta
 
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -22,11 +24,13 @@ def get_dashboard_stats():
         user_issues = Issue.query.filter_by(user_id=user_id).count()
         user_pending_issues = Issue.query.filter_by(user_id=user_id, status='Pending').count()
         user_resolved_issues = Issue.query.filter_by(user_id=user_id, status='Resolved').count()
-        user_orders = Order.query.filter_by(user_id=user_id).count()
-        user_feedback = Feedback.query.filter_by(user_id=user_id).count()
+        archived = db.session.get(ArchiveUserStats, user_id)
+        user_orders = Order.query.filter_by(user_id=user_id).count() + (archived.orders if archived else 0)
+        user_feedback = Feedback.query.filter_by(user_id=user_id).count() + (archived.feedback if archived else 0)
         user_lost_found = LostFoundItem.query.filter_by(user_id=user_id).count()
         user_rides_offered = Ride.query.filter_by(driver_id=user_id).count()
-        user_rides_booked = RideBooking.query.filter_by(passenger_id=user_id, status='Confirmed').count()
+        user_rides_booked = RideBooking.query.filter_by(passenger_id=user_id)\
+                                          .filter(RideBooking.status.in_(RideBooking.BOOKED_STATUSES)).count()
         
         return jsonify({
             'user_stats': {
@@ -158,7 +162,7 @@ def get_dashboard_overview():
         upcoming_rides = []
         
         # Rides user is driving
-        driving_rides = Ride.query.filter_by(driver_id=user_id, status='Active')\
+        driving_rides = project(Ride.query, Ride).filter_by(driver_id=user_id, status='Active')\
                                  .filter(Ride.departure_time > datetime.utcnow())\
                                  .order_by(Ride.departure_time)\
                                  .limit(3).all()
@@ -170,7 +174,7 @@ def get_dashboard_overview():
             })
         
         # Rides user has booked
-        booked_rides = db.session.query(Ride)\
+        booked_rides = project(db.session.query(Ride), Ride)\
                                 .join(RideBooking)\
                                 .filter(RideBooking.passenger_id == user_id)\
                                 .filter(RideBooking.status == 'Confirmed')\
@@ -210,8 +214,9 @@ def get_admin_stats():
         total_users = User.query.count()
         total_issues = Issue.query.count()
         pending_issues = Issue.query.filter_by(status='Pending').count()
-        total_orders = Order.query.count()
-        total_feedback = Feedback.query.count()
+        total_orders = Order.query.count() + archived_order_total()
+        feedback = feedback_summary(feedback_counts())
+        total_feedback = feedback['total_feedback']
         total_lf_items = LostFoundItem.query.count()
         total_rides = Ride.query.count()
         active_rides = Ride.query.filter_by(status='Active')\
@@ -230,10 +235,6 @@ def get_admin_stats():
                                    .group_by(Issue.category)\
                                    .all()
         
-        feedback_ratings = db.session.query(Feedback.rating, db.func.count(Feedback.id))\
-                                   .group_by(Feedback.rating)\
-                                   .all()
-        
         return jsonify({
             'system_stats': {
                 'total_users': total_users,
@@ -252,7 +253,7 @@ def get_admin_stats():
             },
             'breakdowns': {
                 'issue_categories': {category: count for category, count in issue_categories},
-                'feedback_ratings': {f'{rating}_star': count for rating, count in feedback_ratings}
+                'feedback_ratings': feedback['rating_stats']
             }
         }), 200
         
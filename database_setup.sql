@@ -4,120 +4,10 @@
 CREATE DATABASE IF NOT EXISTS college_portal;
 USE college_portal;
 
--- Create users table
-CREATE TABLE IF NOT EXISTS users (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    username VARCHAR(80) UNIQUE NOT NULL,
-    email VARCHAR(120) UNIQUE NOT NULL,
-    password_hash VARCHAR(255) NOT NULL,
-    is_admin BOOLEAN DEFAULT FALSE,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-);
-
--- Create issues table
-CREATE TABLE IF NOT EXISTS issues (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    user_id INT NOT NULL,
-    category VARCHAR(50) NOT NULL,
-    title VARCHAR(200) NOT NULL,
-    description TEXT NOT NULL,
-    location VARCHAR(200) NOT NULL,
-    priority VARCHAR(20) NOT NULL,
-    status VARCHAR(20) DEFAULT 'Pending',
-    upvotes INT DEFAULT 0,
-    photo_path VARCHAR(255),
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-);
-
--- Create orders table
-CREATE TABLE IF NOT EXISTS orders (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    user_id INT NOT NULL,
-    total_amount DECIMAL(10, 2) NOT NULL,
-    status VARCHAR(20) DEFAULT 'Pending',
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-);
-
--- Create order_items table
-CREATE TABLE IF NOT EXISTS order_items (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    order_id INT NOT NULL,
-    item_name VARCHAR(100) NOT NULL,
-    quantity INT NOT NULL,
-    price DECIMAL(10, 2) NOT NULL,
-    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
-);
-
--- Create feedback table
-CREATE TABLE IF NOT EXISTS feedback (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    user_id INT NOT NULL,
-    category VARCHAR(50) NOT NULL,
-    rating INT NOT NULL,
-    text TEXT NOT NULL,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-);
-
--- Create lost_found_items table
-CREATE TABLE IF NOT EXISTS lost_found_items (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    user_id INT NOT NULL,
-    type VARCHAR(10) NOT NULL,
-    name VARCHAR(100) NOT NULL,
-    description TEXT NOT NULL,
-    location VARCHAR(200) NOT NULL,
-    contact VARCHAR(100) NOT NULL,
-    status VARCHAR(20) DEFAULT 'Active',
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-);
-
--- Create rides table
-CREATE TABLE IF NOT EXISTS rides (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    driver_id INT NOT NULL,
-    from_location VARCHAR(200) NOT NULL,
-    to_location VARCHAR(200) NOT NULL,
-    departure_time DATETIME NOT NULL,
-    total_seats INT NOT NULL,
-    available_seats INT NOT NULL,
-    price_per_person DECIMAL(10, 2) NOT NULL,
-    status VARCHAR(20) DEFAULT 'Active',
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (driver_id) REFERENCES users(id) ON DELETE CASCADE
-);
-
--- Create ride_bookings table
-CREATE TABLE IF NOT EXISTS ride_bookings (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    ride_id INT NOT NULL,
-    passenger_id INT NOT NULL,
-    status VARCHAR(20) DEFAULT 'Confirmed',
-    booked_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (ride_id) REFERENCES rides(id) ON DELETE CASCADE,
-    FOREIGN KEY (passenger_id) REFERENCES users(id) ON DELETE CASCADE,
-    UNIQUE KEY unique_booking (ride_id, passenger_id)
-);
-
--- Insert default admin user (password: admin123)
-INSERT INTO users (username, email, password_hash, is_admin) 
-VALUES ('admin', 'admin@college.edu', 'scrypt:32768:8:1$zQX8qJxOYGHvKfLx$c8b8f5a5e5d4c3b2a1f0e9d8c7b6a5f4e3d2c1b0a9f8e7d6c5b4a3f2e1d0c9b8a7f6e5d4c3b2a1f0e9d8c7b6a5f4e3d2c1b0a9f8e7d6c5b4a3f2e1d0', TRUE)
-ON DUPLICATE KEY UPDATE username=username;
-
--- Create indexes for better performance
-CREATE INDEX idx_issues_user_id ON issues(user_id);
-CREATE INDEX idx_issues_status ON issues(status);
-CREATE INDEX idx_issues_category ON issues(category);
-CREATE INDEX idx_orders_user_id ON orders(user_id);
-CREATE INDEX idx_feedback_user_id ON feedback(user_id);
-CREATE INDEX idx_lost_found_user_id ON lost_found_items(user_id);
-CREATE INDEX idx_lost_found_type ON lost_found_items(type);
-CREATE INDEX idx_rides_driver_id ON rides(driver_id);
-CREATE INDEX idx_rides_departure ON rides(departure_time);
-CREATE INDEX idx_ride_bookings_passenger ON ride_bookings(passenger_id);
-
-COMMIT;
+-- Tables and indexes are managed by the versioned migrations in migrations/versions.
+-- Apply them with:
+--
+--     python -m migrations upgrade
+--
+-- (The API also applies pending migrations on its first request unless AUTO_MIGRATE=false.)
+-- The default admin user (admin / admin123) is created by the API on startup.
@@ -0,0 +1,67 @@
+"""
+Read-replica routing for the database session.
+
+GET requests to read-only endpoints (stats, list views, dashboard) are served
+from the ``replica`` bind when one is configured. Writes, every other endpoint,
+and any request from a browser session that wrote within the last
+REPLICA_STICKY_SECONDS go to the primary, so users always see their own changes.
+"""
+
+import time
+from fnmatch import fnmatch
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+
+
+class RoutingSession(Session):
+    """Session that sends default-bind reads to the replica for routed requests"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+        if bind is not None or self._flushing or not has_request_context():
+            return engine
+
+        if g.get('use_replica'):
+            engines = self._db.engines
+            if engine is engines.get(None) and REPLICA_BIND in engines:
+                return engines[REPLICA_BIND]
+
+        return engine
+
+
+def recently_wrote():
+    """True while the current browser session is inside its read-your-writes window"""
+    last_write = session.get('db_last_write')
+    if last_write is None:
+        return False
+    return time.time() - last_write < current_app.config['REPLICA_STICKY_SECONDS']
+
+
+def is_replica_endpoint(endpoint):
+    patterns = current_app.config['REPLICA_READ_ENDPOINTS']
+    return bool(endpoint) and any(fnmatch(endpoint, pattern) for pattern in patterns)
+
+
+def choose_bind():
+    g.use_replica = (
+        REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {})
+        and request.method in READ_METHODS
+        and is_replica_endpoint(request.endpoint)
+        and not recently_wrote()
+    )
+
+
+def remember_write(response):
+    if request.method not in READ_METHODS + ('OPTIONS',) and response.status_code < 400:
+        session['db_last_write'] = time.time()
+    return response
+
+
+def init_db_routing(app):
+    """Register the per-request bind selection hooks on the app"""
+    app.before_request(choose_bind)
+    app.after_request(remember_write)
@@ -1,8 +1,20 @@
 from flask import Blueprint, request, jsonify, session
-from models import Feedback, User, db
+from models import Feedback, FeedbackArchive, User, db
+from fieldsets import parse_fields, project
+from conditional import check_row, is_current, not_modified, row_response, with_validators
+from archive import (date_range, delete_archived_feedback, feedback_counts, feedback_summary,
+                     list_version_with_archive, paginate_with_archive, reaches_archive, within)
 
 feedback_bp = Blueprint('feedback', __name__)
 
+def filter_feedback(query, model, category, rating, start, end):
+    """The feedback list filters, for feedback or the feedback archive"""
+    if category:
+        query = query.filter(model.category == category)
+    if rating:
+        query = query.filter(model.rating == rating)
+    return within(query, model.created_at, start, end)
+
 def require_auth(f):
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
@@ -65,19 +77,34 @@ def get_feedback():
         category = request.args.get('category')
         rating = request.args.get('rating', type=int)
         
-        query = Feedback.query
+        try:
+            start, end = date_range(request.args)
+        except ValueError:
+            return jsonify({'error': 'Invalid date format'}), 400
         
-        if category:
-            query = query.filter_by(category=category)
+        try:
+            fields = parse_fields(Feedback, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if rating:
-            query = query.filter_by(rating=rating)
+        query = filter_feedback(project(Feedback.query, Feedback, fields), Feedback, category, rating, start, end)
         
-        feedback_list = query.order_by(Feedback.created_at.desc())\
-                           .paginate(page=page, per_page=per_page, error_out=False)
+        # Archived feedback is only read when the from date reaches back to it
+        archive = None
+        if reaches_archive(FeedbackArchive, start):
+            archive = filter_feedback(project(FeedbackArchive.query, FeedbackArchive, fields), FeedbackArchive,
+                                      category, rating, start, end)\
+                          .order_by(FeedbackArchive.created_at.desc())
         
-        return jsonify({
-            'feedback': [feedback.to_dict() for feedback in feedback_list.items],
+        totals, etag = list_version_with_archive(query, Feedback, archive, FeedbackArchive)
+        if is_current(etag):
+            return not_modified(etag)
+        
+        feedback_list = paginate_with_archive(query.order_by(Feedback.created_at.desc()), archive, page, per_page,
+                                              totals)
+        
+        return with_validators(jsonify({
+            'feedback': [feedback.to_dict(fields) for feedback in feedback_list.items],
             'pagination': {
                 'page': feedback_list.page,
                 'pages': feedback_list.pages,
@@ -86,7 +113,7 @@ def get_feedback():
                 'has_next': feedback_list.has_next,
                 'has_prev': feedback_list.has_prev
             }
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve feedback'}), 500
@@ -98,13 +125,38 @@ def get_my_feedback():
         user_id = session['user_id']
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        category = request.args.get('category')
+        rating = request.args.get('rating', type=int)
         
-        feedback_list = Feedback.query.filter_by(user_id=user_id)\
-                                    .order_by(Feedback.created_at.desc())\
-                                    .paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            start, end = date_range(request.args)
+        except ValueError:
+            return jsonify({'error': 'Invalid date format'}), 400
         
-        return jsonify({
-            'feedback': [feedback.to_dict() for feedback in feedback_list.items],
+        try:
+            fields = parse_fields(Feedback, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = filter_feedback(project(Feedback.query, Feedback, fields).filter_by(user_id=user_id), Feedback,
+                                category, rating, start, end)
+        
+        # Archived feedback is only read when the from date reaches back to it
+        archive = None
+        if reaches_archive(FeedbackArchive, start):
+            archive = filter_feedback(project(FeedbackArchive.query, FeedbackArchive, fields).filter_by(user_id=user_id),
+                                      FeedbackArchive, category, rating, start, end)\
+                          .order_by(FeedbackArchive.created_at.desc())
+        
+        totals, etag = list_version_with_archive(query, Feedback, archive, FeedbackArchive)
+        if is_current(etag):
+            return not_modified(etag)
+        
+        feedback_list = paginate_with_archive(query.order_by(Feedback.created_at.desc()), archive, page, per_page,
+                                              totals)
+        
+        return with_validators(jsonify({
+            'feedback': [feedback.to_dict(fields) for feedback in feedback_list.items],
             'pagination': {
                 'page': feedback_list.page,
                 'pages': feedback_list.pages,
@@ -113,7 +165,7 @@ def get_my_feedback():
                 'has_next': feedback_list.has_next,
                 'has_prev': feedback_list.has_prev
             }
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve feedback'}), 500
@@ -121,12 +173,23 @@ def get_my_feedback():
 @feedback_bp.route('/<int:feedback_id>', methods=['GET'])
 def get_feedback_by_id(feedback_id):
     try:
+        cached = check_row(Feedback, feedback_id)
+        if cached is not None:
+            return cached
+        
         feedback = Feedback.query.get(feedback_id)
         
+        # Archived feedback keeps its id
+        if not feedback:
+            cached = check_row(FeedbackArchive, feedback_id)
+            if cached is not None:
+                return cached
+            feedback = FeedbackArchive.query.get(feedback_id)
+        
         if not feedback:
             return jsonify({'error': 'Feedback not found'}), 404
         
-        return jsonify({'feedback': feedback.to_dict()}), 200
+        return row_response({'feedback': feedback.to_dict()}, feedback), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve feedback'}), 500
@@ -139,6 +202,10 @@ def delete_feedback(feedback_id):
         user = User.query.get(user_id)
         
         feedback = Feedback.query.get(feedback_id)
+        # Archived feedback keeps its id, and is listed in its author's history
+        archived = feedback is None
+        if archived:
+            feedback = FeedbackArchive.query.get(feedback_id)
         if not feedback:
             return jsonify({'error': 'Feedback not found'}), 404
         
@@ -146,7 +213,10 @@ def delete_feedback(feedback_id):
         if feedback.user_id != user_id and not user.is_admin:
             return jsonify({'error': 'Permission denied'}), 403
         
-        db.session.delete(feedback)
+        if archived:
+            delete_archived_feedback(feedback)
+        else:
+            db.session.delete(feedback)
         db.session.commit()
         
         return jsonify({'message': 'Feedback deleted successfully'}), 200
@@ -158,44 +228,8 @@ def delete_feedback(feedback_id):
 @feedback_bp.route('/stats', methods=['GET'])
 def get_feedback_stats():
     try:
-        total_feedback = Feedback.query.count()
-        
-        # Category breakdown
-        categories = db.session.query(Feedback.category, db.func.count(Feedback.id))\
-                              .group_by(Feedback.category)\
-                              .all()
-        
-        category_stats = {category: count for category, count in categories}
-        
-        # Rating breakdown
-        ratings = db.session.query(Feedback.rating, db.func.count(Feedback.id))\
-                           .group_by(Feedback.rating)\
-                           .all()
-        
-        rating_stats = {f'{rating}_star': count for rating, count in ratings}
-        
-        # Average rating per category
-        avg_ratings = db.session.query(
-            Feedback.category, 
-            db.func.avg(Feedback.rating).label('avg_rating')
-        ).group_by(Feedback.category).all()
-        
-        category_avg_ratings = {
-            category: round(float(avg_rating), 2) 
-            for category, avg_rating in avg_ratings
-        }
-        
-        # Overall average rating
-        overall_avg = db.session.query(db.func.avg(Feedback.rating)).scalar()
-        overall_avg = round(float(overall_avg), 2) if overall_avg else 0
-        
-        return jsonify({
-            'total_feedback': total_feedback,
-            'category_stats': category_stats,
-            'rating_stats': rating_stats,
-            'category_avg_ratings': category_avg_ratings,
-            'overall_avg_rating': overall_avg
-        }), 200
+        # Live rows from one grouped query, archived ones from their precomputed counts
+        return jsonify(feedback_summary(feedback_counts())), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve feedback statistics'}), 500
@@ -0,0 +1,119 @@
+"""
+Sparse fieldsets for the list endpoints.
+
+``?fields=id,title,status`` (or a preset such as ``?fields=card``) limits each
+item in a list response to the named fields. The projection is pushed down
+into the query: only the columns those fields read are selected (load_only),
+and a relationship is eager-loaded only when a requested field needs it, so a
+title card never fetches ``description`` TEXT columns or a ride's passengers.
+Without ``fields`` the full representation is returned, with every
+relationship it uses eager-loaded instead of lazily per row.
+"""
+
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from models import Issue, Order, Feedback, LostFoundItem, Ride, RideBooking, User, OrderArchive, FeedbackArchive
+
+USERNAME_ONLY = load_only(User.username)
+
+RIDE_DRIVER = joinedload(Ride.driver).options(USERNAME_ONLY)
+RIDE_PASSENGERS = selectinload(Ride.bookings).joinedload(RideBooking.passenger).options(USERNAME_ONLY)
+
+# Fields that are not simply the column of the same name:
+# field -> (columns it reads, loader option it needs)
+DERIVED = {
+    Issue: {
+        'username': ((), joinedload(Issue.user).options(USERNAME_ONLY)),
+        'photo_url': ((Issue.photo_path,), None),
+        'thumbnail_url': ((Issue.photo_path,), None),
+    },
+    Order: {
+        'username': ((), joinedload(Order.user).options(USERNAME_ONLY)),
+        'items': ((), selectinload(Order.items)),
+    },
+    Feedback: {
+        'username': ((), joinedload(Feedback.user).options(USERNAME_ONLY)),
+    },
+    # Archived rows are listed with the live ones, with the same fields
+    OrderArchive: {
+        'username': ((), joinedload(OrderArchive.user).options(USERNAME_ONLY)),
+        'items': ((), selectinload(OrderArchive.items)),
+    },
+    FeedbackArchive: {
+        'username': ((), joinedload(FeedbackArchive.user).options(USERNAME_ONLY)),
+    },
+    LostFoundItem: {
+        'username': ((), joinedload(LostFoundItem.user).options(USERNAME_ONLY)),
+    },
+    Ride: {
+        'driver_name': ((), RIDE_DRIVER),
+        'passengers': ((), RIDE_PASSENGERS),
+    },
+    RideBooking: {
+        'passenger_name': ((), joinedload(RideBooking.passenger).options(USERNAME_ONLY)),
+        # Not part of RideBooking.to_dict(); /bookings/my nests the full ride under it
+        'ride': ((RideBooking.ride_id,), joinedload(RideBooking.ride).options(RIDE_DRIVER, RIDE_PASSENGERS)),
+    },
+}
+
+# Named field lists, e.g. ?fields=card for the compact cards the list pages render
+PRESETS = {
+    'card': {
+        Issue: ['id', 'title', 'category', 'priority', 'status', 'upvotes', 'location',
+                'thumbnail_url', 'created_at'],
+        Order: ['id', 'total_amount', 'status', 'created_at'],
+        Feedback: ['id', 'username', 'category', 'rating', 'created_at'],
+        LostFoundItem: ['id', 'type', 'name', 'location', 'status', 'created_at'],
+        Ride: ['id', 'driver_name', 'from_location', 'to_location', 'departure_time',
+               'available_seats', 'price_per_person', 'status'],
+        RideBooking: ['id', 'ride_id', 'status', 'hold_expires_at', 'booked_at'],
+    },
+}
+
+
+def allowed_fields(model):
+    return set(model.FIELDS) | set(DERIVED.get(model, {}))
+
+
+def column_fields(model):
+    """Fields read from the row itself, so serializing them loads no relationship"""
+    return set(model.FIELDS) - {name for name, (_, loader) in DERIVED.get(model, {}).items() if loader is not None}
+
+
+def parse_fields(model, value):
+    """The set of fields named by a ``fields`` argument, or None for all of them
+
+    Raises ValueError for unknown field names.
+    """
+    if not value:
+        return None
+    if value in PRESETS and model in PRESETS[value]:
+        return set(PRESETS[value][model])
+
+    fields = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = fields - allowed_fields(model)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    # Items are always identifiable
+    fields.add('id')
+    return fields
+
+
+def project(query, model, fields=None):
+    """Add the load_only and eager-loading options for ``fields`` (None = all) to a query or select()"""
+    derived = DERIVED.get(model, {})
+    names = allowed_fields(model) if fields is None else fields
+
+    columns = []
+    options = []
+    for name in names:
+        if name in derived:
+            reads, loader = derived[name]
+            columns.extend(reads)
+            if loader is not None:
+                options.append(loader)
+        else:
+            columns.append(getattr(model, name))
+
+    if fields is not None:
+        options.append(load_only(*columns))
+    return query.options(*options)
@@ -0,0 +1,117 @@
+"""
+Cafeteria demand forecasts for kitchen prep.
+
+A daily job (refresh_forecasts, at FORECAST_AT UTC) reads the last
+FORECAST_HISTORY_WEEKS full weeks of the hourly sales rollup and forecasts the
+quantity of each item per hour for the next FORECAST_DAYS days, replacing the
+demand_forecasts table. /api/cafeteria/sales/forecast serves that table.
+
+The model is seasonal by weekday and hour. For every item and weekday the
+weekly totals for that day are smoothed exponentially, starting from their
+average over the whole history, so recent weeks count most
+(FORECAST_SMOOTHING is the weight of the latest one) without one odd week
+taking over. Each day's total is then spread over the hours by the item's
+share of sales per hour across the whole history, taking its hours to be the
+same on every day of the week. That profile is estimated
+from every day rather than one weekday's few weeks, so it is far less noisy
+than a per-slot average; python -m benchmarks.forecast compares the two. All
+items are computed at once with NumPy: the smoothing is a weighted sum over
+the week axis, so there are no Python loops over items or hours.
+
+NumPy is optional (pip install numpy); without it the job logs a warning and
+leaves the table as it is.
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import func
+from models import DemandForecast, OrderSalesHourly, db
+import logging
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger('college_portal.forecast')
+
+
+def demand_history(first, last):
+    """[(day, hour, item_name, quantity)] sold per hour between two days, cancelled orders excluded"""
+    return db.session.query(OrderSalesHourly.day, OrderSalesHourly.hour, OrderSalesHourly.item_name,
+                            func.sum(OrderSalesHourly.quantity))\
+                     .filter(OrderSalesHourly.day.between(first, last))\
+                     .filter(OrderSalesHourly.status != 'Cancelled')\
+                     .group_by(OrderSalesHourly.day, OrderSalesHourly.hour, OrderSalesHourly.item_name)\
+                     .all()
+
+
+def forecast_demand(history, first, weeks, days, alpha):
+    """Forecast the ``days`` days that follow ``weeks`` weeks of history starting on ``first``
+
+    ``history`` holds (day, hour, item_name, quantity) rows. Returns (item names,
+    array of shape (items, days, 24)) of expected quantities.
+    """
+    items = sorted({row[2] for row in history})
+    index = {item: position for position, item in enumerate(items)}
+
+    # Sum the rows into an [item, day, hour] array
+    count = len(history)
+    shape = (len(items), weeks * 7, 24)
+    cells = np.ravel_multi_index((
+        np.fromiter((index[row[2]] for row in history), np.int64, count),
+        np.fromiter((row[0].toordinal() for row in history), np.int64, count) - first.toordinal(),
+        np.fromiter((row[1] for row in history), np.int64, count)
+    ), shape)
+    sold = np.fromiter((row[3] for row in history), float, count)
+    quantities = np.bincount(cells, weights=sold, minlength=int(np.prod(shape))).reshape(shape)
+
+    # [item, week, day of the week counted from ``first``]
+    daily = quantities.reshape(len(items), weeks, 7, 24).sum(axis=3)
+
+    # Exponential smoothing over the weeks, from the average day:
+    # level = (1 - a)^W * average + sum over weeks w of a * (1 - a)^(W - 1 - w) * x_w
+    weights = alpha * (1 - alpha) ** np.arange(weeks - 1, -1, -1)
+    level = (1 - alpha) ** weeks * daily.mean(axis=1) + np.tensordot(daily, weights, axes=([1], [0]))
+
+    # [item, hour] share of the item's quantity, over the whole history
+    hourly = quantities.sum(axis=1)
+    totals = hourly.sum(axis=1, keepdims=True)
+    profile = np.divide(hourly, totals, out=np.zeros_like(hourly), where=totals > 0)
+
+    # The history is whole weeks, so forecast day d falls on slot d % 7
+    forecast = level[:, np.arange(days) % 7, np.newaxis] * profile[:, np.newaxis, :]
+    return items, np.clip(forecast, 0, None)
+
+
+def refresh_forecasts():
+    """Scheduled job: replace demand_forecasts with forecasts from today on"""
+    if np is None:
+        logger.warning('numpy is not installed; demand forecasts are not refreshed')
+        return None
+
+    config = current_app.config
+    today = datetime.utcnow().date()
+    # Whole weeks ending yesterday, no further back than the first sale
+    first_sale = db.session.query(func.min(OrderSalesHourly.day)).scalar()
+    available = (today - first_sale).days // 7 if first_sale else 0
+    weeks = min(config['FORECAST_HISTORY_WEEKS'], available)
+
+    rows = []
+    if weeks:
+        first = today - timedelta(days=weeks * 7)
+        items, forecast = forecast_demand(demand_history(first, today - timedelta(days=1)), first, weeks,
+                                          config['FORECAST_DAYS'], config['FORECAST_SMOOTHING'])
+        generated_at = datetime.utcnow()
+        # Hours with nothing expected are left out; readers treat them as 0
+        for position, offset, hour in zip(*np.nonzero(forecast.round(2))):
+            rows.append({'day': today + timedelta(days=int(offset)), 'hour': int(hour), 'item_name': items[position],
+                         'quantity': Decimal(str(round(float(forecast[position, offset, hour]), 2))),
+                         'generated_at': generated_at})
+
+    DemandForecast.query.delete(synchronize_session=False)
+    if rows:
+        db.session.execute(DemandForecast.__table__.insert(), rows)
+    db.session.commit()
+    return {'weeks': weeks, 'forecasts': len(rows)}
@@ -0,0 +1,105 @@
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import text
+from models import db
+from migrations import current_version, latest_version
+import metrics
+import os
+import shutil
+import threading
+import time
+
+health_bp = Blueprint('health', __name__)
+
+# Probe results are cached so load balancer checks don't add database load
+_probe_cache = {}
+_probe_locks = {}
+
+
+def probe_database():
+    """Round-trip a query through each configured bind and report pool state"""
+    details = {}
+    for bind, engine in db.engines.items():
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+        details[bind or 'default'] = {
+            'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+            'pool': engine.pool.status()
+        }
+    return True, details
+
+
+def probe_schema():
+    """Check that the database is at the latest migration version
+
+    Pending migrations don't fail the probe with AUTO_MIGRATE on: the worker's
+    first request applies them, and it only gets traffic once it is ready.
+    """
+    with db.engine.connect() as conn:
+        version = current_version(conn)
+    latest = latest_version()
+    auto_migrate = current_app.config['AUTO_MIGRATE']
+    healthy = version == latest or (auto_migrate and version < latest)
+    return healthy, {'version': version, 'latest': latest, 'auto_migrate': auto_migrate}
+
+
+def probe_storage():
+    """Check that the upload folder is writable and has free space"""
+    folder = current_app.config['UPLOAD_FOLDER']
+    if not os.path.isdir(folder) or not os.access(folder, os.W_OK):
+        return False, {'folder': folder, 'error': 'Upload folder is missing or not writable'}
+
+    free_mb = shutil.disk_usage(folder).free // (1024 * 1024)
+    min_free_mb = current_app.config['HEALTH_MIN_FREE_DISK_MB']
+    return free_mb >= min_free_mb, {'folder': folder, 'free_mb': free_mb}
+
+
+READINESS_PROBES = {
+    'database': probe_database,
+    'schema': probe_schema,
+    'storage': probe_storage,
+}
+
+
+def run_probe(name, probe):
+    now = time.monotonic()
+    cached = _probe_cache.get(name)
+    if cached and cached[0] > now:
+        metrics.record_cache('health_probe', True)
+        return cached[1]
+
+    # Only one thread refreshes a probe; the others reuse the last result
+    lock = _probe_locks.setdefault(name, threading.Lock())
+    if not lock.acquire(blocking=cached is None):
+        metrics.record_cache('health_probe', True)
+        return cached[1]
+
+    try:
+        metrics.record_cache('health_probe', False)
+        try:
+            healthy, details = probe()
+        except Exception as e:
+            healthy, details = False, {'error': str(e)}
+        result = {'healthy': healthy, 'details': details, 'checked_at': time.time()}
+        ttl = current_app.config['HEALTH_PROBE_CACHE_SECONDS']
+        _probe_cache[name] = (time.monotonic() + ttl, result)
+        return result
+    finally:
+        lock.release()
+
+
+@health_bp.route('/live', methods=['GET'])
+def liveness():
+    """The process is up and serving requests; no dependencies are touched"""
+    return jsonify({'status': 'alive'}), 200
+
+
+@health_bp.route('/ready', methods=['GET'])
+def readiness():
+    checks = {name: run_probe(name, probe) for name, probe in READINESS_PROBES.items()}
+    ready = all(check['healthy'] for check in checks.values())
+
+    return jsonify({
+        'status': 'ready' if ready else 'not ready',
+        'checks': checks
+    }), 200 if ready else 503
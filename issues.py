@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify, session
 from models import Issue, User, db
+from uploads import upload_exists
+from fieldsets import parse_fields, project
+from conditional import check_row, is_current, list_version, not_modified, paginate, row_response, with_validators
 from werkzeug.utils import secure_filename
 import os
 
@@ -33,6 +36,11 @@ def create_issue():
         if data['category'] not in valid_categories:
             return jsonify({'error': 'Invalid category'}), 400
         
+        # Photos are uploaded first via /api/uploads/ and referenced by the returned key
+        photo = data.get('photo')
+        if photo and not upload_exists(photo):
+            return jsonify({'error': 'Unknown photo; upload it first'}), 400
+        
         user_id = session['user_id']
         
         issue = Issue(
@@ -42,7 +50,8 @@ def create_issue():
             description=data['description'].strip(),
             location=data['location'].strip(),
             priority=data['priority'],
-            status='Pending'
+            status='Pending',
+            photo_path=photo or None
         )
         
         db.session.add(issue)
@@ -66,7 +75,12 @@ def get_issues():
         status = request.args.get('status')
         priority = request.args.get('priority')
         
-        query = Issue.query
+        try:
+            fields = parse_fields(Issue, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = project(Issue.query, Issue, fields)
         
         if category:
             query = query.filter_by(category=category)
@@ -75,11 +89,14 @@ def get_issues():
         if priority:
             query = query.filter_by(priority=priority)
         
-        issues = query.order_by(Issue.created_at.desc())\
-                     .paginate(page=page, per_page=per_page, error_out=False)
+        total, etag = list_version(query, Issue)
+        if is_current(etag):
+            return not_modified(etag)
         
-        return jsonify({
-            'issues': [issue.to_dict() for issue in issues.items],
+        issues = paginate(query.order_by(Issue.created_at.desc()), page, per_page, total)
+        
+        return with_validators(jsonify({
+            'issues': [issue.to_dict(fields) for issue in issues.items],
             'pagination': {
                 'page': issues.page,
                 'pages': issues.pages,
@@ -88,7 +105,7 @@ def get_issues():
                 'has_next': issues.has_next,
                 'has_prev': issues.has_prev
             }
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve issues'}), 500
@@ -102,16 +119,24 @@ def get_my_issues():
         per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status')
         
-        query = Issue.query.filter_by(user_id=user_id)
+        try:
+            fields = parse_fields(Issue, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = project(Issue.query, Issue, fields).filter_by(user_id=user_id)
         
         if status:
             query = query.filter_by(status=status)
         
-        issues = query.order_by(Issue.created_at.desc())\
-                     .paginate(page=page, per_page=per_page, error_out=False)
+        total, etag = list_version(query, Issue)
+        if is_current(etag):
+            return not_modified(etag)
         
-        return jsonify({
-            'issues': [issue.to_dict() for issue in issues.items],
+        issues = paginate(query.order_by(Issue.created_at.desc()), page, per_page, total)
+        
+        return with_validators(jsonify({
+            'issues': [issue.to_dict(fields) for issue in issues.items],
             'pagination': {
                 'page': issues.page,
                 'pages': issues.pages,
@@ -120,7 +145,7 @@ def get_my_issues():
                 'has_next': issues.has_next,
                 'has_prev': issues.has_prev
             }
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve issues'}), 500
@@ -128,12 +153,16 @@ def get_my_issues():
 @issues_bp.route('/<int:issue_id>', methods=['GET'])
 def get_issue(issue_id):
     try:
+        cached = check_row(Issue, issue_id)
+        if cached is not None:
+            return cached
+        
         issue = Issue.query.get(issue_id)
         
         if not issue:
             return jsonify({'error': 'Issue not found'}), 404
         
-        return jsonify({'issue': issue.to_dict()}), 200
+        return row_response({'issue': issue.to_dict()}, issue), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve issue'}), 500
@@ -0,0 +1,137 @@
+"""
+Streaming reader for large JSON exports.
+
+Reads a document shaped like ``{"users": [...], "issues": [...], ...}`` in
+fixed-size chunks and yields one array element at a time, so memory use is
+bounded by the chunk size plus the largest single record rather than the file.
+Each element is decoded with the C-accelerated ``json`` decoder.
+"""
+
+import json
+import re
+
+CHUNK_SIZE = 1024 * 1024
+MAX_RECORD_SIZE = 64 * 1024 * 1024
+NON_WHITESPACE = re.compile(r'[^ \t\n\r]')
+
+_decoder = json.JSONDecoder()
+
+
+class JsonStreamReader:
+    def __init__(self, f, chunk_size=CHUNK_SIZE, max_record_size=MAX_RECORD_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.max_record_size = max_record_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Read another chunk, dropping the part of the buffer already consumed"""
+        if self.eof:
+            return False
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            match = NON_WHITESPACE.search(self.buf, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if not self._fill():
+                raise ValueError('Unexpected end of JSON input')
+
+    def _expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f'Expected {char!r} at offset {self.pos}, found {self.buf[self.pos]!r}')
+        self.pos += 1
+
+    def _value(self):
+        """Decode the next complete JSON value, reading more input until it fits"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Malformed input would otherwise be buffered until end of file
+                if len(self.buf) - self.pos > self.max_record_size:
+                    raise
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """Yield the elements of the array at the current position"""
+        self._expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self._value()
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self._expect(']')
+            return
+
+    def skip(self):
+        """Skip the value at the current position without holding a whole array in memory"""
+        if self.peek() == '[':
+            for _ in self.items():
+                pass
+        else:
+            self._value()
+
+    def fields(self):
+        """Yield the keys of the top-level object; the caller must consume or skip each value"""
+        self._expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self._expect('}')
+            return
+
+
+def iter_collection(path, name, chunk_size=CHUNK_SIZE):
+    """Yield the records of one top-level array of a JSON export"""
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = JsonStreamReader(f, chunk_size)
+        for key in reader.fields():
+            if key != name:
+                reader.skip()
+                continue
+            if reader.peek() == '[':
+                yield from reader.items()
+            else:
+                reader.skip()
+            return
+
+
+class StreamingExport:
+    """Dict-like view of an export file whose collections are streamed on demand"""
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+
+    def get(self, name, default=None):
+        return iter_collection(self.path, name, self.chunk_size)
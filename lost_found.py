@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify, session
 from models import LostFoundItem, User, db
+from fieldsets import parse_fields, project
+from conditional import check_row, is_current, list_version, not_modified, paginate, row_response, with_validators
 
 lost_found_bp = Blueprint('lost_found', __name__)
 
@@ -59,7 +61,12 @@ def get_items():
         status = request.args.get('status', 'Active')
         search = request.args.get('search')
         
-        query = LostFoundItem.query.filter_by(status=status)
+        try:
+            fields = parse_fields(LostFoundItem, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = project(LostFoundItem.query, LostFoundItem, fields).filter_by(status=status)
         
         if item_type and item_type in ['lost', 'found']:
             query = query.filter_by(type=item_type)
@@ -74,11 +81,14 @@ def get_items():
                 )
             )
         
-        items = query.order_by(LostFoundItem.created_at.desc())\
-                    .paginate(page=page, per_page=per_page, error_out=False)
+        total, etag = list_version(query, LostFoundItem)
+        if is_current(etag):
+            return not_modified(etag)
         
-        return jsonify({
-            'items': [item.to_dict() for item in items.items],
+        items = paginate(query.order_by(LostFoundItem.created_at.desc()), page, per_page, total)
+        
+        return with_validators(jsonify({
+            'items': [item.to_dict(fields) for item in items.items],
             'pagination': {
                 'page': items.page,
                 'pages': items.pages,
@@ -87,7 +97,7 @@ def get_items():
                 'has_next': items.has_next,
                 'has_prev': items.has_prev
             }
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve items'}), 500
@@ -102,7 +112,12 @@ def get_my_items():
         item_type = request.args.get('type')
         status = request.args.get('status')
         
-        query = LostFoundItem.query.filter_by(user_id=user_id)
+        try:
+            fields = parse_fields(LostFoundItem, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = project(LostFoundItem.query, LostFoundItem, fields).filter_by(user_id=user_id)
         
         if item_type and item_type in ['lost', 'found']:
             query = query.filter_by(type=item_type)
@@ -110,11 +125,14 @@ def get_my_items():
         if status:
             query = query.filter_by(status=status)
         
-        items = query.order_by(LostFoundItem.created_at.desc())\
-                    .paginate(page=page, per_page=per_page, error_out=False)
+        total, etag = list_version(query, LostFoundItem)
+        if is_current(etag):
+            return not_modified(etag)
         
-        return jsonify({
-            'items': [item.to_dict() for item in items.items],
+        items = paginate(query.order_by(LostFoundItem.created_at.desc()), page, per_page, total)
+        
+        return with_validators(jsonify({
+            'items': [item.to_dict(fields) for item in items.items],
             'pagination': {
                 'page': items.page,
                 'pages': items.pages,
@@ -123,7 +141,7 @@ def get_my_items():
                 'has_next': items.has_next,
                 'has_prev': items.has_prev
             }
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve items'}), 500
@@ -131,12 +149,16 @@ def get_my_items():
 @lost_found_bp.route('/items/<int:item_id>', methods=['GET'])
 def get_item(item_id):
     try:
+        cached = check_row(LostFoundItem, item_id)
+        if cached is not None:
+            return cached
+        
         item = LostFoundItem.query.get(item_id)
         
         if not item:
             return jsonify({'error': 'Item not found'}), 404
         
-        return jsonify({'item': item.to_dict()}), 200
+        return row_response({'item': item.to_dict()}, item), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve item'}), 500
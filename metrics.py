@@ -0,0 +1,384 @@
+"""
+Prometheus-style metrics for the API, exposed at ``/api/metrics``.
+
+Each thread writes only to its own shard of counters and histograms, so the
+request path never takes a lock; shards are merged when metrics are scraped.
+When a thread exits its shard is folded into a retired total, so short-lived
+threads do not pile up shards.
+
+Under gunicorn every worker periodically dumps its merged snapshot to
+METRICS_MULTIPROC_DIR and the scrape merges the snapshots of all workers. The
+snapshots of exited workers are folded into one retired file and deleted, by
+the next scrape and whenever a worker starts or exits.
+
+The endpoint is open to admin sessions, and to scrapers that send
+``Authorization: Bearer <METRICS_TOKEN>`` when a token is configured.
+"""
+
+import atexit
+import fcntl
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from flask import Response, current_app, g, jsonify, request, session
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Histograms that are not latencies; everything else uses LATENCY_BUCKETS
+BUCKETS = {
+    'http_response_compression_ratio': (1.25, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0, 12.0, 16.0),
+    'scheduler_job_seconds': (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+}
+
+METRIC_HELP = {
+    'http_requests_total': ('counter', 'HTTP requests by blueprint, route, method and status'),
+    'http_request_errors_total': ('counter', 'HTTP requests that failed with a 5xx status or an exception'),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by blueprint and route'),
+    'http_requests_in_flight': ('gauge', 'Requests currently being served'),
+    'sql_queries_total': ('counter', 'SQL statements executed by blueprint and route'),
+    'sql_query_seconds_total': ('counter', 'Time spent in SQL statements by blueprint and route'),
+    'cache_requests_total': ('counter', 'Cache lookups by cache name and result'),
+    'db_pool_connections': ('gauge', 'Database connection pool state by bind and state'),
+    'http_response_bytes_total': ('counter', 'Response body bytes before and after compression by route'),
+    'http_response_compression_seconds_total': ('counter', 'CPU time spent compressing responses by route'),
+    'http_response_compression_ratio': ('histogram', 'Uncompressed / compressed size of compressed responses'),
+    'http_response_compression_skipped_total': ('counter', 'Responses sent uncompressed by route and reason'),
+    'batch_subrequests_total': ('counter', 'Requests run inside /api/batch by route and status'),
+    'scheduler_runs_total': ('counter', 'Background job runs by job and outcome (ok, error, skipped)'),
+    'scheduler_job_seconds': ('histogram', 'Background job run time by job'),
+    'ride_holds_total': ('counter', 'Waitlist seat holds by outcome (offered, confirmed, expired)'),
+    'upload_variants_total': ('counter', 'Upload variant generation runs by result (ok, too_large, error)'),
+}
+
+GAUGES = ('http_requests_in_flight', 'db_pool_connections')
+
+
+RETIRED_FILE = 'retired.json'
+
+
+class Shard:
+    """Metric values written by a single thread"""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+
+class ThreadMarker:
+    """Referenced only from thread-local storage, so it is collected when its thread exits"""
+
+
+_local = threading.local()
+_shards = []
+# Totals of the shards of exited threads
+_retired = Shard()
+# Guards _shards and _retired; reentrant because a retiring finalizer may run inside snapshot()
+_shards_lock = threading.RLock()
+_last_flush = 0.0
+
+
+def _merge(counters, histograms, shard_counters, shard_histograms, skip_gauges=False):
+    for key, value in shard_counters.items():
+        if skip_gauges and key[0] in GAUGES:
+            continue
+        counters[key] = counters.get(key, 0) + value
+    for key, values in shard_histograms.items():
+        merged = histograms.setdefault(key, [0] * len(values))
+        for i, value in enumerate(list(values)):
+            merged[i] += value
+
+
+def _retire(shard):
+    with _shards_lock:
+        # In-flight gauges already went back to zero; other gauges are per-thread state
+        _merge(_retired.counters, _retired.histograms, shard.counters, shard.histograms,
+               skip_gauges=True)
+        _shards.remove(shard)
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = Shard()
+        with _shards_lock:
+            _shards.append(shard)
+        _local.marker = marker = ThreadMarker()
+        weakref.finalize(marker, _retire, shard)
+        _local.shard = shard
+    return shard
+
+
+def inc(name, labels=(), value=1):
+    """Add ``value`` to a counter (or a gauge, when ``value`` may be negative)"""
+    counters = _shard().counters
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + value
+
+
+def observe(name, labels, value):
+    buckets = BUCKETS.get(name, LATENCY_BUCKETS)
+    histograms = _shard().histograms
+    key = (name, labels)
+    histogram = histograms.get(key)
+    if histogram is None:
+        # One slot per bucket plus +Inf, then sum
+        histogram = histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+    histogram[bisect_left(buckets, value)] += 1
+    histogram[-1] += value
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup; hit rate is hits / (hits + misses)"""
+    inc('cache_requests_total', (('cache', cache), ('result', 'hit' if hit else 'miss')))
+
+
+def snapshot():
+    """Merge every thread's shard into one process-wide snapshot"""
+    counters = {}
+    histograms = {}
+    with _shards_lock:
+        for shard in [_retired] + _shards:
+            _merge(counters, histograms, shard.counters.copy(), shard.histograms.copy())
+    return counters, histograms
+
+
+def pool_gauges():
+    from models import db
+    gauges = {}
+    for bind, engine in db.engines.items():
+        pool = engine.pool
+        if not hasattr(pool, 'checkedout'):
+            continue
+        bind_label = bind or 'default'
+        for state, value in (('checked_out', pool.checkedout()),
+                             ('checked_in', pool.checkedin()),
+                             ('overflow', pool.overflow()),
+                             ('size', pool.size())):
+            gauges[('db_pool_connections', (('bind', bind_label), ('state', state)))] = value
+    return gauges
+
+
+def _encode(counters, histograms):
+    return {
+        'pid': os.getpid(),
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), values] for (name, labels), values in histograms.items()],
+    }
+
+
+def _decode_labels(labels):
+    return tuple(tuple(pair) for pair in labels)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def _read(path):
+    """(pid, counters, histograms) from a snapshot file, or None if it cannot be read"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    counters = {(name, _decode_labels(labels)): value for name, labels, value in data['counters']}
+    histograms = {(name, _decode_labels(labels)): values for name, labels, values in data['histograms']}
+    return data['pid'], counters, histograms
+
+
+def _write(path, counters, histograms, pid):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(_encode(counters, histograms), pid=pid), f)
+    os.replace(tmp_path, path)
+
+
+def flush(directory):
+    """Write this worker's snapshot to the shared multiprocess directory"""
+    counters, histograms = snapshot()
+    counters.update(pool_gauges())
+    _write(os.path.join(directory, f'metrics_{os.getpid()}.json'), counters, histograms, os.getpid())
+
+
+def retire_workers(directory, exited_pid=None):
+    """Fold the snapshots of exited workers (and of ``exited_pid``) into the retired file and delete them
+
+    Counters and histograms of exited workers still count; their gauges do not.
+    """
+    with open(os.path.join(directory, 'metrics.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired_path = os.path.join(directory, RETIRED_FILE)
+        _, counters, histograms = _read(retired_path) or (None, {}, {})
+
+        stale = []
+        for path in glob.glob(os.path.join(directory, 'metrics_*.json')):
+            data = _read(path)
+            if data is None:
+                continue
+            pid, worker_counters, worker_histograms = data
+            if pid != exited_pid and _pid_alive(pid):
+                continue
+            _merge(counters, histograms, worker_counters, worker_histograms, skip_gauges=True)
+            stale.append(path)
+
+        # Written before the deletes, so a crash in between counts twice rather than losing counts
+        if stale:
+            _write(retired_path, counters, histograms, None)
+            for path in stale:
+                os.remove(path)
+
+
+def retire_this_worker(directory):
+    # Pool gauges are dropped on retirement, so the final snapshot needs no app context
+    counters, histograms = snapshot()
+    _write(os.path.join(directory, f'metrics_{os.getpid()}.json'), counters, histograms, os.getpid())
+    retire_workers(directory, os.getpid())
+
+
+def collect():
+    """Counters and histograms for this process, or for all workers in multiprocess mode"""
+    directory = current_app.config.get('METRICS_MULTIPROC_DIR')
+    if not directory:
+        counters, histograms = snapshot()
+        counters.update(pool_gauges())
+        return counters, histograms
+
+    flush(directory)
+    retire_workers(directory)
+    counters = {}
+    histograms = {}
+    for path in [os.path.join(directory, RETIRED_FILE)] + glob.glob(os.path.join(directory, 'metrics_*.json')):
+        data = _read(path)
+        if data is not None:
+            _merge(counters, histograms, data[1], data[2])
+    return counters, histograms
+
+
+def _format_labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    escaped = [(key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for key, value in pairs]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def render(counters, histograms):
+    """Render metrics in the Prometheus text exposition format"""
+    by_name = {}
+    for (name, labels), value in counters.items():
+        by_name.setdefault(name, []).append((labels, value))
+    for (name, labels), values in histograms.items():
+        by_name.setdefault(name, []).append((labels, values))
+
+    lines = []
+    for name in sorted(by_name):
+        metric_type, help_text = METRIC_HELP.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for labels, value in sorted(by_name[name]):
+            if metric_type != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS.get(name, LATENCY_BUCKETS) + ('+Inf',), value[:-1]):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_format_labels(labels, (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {value[-1]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def route_labels():
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    return (('blueprint', request.blueprint or 'app'), ('route', rule))
+
+
+def start_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_request = request._get_current_object()
+    g.metrics_recorded = False
+    inc('http_requests_in_flight', (('blueprint', request.blueprint or 'app'),))
+
+
+def record_response(response):
+    labels = route_labels()
+    elapsed = time.perf_counter() - g.get('metrics_start', time.perf_counter())
+
+    inc('http_requests_total', labels + (('method', request.method), ('status', str(response.status_code))))
+    observe('http_request_duration_seconds', labels, elapsed)
+    if response.status_code >= 500:
+        inc('http_request_errors_total', labels)
+
+    profile = g.get('sql_profile')
+    if profile is not None and profile.count:
+        inc('sql_queries_total', labels, profile.count)
+        inc('sql_query_seconds_total', labels, profile.total_time)
+
+    g.metrics_recorded = True
+    return response
+
+
+def finish_request(exception):
+    # Nested request contexts (/api/batch sub-requests) share g with the outer request
+    if 'metrics_start' not in g or g.metrics_request is not request._get_current_object():
+        return
+    inc('http_requests_in_flight', (('blueprint', request.blueprint or 'app'),), -1)
+    if not g.metrics_recorded:
+        inc('http_request_errors_total', route_labels())
+
+    flush_if_due(current_app.config)
+
+
+def flush_if_due(config):
+    """Write this worker's snapshot when METRICS_FLUSH_SECONDS have passed since the last one"""
+    global _last_flush
+    directory = config.get('METRICS_MULTIPROC_DIR')
+    if directory and time.monotonic() - _last_flush > config['METRICS_FLUSH_SECONDS']:
+        _last_flush = time.monotonic()
+        flush(directory)
+
+
+def authorized():
+    """A scraper with the METRICS_TOKEN bearer token, or a logged-in admin"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return True
+    if 'user_id' not in session:
+        return False
+    from models import User
+    user = User.query.get(session['user_id'])
+    return user is not None and user.is_admin
+
+
+def metrics_endpoint():
+    if not authorized():
+        return jsonify({'error': 'Admin access or metrics token required'}), 403
+    counters, histograms = collect()
+    return Response(render(counters, histograms), mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app):
+    """Register request instrumentation and the /api/metrics endpoint"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    directory = app.config.get('METRICS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        # A snapshot under this pid is left over from an earlier process
+        retire_workers(directory, os.getpid())
+        atexit.register(retire_this_worker, directory)
+
+    app.before_request(start_request)
+    app.after_request(record_response)
+    app.teardown_request(finish_request)
+    app.add_url_rule('/api/metrics', 'metrics', metrics_endpoint)
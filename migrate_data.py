@@ -4,14 +4,47 @@ Data Migration Script: LocalStorage to Database
 This script helps migrate data from browser localStorage to MySQL database
 """
 
+import argparse
+import hashlib
 import json
 import mysql.connector
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
 from werkzeug.security import generate_password_hash
 from datetime import datetime
+from sqlalchemy import create_engine
+from json_stream import StreamingExport
+from migrations import upgrade
 import os
 
+# (collection in the export, migrate method, collections that must be imported first).
+# Everything except users only needs the user mapping, so those run concurrently.
+MIGRATION_TASKS = [
+    ('users', 'migrate_users', ()),
+    ('issues', 'migrate_issues', ('users',)),
+    ('feedback', 'migrate_feedback', ('users',)),
+    ('lostFoundItems', 'migrate_lost_found', ('users',)),
+    ('orders', 'migrate_orders', ('users',)),
+    ('rides', 'migrate_rides', ('users',)),
+]
+
+class DryRunUserMapping(dict):
+    """User mapping for dry runs: users outside the sample map to a sampled user, so
+    dependent records are timed as real inserts instead of being skipped"""
+    def __init__(self, mapping):
+        super().__init__(mapping)
+        self.fallback = next(iter(mapping.values()), None)
+    
+    def get(self, key, default=None):
+        return dict.get(self, key, self.fallback)
+    
+    def __getitem__(self, key):
+        return self.get(key)
+
 class DataMigrator:
-    def __init__(self):
+    def __init__(self, chunk_size=1000, hash_workers=None, workers=5):
         self.db_config = {
             'host': 'localhost',
             'user': 'root',
@@ -19,34 +52,42 @@ class DataMigrator:
             'database': 'college_portal'
         }
         self.connection = None
+        self.chunk_size = chunk_size
+        self.hash_workers = hash_workers or os.cpu_count() or 1
+        self.hash_pool = None
+        self.workers = workers
+        self.source_id = None
+        self.dry_run = False
+        self.user_mapping = {}
+        self.stats = {}
+        self.progress = {}
         
+    def connect(self):
+        """Open a new connection; each concurrently migrated table gets its own"""
+        return mysql.connector.connect(**self.db_config)
+    
     def connect_database(self):
         """Connect to MySQL database"""
         try:
-            self.connection = mysql.connector.connect(**self.db_config)
+            self.connection = self.connect()
             print("✅ Connected to MySQL database successfully!")
             return True
         except mysql.connector.Error as err:
             print(f"❌ Error connecting to database: {err}")
             return False
     
+    def database_url(self):
+        """SQLAlchemy URL for the same database the connector uses"""
+        config = self.db_config
+        return (f"mysql+mysqlconnector://{config['user']}:{config['password']}"
+                f"@{config['host']}/{config['database']}")
+    
     def setup_database(self):
-        """Create database and tables if they don't exist"""
+        """Create or upgrade tables with the versioned schema migrations"""
         try:
-            # Read and execute the SQL setup file
-            with open('database_setup.sql', 'r') as file:
-                sql_commands = file.read()
-            
-            cursor = self.connection.cursor()
-            
-            # Split commands by semicolon and execute each
-            for command in sql_commands.split(';'):
-                command = command.strip()
-                if command:
-                    cursor.execute(command)
-            
-            self.connection.commit()
-            cursor.close()
+            engine = create_engine(self.database_url())
+            upgrade(engine)
+            engine.dispose()
             print("✅ Database setup completed!")
             return True
             
@@ -54,75 +95,133 @@ class DataMigrator:
             print(f"❌ Error setting up database: {e}")
             return False
     
-    def migrate_users(self, users_data):
-        """Migrate users from localStorage to database"""
-        if not users_data:
-            print("ℹ️ No users data to migrate")
+    def rebuild_sales_rollup(self):
+        """Recount the hourly cafeteria sales rollup after importing orders"""
+        from sales import rebuild_rollup
+        engine = create_engine(self.database_url())
+        with engine.begin() as conn:
+            rows = rebuild_rollup(conn)
+        engine.dispose()
+        print(f"📊 Rebuilt the sales rollup ({rows} rows)")
+    
+    def load_checkpoint(self, connection, collection):
+        """Number of records of a collection already imported from this source"""
+        if not self.source_id:
+            return 0
+        cursor = connection.cursor()
+        cursor.execute("SELECT position FROM import_checkpoints WHERE source = %s AND collection = %s",
+                       (self.source_id, collection))
+        row = cursor.fetchone()
+        cursor.close()
+        return row[0] if row else 0
+    
+    def save_checkpoint(self, cursor, collection, position):
+        """Record progress in the same transaction as the rows it covers"""
+        if not self.source_id or self.dry_run:
             return
-            
-        cursor = self.connection.cursor()
+        cursor.execute("""
+        INSERT INTO import_checkpoints (source, collection, position, updated_at)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE position = VALUES(position), updated_at = VALUES(updated_at)
+        """, (self.source_id, collection, position, datetime.now()))
+    
+    def import_collection(self, collection, records, insert_query, prepare_chunk, connection=None):
+        """Insert records in chunks with executemany, committing and checkpointing per chunk"""
+        connection = connection or self.connection
+        records = iter(records or [])
+        position = start = self.load_checkpoint(connection, collection)
+        if position:
+            print(f"⏩ Resuming {collection} after {position} records")
+            for _ in islice(records, position):
+                pass
+        self.progress.setdefault(collection, {'total': None})['position'] = position
+        
+        cursor = connection.cursor()
         migrated_count = 0
+        started = time.perf_counter()
         
-        for user in users_data:
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+            
             try:
-                # Check if user already exists
-                cursor.execute("SELECT id FROM users WHERE username = %s OR email = %s", 
-                             (user.get('username'), user.get('email')))
-                
-                if cursor.fetchone():
-                    print(f"⚠️ User {user.get('username')} already exists, skipping...")
-                    continue
-                
-                # Insert new user
-                insert_query = """
-                INSERT INTO users (username, email, password_hash, created_at)
-                VALUES (%s, %s, %s, %s)
-                """
-                
-                # Hash the password (assuming plain text in localStorage)
-                password_hash = generate_password_hash(user.get('password', 'defaultpass123'))
-                created_at = user.get('registeredAt', datetime.now().isoformat())
-                
-                cursor.execute(insert_query, (
-                    user.get('username'),
-                    user.get('email'),
-                    password_hash,
-                    created_at
-                ))
-                
-                migrated_count += 1
-                print(f"✅ Migrated user: {user.get('username')}")
-                
+                # prepare_chunk returns the rows to insert, or (rows, records migrated)
+                # when it inserts parent rows itself and returns child rows
+                prepared = prepare_chunk(cursor, chunk)
+                rows, migrated = prepared if isinstance(prepared, tuple) else (prepared, len(prepared))
+                if rows:
+                    cursor.executemany(insert_query, rows)
+                position += len(chunk)
+                self.save_checkpoint(cursor, collection, position)
+                if not self.dry_run:
+                    connection.commit()
+                migrated_count += migrated
+                self.progress[collection]['position'] = position
             except Exception as e:
-                print(f"❌ Error migrating user {user.get('username')}: {e}")
+                connection.rollback()
+                cursor.close()
+                print(f"❌ Error migrating {collection} at record {position}: {e}")
+                print("   Fix the problem and run the script again to resume from here.")
+                raise
         
-        self.connection.commit()
         cursor.close()
-        print(f"📊 Migrated {migrated_count} users successfully!")
+        elapsed = time.perf_counter() - started
+        rate = migrated_count / elapsed if elapsed > 0 else 0
+        self.stats[collection] = {'rows': migrated_count, 'records': position - start,
+                                  'seconds': elapsed, 'rows_per_second': rate}
+        print(f"📊 Migrated {migrated_count} {collection} in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+        return migrated_count
     
-    def migrate_issues(self, issues_data, user_mapping):
-        """Migrate issues from localStorage to database"""
-        if not issues_data:
-            print("ℹ️ No issues data to migrate")
-            return
+    def migrate_users(self, users_data, connection=None):
+        """Migrate users from localStorage to database"""
+        def prepare_chunk(cursor, chunk):
+            # Skip users that already exist, in one query per chunk
+            usernames = [user.get('username') for user in chunk]
+            emails = [user.get('email') for user in chunk]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"SELECT username, email FROM users WHERE username IN ({placeholders}) "
+                           f"OR email IN ({placeholders})", usernames + emails)
+            taken = set()
+            for username, email in cursor.fetchall():
+                taken.update((username, email))
             
-        cursor = self.connection.cursor()
-        migrated_count = 0
+            new_users = []
+            for user in chunk:
+                if user.get('username') in taken or user.get('email') in taken:
+                    print(f"⚠️ User {user.get('username')} already exists, skipping...")
+                    continue
+                taken.update((user.get('username'), user.get('email')))
+                new_users.append(user)
+            
+            # Hash the passwords (assuming plain text in localStorage) across processes
+            passwords = [user.get('password', 'defaultpass123') for user in new_users]
+            hashes = self.hash_pool.map(generate_password_hash, passwords,
+                                        chunksize=max(1, len(passwords) // (self.hash_workers * 4)))
+            
+            return [(
+                user.get('username'),
+                user.get('email'),
+                password_hash,
+                user.get('registeredAt', datetime.now().isoformat())
+            ) for user, password_hash in zip(new_users, hashes)]
         
-        for issue in issues_data:
-            try:
+        return self.import_collection('users', users_data, """
+        INSERT INTO users (username, email, password_hash, created_at)
+        VALUES (%s, %s, %s, %s)
+        """, prepare_chunk, connection)
+    
+    def migrate_issues(self, issues_data, user_mapping, connection=None):
+        """Migrate issues from localStorage to database"""
+        def prepare_chunk(cursor, chunk):
+            rows = []
+            for issue in chunk:
                 # Map userId to database user ID
                 user_id = user_mapping.get(issue.get('userId'))
                 if not user_id:
                     print(f"⚠️ User ID {issue.get('userId')} not found, skipping issue...")
                     continue
-                
-                insert_query = """
-                INSERT INTO issues (user_id, category, title, description, location, priority, status, upvotes, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                
-                cursor.execute(insert_query, (
+                rows.append((
                     user_id,
                     issue.get('category', 'General'),
                     issue.get('title', 'Untitled Issue'),
@@ -133,95 +232,132 @@ class DataMigrator:
                     issue.get('upvotes', 0),
                     issue.get('createdAt', datetime.now().isoformat())
                 ))
-                
-                migrated_count += 1
-                
-            except Exception as e:
-                print(f"❌ Error migrating issue: {e}")
+            return rows
         
-        self.connection.commit()
-        cursor.close()
-        print(f"📊 Migrated {migrated_count} issues successfully!")
+        return self.import_collection('issues', issues_data, """
+        INSERT INTO issues (user_id, category, title, description, location, priority, status, upvotes, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, prepare_chunk, connection)
     
-    def migrate_feedback(self, feedback_data, user_mapping):
+    def migrate_feedback(self, feedback_data, user_mapping, connection=None):
         """Migrate feedback from localStorage to database"""
-        if not feedback_data:
-            print("ℹ️ No feedback data to migrate")
-            return
-            
-        cursor = self.connection.cursor()
-        migrated_count = 0
+        def prepare_chunk(cursor, chunk):
+            return [(
+                user_mapping[feedback.get('userId')],
+                feedback.get('category', 'General'),
+                feedback.get('rating', 5),
+                feedback.get('text', ''),
+                feedback.get('createdAt', datetime.now().isoformat())
+            ) for feedback in chunk if user_mapping.get(feedback.get('userId'))]
         
-        for feedback in feedback_data:
-            try:
-                user_id = user_mapping.get(feedback.get('userId'))
+        return self.import_collection('feedback', feedback_data, """
+        INSERT INTO feedback (user_id, category, rating, text, created_at)
+        VALUES (%s, %s, %s, %s, %s)
+        """, prepare_chunk, connection)
+    
+    def migrate_lost_found(self, items_data, user_mapping, connection=None):
+        """Migrate lost and found items from localStorage to database"""
+        def prepare_chunk(cursor, chunk):
+            return [(
+                user_mapping[item.get('userId')],
+                item.get('type', 'lost'),
+                item.get('name', 'Unknown Item'),
+                item.get('description', ''),
+                item.get('location', ''),
+                item.get('contact', ''),
+                item.get('createdAt', datetime.now().isoformat())
+            ) for item in chunk if user_mapping.get(item.get('userId'))]
+        
+        return self.import_collection('lostFoundItems', items_data, """
+        INSERT INTO lost_found_items (user_id, type, name, description, location, contact, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, prepare_chunk, connection)
+    
+    def migrate_orders(self, orders_data, user_mapping, connection=None):
+        """Migrate cafeteria orders and their items from localStorage to database"""
+        def prepare_chunk(cursor, chunk):
+            item_rows = []
+            migrated = 0
+            for order in chunk:
+                user_id = user_mapping.get(order.get('userId'))
                 if not user_id:
                     continue
                 
-                insert_query = """
-                INSERT INTO feedback (user_id, category, rating, text, created_at)
-                VALUES (%s, %s, %s, %s, %s)
-                """
-                
-                cursor.execute(insert_query, (
+                # Order IDs are needed for the items, so orders go in one by one
+                cursor.execute("""
+                INSERT INTO orders (user_id, total_amount, status, created_at)
+                VALUES (%s, %s, %s, %s)
+                """, (
                     user_id,
-                    feedback.get('category', 'General'),
-                    feedback.get('rating', 5),
-                    feedback.get('text', ''),
-                    feedback.get('createdAt', datetime.now().isoformat())
+                    order.get('total', 0),
+                    order.get('status', 'Pending'),
+                    order.get('createdAt', datetime.now().isoformat())
                 ))
+                order_id = cursor.lastrowid
+                migrated += 1
                 
-                migrated_count += 1
-                
-            except Exception as e:
-                print(f"❌ Error migrating feedback: {e}")
+                for item in order.get('items', []):
+                    item_rows.append((
+                        order_id,
+                        item.get('name', 'Unknown Item'),
+                        item.get('quantity', 1),
+                        item.get('price', 0)
+                    ))
+            return item_rows, migrated
         
-        self.connection.commit()
-        cursor.close()
-        print(f"📊 Migrated {migrated_count} feedback entries successfully!")
+        return self.import_collection('orders', orders_data, """
+        INSERT INTO order_items (order_id, item_name, quantity, price)
+        VALUES (%s, %s, %s, %s)
+        """, prepare_chunk, connection)
     
-    def migrate_lost_found(self, items_data, user_mapping):
-        """Migrate lost and found items from localStorage to database"""
-        if not items_data:
-            print("ℹ️ No lost & found data to migrate")
-            return
-            
-        cursor = self.connection.cursor()
-        migrated_count = 0
-        
-        for item in items_data:
-            try:
-                user_id = user_mapping.get(item.get('userId'))
-                if not user_id:
+    def migrate_rides(self, rides_data, user_mapping, connection=None):
+        """Migrate offered rides and their passengers from localStorage to database"""
+        def prepare_chunk(cursor, chunk):
+            booking_rows = []
+            migrated = 0
+            for ride in chunk:
+                driver_id = user_mapping.get(ride.get('userId'))
+                if not driver_id:
                     continue
                 
-                insert_query = """
-                INSERT INTO lost_found_items (user_id, type, name, description, location, contact, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """
-                
-                cursor.execute(insert_query, (
-                    user_id,
-                    item.get('type', 'lost'),
-                    item.get('name', 'Unknown Item'),
-                    item.get('description', ''),
-                    item.get('location', ''),
-                    item.get('contact', ''),
-                    item.get('createdAt', datetime.now().isoformat())
+                seats = ride.get('seats', 1)
+                cursor.execute("""
+                INSERT INTO rides (driver_id, from_location, to_location, departure_time, total_seats,
+                                   available_seats, price_per_person, status, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, (
+                    driver_id,
+                    ride.get('from', ''),
+                    ride.get('to', ''),
+                    ride.get('dateTime', datetime.now().isoformat()),
+                    seats,
+                    ride.get('availableSeats', seats),
+                    ride.get('price', 0),
+                    'Active',
+                    ride.get('createdAt', datetime.now().isoformat())
                 ))
+                ride_id = cursor.lastrowid
+                migrated += 1
                 
-                migrated_count += 1
-                
-            except Exception as e:
-                print(f"❌ Error migrating lost/found item: {e}")
+                for passenger in ride.get('passengers', []):
+                    passenger_id = user_mapping.get(passenger.get('userId'))
+                    if passenger_id:
+                        booking_rows.append((
+                            ride_id,
+                            passenger_id,
+                            'Confirmed',
+                            passenger.get('bookedAt', datetime.now().isoformat())
+                        ))
+            return booking_rows, migrated
         
-        self.connection.commit()
-        cursor.close()
-        print(f"📊 Migrated {migrated_count} lost & found items successfully!")
+        return self.import_collection('rides', rides_data, """
+        INSERT INTO ride_bookings (ride_id, passenger_id, status, booked_at)
+        VALUES (%s, %s, %s, %s)
+        """, prepare_chunk, connection)
     
-    def get_user_mapping(self):
+    def get_user_mapping(self, connection=None):
         """Get mapping of old user IDs to new database IDs"""
-        cursor = self.connection.cursor()
+        cursor = (connection or self.connection).cursor()
         cursor.execute("SELECT id, username FROM users")
         users = cursor.fetchall()
         cursor.close()
@@ -233,7 +369,69 @@ class DataMigrator:
         
         return mapping
     
-    def run_migration(self, localStorage_data):
+    def clear_checkpoints(self):
+        """Forget recorded progress for this source so the import starts over"""
+        cursor = self.connection.cursor()
+        cursor.execute("DELETE FROM import_checkpoints WHERE source = %s", (self.source_id,))
+        self.connection.commit()
+        cursor.close()
+    
+    def run_task(self, collection, method_name, records):
+        """Migrate one collection on its own connection"""
+        connection = self.connect()
+        try:
+            method = getattr(self, method_name)
+            if collection == 'users':
+                method(records, connection=connection)
+                self.user_mapping = self.get_user_mapping(connection)
+            else:
+                method(records, self.user_mapping, connection=connection)
+        finally:
+            connection.close()
+    
+    def run_tasks(self, localStorage_data):
+        """Run MIGRATION_TASKS as soon as their dependencies finish, up to self.workers at once"""
+        pending = list(MIGRATION_TASKS)
+        running = {}
+        done, failed = set(), set()
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while pending or running:
+                for task in list(pending):
+                    collection, method_name, depends_on = task
+                    if failed.intersection(depends_on):
+                        print(f"⚠️ Skipping {collection}: {', '.join(failed.intersection(depends_on))} failed")
+                        pending.remove(task)
+                        failed.add(collection)
+                    elif done.issuperset(depends_on) and len(running) < self.workers:
+                        records = localStorage_data.get(collection, [])
+                        running[executor.submit(self.run_task, collection, method_name, records)] = collection
+                        pending.remove(task)
+                
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    collection = running.pop(future)
+                    (failed if future.exception() else done).add(collection)
+        
+        return not failed
+    
+    def report_progress(self, stop, interval):
+        """Print the position of every started collection until stop is set"""
+        while not stop.wait(interval):
+            parts = []
+            for collection, progress in self.progress.items():
+                if 'position' not in progress:
+                    continue
+                if progress['total']:
+                    parts.append(f"{collection} {progress['position']:,}/{progress['total']:,}")
+                else:
+                    parts.append(f"{collection} {progress['position']:,}")
+            if parts:
+                print("⏳ " + " | ".join(parts))
+    
+    def run_migration(self, localStorage_data, source_id=None, restart=False, progress_interval=10):
         """Run the complete migration process"""
         print("🚀 Starting data migration from localStorage to database...")
         
@@ -243,30 +441,124 @@ class DataMigrator:
         if not self.setup_database():
             return False
         
-        # Parse localStorage data
-        users = localStorage_data.get('users', [])
-        issues = localStorage_data.get('issues', [])
-        feedback = localStorage_data.get('feedback', [])
-        lost_found = localStorage_data.get('lostFoundItems', [])
+        self.source_id = source_id
+        if source_id and restart:
+            self.clear_checkpoints()
         
-        # Migrate data
-        self.migrate_users(users)
-        user_mapping = self.get_user_mapping()
-        self.migrate_issues(issues, user_mapping)
-        self.migrate_feedback(feedback, user_mapping)
-        self.migrate_lost_found(lost_found, user_mapping)
+        # localStorage_data is a dict, or a StreamingExport that reads each collection lazily
+        for collection, _, _ in MIGRATION_TASKS:
+            records = localStorage_data.get(collection, [])
+            self.progress[collection] = {'total': len(records) if hasattr(records, '__len__') else None}
         
+        stop = threading.Event()
+        reporter = threading.Thread(target=self.report_progress, args=(stop, progress_interval), daemon=True)
+        reporter.start()
+        started = time.perf_counter()
+        try:
+            with ProcessPoolExecutor(max_workers=self.hash_workers) as self.hash_pool:
+                success = self.run_tasks(localStorage_data)
+        finally:
+            stop.set()
+        if not success:
+            return False
+        
+        # Orders were inserted directly, so the sales rollup has to be recounted
+        if self.stats.get('orders', {}).get('rows') and not self.dry_run:
+            self.rebuild_sales_rollup()
+        
+        total_rows = sum(stat['rows'] for stat in self.stats.values())
+        total_seconds = time.perf_counter() - started
+        if total_seconds:
+            print(f"📈 {total_rows} rows in {total_seconds:.1f}s ({total_rows / total_seconds:,.0f} rows/s overall)")
         print("✅ Migration completed successfully!")
         return True
     
+    def estimate(self, localStorage_data, sample_size=2000):
+        """Dry run: import a sample of each collection in a rolled-back transaction and
+        extrapolate the full migration time from its throughput"""
+        print(f"🧪 Dry run: timing the first {sample_size} records of each collection (nothing is committed)")
+        
+        if not self.connect_database():
+            return False
+        
+        if not self.setup_database():
+            return False
+        
+        self.dry_run = True
+        durations = {}
+        try:
+            # One connection in dependency order, so sampled users are visible to the mapping
+            with ProcessPoolExecutor(max_workers=self.hash_workers) as self.hash_pool:
+                for collection, method_name, _ in MIGRATION_TASKS:
+                    records = localStorage_data.get(collection, [])
+                    total = len(records) if hasattr(records, '__len__') else sum(1 for _ in records)
+                    sample = islice(localStorage_data.get(collection, []), sample_size)
+                    
+                    method = getattr(self, method_name)
+                    if collection == 'users':
+                        method(sample)
+                        self.user_mapping = DryRunUserMapping(self.get_user_mapping())
+                    else:
+                        method(sample, self.user_mapping)
+                    
+                    stat = self.stats[collection]
+                    rate = stat['records'] / stat['seconds'] if stat['records'] and stat['seconds'] else 0
+                    durations[collection] = total / rate if rate else 0
+                    print(f"   {collection:<15} {total:>10,} records  ~{rate:,.0f}/s  ~{durations[collection]:,.0f}s")
+        except Exception as e:
+            print(f"❌ Dry run failed: {e}")
+            return False
+        finally:
+            self.connection.rollback()
+            self.dry_run = False
+        
+        # Users first, then the rest greedily packed onto the worker connections
+        lanes = [0.0] * self.workers
+        for collection in sorted((c for c in durations if c != 'users'), key=durations.get, reverse=True):
+            lanes[lanes.index(min(lanes))] += durations[collection]
+        parallel = durations.get('users', 0) + max(lanes)
+        print(f"⏱️ Estimated duration: ~{parallel:,.0f}s with {self.workers} workers "
+              f"(~{sum(durations.values()):,.0f}s sequentially), "
+              f"assuming the database keeps up with {self.workers} concurrent writers")
+        return True
+    
     def close_connection(self):
         """Close database connection"""
         if self.connection:
             self.connection.close()
             print("🔒 Database connection closed")
 
+def source_fingerprint(path, sample_size=1024 * 1024):
+    """Identify an export file by its size and the hash of its first and last megabyte"""
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(sample_size))
+        if size > sample_size:
+            f.seek(max(sample_size, size - sample_size))
+            digest.update(f.read(sample_size))
+    return f"{os.path.basename(path)}:{digest.hexdigest()[:32]}"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Migrate exported localStorage data into the database')
+    parser.add_argument('--input', default='localStorage_data.json', help='exported localStorage JSON file')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='rows per INSERT batch and commit')
+    parser.add_argument('--hash-workers', type=int, default=None, help='processes used to hash passwords')
+    parser.add_argument('--restart', action='store_true', help='ignore saved progress and import from the start')
+    parser.add_argument('--stream', action='store_true',
+                        help='read the file incrementally instead of loading it into memory (for large exports)')
+    parser.add_argument('--workers', type=int, default=5,
+                        help='tables migrated concurrently, each on its own connection, once users are done')
+    parser.add_argument('--progress-seconds', type=float, default=10, help='interval between progress lines')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='time a sample of each collection without committing and estimate the total duration')
+    parser.add_argument('--sample-size', type=int, default=2000, help='records per collection timed by --dry-run')
+    return parser.parse_args()
+
 def main():
     """Main migration function"""
+    args = parse_args()
+    
     print("=" * 60)
     print("📦 College Portal Data Migration Tool")
     print("=" * 60)
@@ -283,7 +575,8 @@ def main():
        issues: JSON.parse(localStorage.getItem('issues') || '[]'),
        feedback: JSON.parse(localStorage.getItem('feedback') || '[]'),
        lostFoundItems: JSON.parse(localStorage.getItem('lostFoundItems') || '[]'),
-       orders: JSON.parse(localStorage.getItem('orders') || '[]')
+       orders: JSON.parse(localStorage.getItem('orders') || '[]'),
+       rides: JSON.parse(localStorage.getItem('rides') || '[]')
    }));
 
 4. Copy the output and save it as 'localStorage_data.json' in this directory
@@ -291,23 +584,32 @@ def main():
     """)
     
     # Check if data file exists
-    if not os.path.exists('localStorage_data.json'):
-        print("❌ localStorage_data.json not found!")
+    if not os.path.exists(args.input):
+        print(f"❌ {args.input} not found!")
         print("Please follow the instructions above to export your data first.")
         return
     
     # Load localStorage data
     try:
-        with open('localStorage_data.json', 'r') as f:
-            localStorage_data = json.load(f)
-        print("✅ localStorage data loaded successfully!")
+        if args.stream:
+            localStorage_data = StreamingExport(args.input)
+            print("✅ Streaming localStorage data from file")
+        else:
+            with open(args.input, 'r') as f:
+                localStorage_data = json.load(f)
+            print("✅ localStorage data loaded successfully!")
     except Exception as e:
         print(f"❌ Error loading localStorage data: {e}")
         return
     
     # Run migration
-    migrator = DataMigrator()
-    success = migrator.run_migration(localStorage_data)
+    migrator = DataMigrator(chunk_size=args.chunk_size, hash_workers=args.hash_workers, workers=args.workers)
+    if args.dry_run:
+        migrator.estimate(localStorage_data, sample_size=args.sample_size)
+        migrator.close_connection()
+        return
+    success = migrator.run_migration(localStorage_data, source_id=source_fingerprint(args.input),
+                                     restart=args.restart, progress_interval=args.progress_seconds)
     migrator.close_connection()
     
     if success:
@@ -317,6 +619,7 @@ def main():
         print("2. Update your frontend to use API calls instead of localStorage")
     else:
         print("\n❌ Migration failed. Please check the errors above.")
+        print("Run the script again to resume; completed batches will not be imported twice.")
 
 if __name__ == "__main__":
     main()
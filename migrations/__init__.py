@@ -0,0 +1,132 @@
+"""
+Versioned schema migrations.
+
+Each module in ``migrations/versions`` is named ``NNNN_description.py`` and
+defines ``upgrade(conn)``. Applied versions are recorded in the
+``schema_migrations`` table, so ``upgrade`` only runs what is pending.
+
+    python -m migrations status
+    python -m migrations upgrade
+"""
+
+import importlib
+import os
+import pkgutil
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+
+VERSIONS_PACKAGE = 'migrations.versions'
+VERSIONS_DIR = os.path.join(os.path.dirname(__file__), 'versions')
+
+schema_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', schema_metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+class Migration:
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.module = module
+
+    @property
+    def description(self):
+        return (self.module.__doc__ or self.name).strip().splitlines()[0]
+
+
+def load_migrations():
+    """All migrations in version order"""
+    migrations = []
+    for module_info in pkgutil.iter_modules([VERSIONS_DIR]):
+        version, _, name = module_info.name.partition('_')
+        if not version.isdigit():
+            continue
+        module = importlib.import_module(f'{VERSIONS_PACKAGE}.{module_info.name}')
+        migrations.append(Migration(int(version), name, module))
+    return sorted(migrations, key=lambda migration: migration.version)
+
+
+def latest_version():
+    migrations = load_migrations()
+    return migrations[-1].version if migrations else 0
+
+
+def current_version(conn):
+    """Highest applied version, or 0 for a database that has never been migrated"""
+    if not inspect(conn).has_table('schema_migrations'):
+        return 0
+    versions = conn.execute(select(schema_migrations.c.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def pending(conn):
+    applied = current_version(conn)
+    return [migration for migration in load_migrations() if migration.version > applied]
+
+
+def upgrade(engine, target=None, log=print):
+    """Apply pending migrations up to ``target`` (default: latest), one transaction each"""
+    applied = []
+    with engine.connect() as lock_conn:
+        # Several gunicorn workers may start at once; serialize them on MySQL
+        is_mysql = engine.dialect.name == 'mysql'
+        if is_mysql:
+            lock_conn.execute(text("SELECT GET_LOCK('college_portal_migrations', 60)"))
+
+        try:
+            with engine.begin() as conn:
+                schema_metadata.create_all(conn, checkfirst=True)
+
+            with engine.connect() as conn:
+                migrations = pending(conn)
+
+            for migration in migrations:
+                if target is not None and migration.version > target:
+                    break
+                log(f'Applying migration {migration.version:04d}: {migration.description}')
+                with engine.begin() as conn:
+                    migration.module.upgrade(conn)
+                    conn.execute(schema_migrations.insert().values(
+                        version=migration.version,
+                        name=migration.name,
+                        applied_at=datetime.utcnow()
+                    ))
+                applied.append(migration.version)
+        finally:
+            if is_mysql:
+                lock_conn.execute(text("SELECT RELEASE_LOCK('college_portal_migrations')"))
+
+    return applied
+
+
+def create_index(conn, name, table, *columns, **kwargs):
+    """Create an index unless one with the same name already exists"""
+    existing = {index['name'] for index in inspect(conn).get_indexes(table)}
+    if name in existing:
+        return False
+    quoted = ', '.join(conn.dialect.identifier_preparer.quote(column) for column in columns)
+    where = kwargs.get('where')
+    unique = kwargs.get('unique', False)
+    # Partial indexes are only used where the dialect supports them. Elsewhere a
+    # partial unique index is left out: without its WHERE it would cover every row.
+    partial = conn.dialect.name in ('sqlite', 'postgresql')
+    if where and unique and not partial:
+        return False
+    suffix = f' WHERE {where}' if where and partial else ''
+    conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({quoted}){suffix}"))
+    return True
+
+
+def add_column(conn, table, column):
+    """Add a Column to an existing table unless it is already there"""
+    existing = {info['name'] for info in inspect(conn).get_columns(table)}
+    if column.name in existing:
+        return False
+    preparer = conn.dialect.identifier_preparer
+    column_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {preparer.quote(table)} ADD COLUMN {preparer.quote(column.name)} {column_type}'))
+    return True
@@ -0,0 +1,30 @@
+import argparse
+from sqlalchemy import create_engine
+from config import Config
+from migrations import current_version, latest_version, load_migrations, upgrade
+
+
+def main():
+    parser = argparse.ArgumentParser(description='College Portal schema migrations')
+    parser.add_argument('command', choices=['upgrade', 'status'])
+    parser.add_argument('--target', type=int, help='stop after this version (upgrade only)')
+    parser.add_argument('--database-url', default=Config.SQLALCHEMY_DATABASE_URI)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+
+    if args.command == 'upgrade':
+        applied = upgrade(engine, target=args.target)
+        print(f'Applied {len(applied)} migration(s)' if applied else 'Database is up to date')
+        return
+
+    with engine.connect() as conn:
+        applied = current_version(conn)
+    print(f'Current version: {applied:04d}  Latest: {latest_version():04d}')
+    for migration in load_migrations():
+        state = 'applied' if migration.version <= applied else 'pending'
+        print(f'  {migration.version:04d} {state:<8} {migration.description}')
+
+
+if __name__ == '__main__':
+    main()
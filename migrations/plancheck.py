@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Query plan check for the list, stats and dashboard endpoints.
+
+Builds a throwaway SQLite database with the migrations, seeds it, replays each
+endpoint through the Flask test client while capturing its SELECT statements
+and runs EXPLAIN QUERY PLAN on every one. Exits with status 1 if a filtered or
+sorted query scans a whole table, or sorts a page in a temporary B-tree,
+instead of using an index.
+
+    python -m migrations.plancheck [--rows 2000]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ENDPOINTS = [
+    '/api/issues/', '/api/issues/?status=Pending', '/api/issues/?category=Plumbing',
+    '/api/issues/my', '/api/issues/my?status=Resolved', '/api/issues/stats',
+    '/api/feedback/', '/api/feedback/?category=Cafeteria', '/api/feedback/?rating=5',
+    '/api/feedback/my', '/api/feedback/stats',
+    '/api/lost-found/items', '/api/lost-found/items?type=lost', '/api/lost-found/items/my',
+    '/api/lost-found/stats',
+    '/api/transport/rides', '/api/transport/rides/my', '/api/transport/bookings/my',
+    '/api/transport/stats',
+    '/api/cafeteria/orders', '/api/cafeteria/admin/orders', '/api/cafeteria/admin/orders?status=Pending',
+    '/api/cafeteria/sales/top-items', '/api/cafeteria/sales/demand?item=Coffee', '/api/cafeteria/sales/revenue',
+    '/api/cafeteria/sales/forecast',
+    '/api/dashboard/stats', '/api/dashboard/recent-activity', '/api/dashboard/overview',
+    '/api/dashboard/admin/stats',
+]
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+# Sorts over rows already narrowed to one user's data, where no index can order a join
+ALLOWED_TEMP_SORTS = [
+    ('/api/dashboard/overview', 'JOIN ride_bookings'),  # one passenger's confirmed bookings
+    ('/api/cafeteria/sales/top-items', 'GROUP BY order_sales_hourly.item_name'),  # one row per menu item
+]
+
+USER = 'plancheck'
+PASSWORD = 'plancheck-password'
+
+
+def seed(conn, rows):
+    """Insert a synthetic campus dataset sized around ``rows`` per table"""
+    from werkzeug.security import generate_password_hash
+    from models import User, Issue, Order, OrderItem, Feedback, LostFoundItem, Ride, RideBooking
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    user_count = max(10, rows // 10)
+
+    def past():
+        return now - timedelta(minutes=rng.randint(1, 60 * 24 * 365))
+
+    users = [{'username': USER, 'email': f'{USER}@college.edu', 'is_admin': True,
+              'password_hash': generate_password_hash(PASSWORD), 'created_at': past()}]
+    users += [{'username': f'student{i}', 'email': f'student{i}@college.edu', 'is_admin': False,
+               'password_hash': 'x', 'created_at': past()} for i in range(1, user_count)]
+    conn.execute(User.__table__.insert(), users)
+
+    def user_id():
+        return rng.randint(1, user_count)
+
+    issues = []
+    for _ in range(rows):
+        created = past()
+        issues.append({'user_id': user_id(), 'title': 'Broken tap', 'description': 'Leaking all day',
+                       'category': rng.choice(['Infrastructure', 'Electrical', 'Plumbing', 'Cleaning', 'Internet']),
+                       'location': 'Block A', 'priority': rng.choice(['Low', 'Medium', 'High', 'Critical']),
+                       'status': rng.choice(['Pending', 'In Progress', 'Resolved', 'Closed']),
+                       'upvotes': 0, 'created_at': created, 'updated_at': created})
+    conn.execute(Issue.__table__.insert(), issues)
+
+    conn.execute(Order.__table__.insert(), [
+        {'user_id': user_id(), 'total_amount': 70, 'created_at': past(),
+         'status': rng.choice(['Pending', 'Preparing', 'Ready', 'Completed', 'Cancelled'])}
+        for _ in range(rows)
+    ])
+    conn.execute(OrderItem.__table__.insert(), [
+        {'order_id': order_id, 'item_name': name, 'quantity': 1, 'price': price}
+        for order_id in range(1, rows + 1) for name, price in (('Coffee', 30), ('Chicken Burger', 40))
+    ])
+
+    conn.execute(Feedback.__table__.insert(), [
+        {'user_id': user_id(), 'rating': rng.randint(1, 5), 'text': 'Could be better', 'created_at': past(),
+         'category': rng.choice(['Academic', 'Infrastructure', 'Cafeteria', 'Hostel', 'Transport'])}
+        for _ in range(rows)
+    ])
+
+    conn.execute(LostFoundItem.__table__.insert(), [
+        {'user_id': user_id(), 'type': rng.choice(['lost', 'found']), 'name': 'Umbrella',
+         'description': 'Black umbrella', 'location': 'Library', 'contact': 'desk',
+         'status': rng.choice(['Active', 'Resolved']), 'created_at': past()}
+        for _ in range(rows)
+    ])
+
+    rides = []
+    for _ in range(rows):
+        departure = now + timedelta(minutes=rng.randint(-60 * 24 * 60, 60 * 24 * 14))
+        rides.append({'driver_id': user_id(), 'from_location': 'Campus', 'to_location': 'City Centre',
+                      'departure_time': departure, 'total_seats': 4, 'available_seats': rng.randint(0, 4),
+                      'price_per_person': 50, 'created_at': departure - timedelta(days=2),
+                      'status': 'Active' if departure > now else rng.choice(['Active', 'Completed', 'Cancelled'])})
+    conn.execute(Ride.__table__.insert(), rides)
+    bookings, booked = [], set()
+    for _ in range(rows):
+        booking = {'ride_id': rng.randint(1, rows), 'passenger_id': user_id(), 'booked_at': past(),
+                   'status': rng.choice(['Confirmed', 'Confirmed', 'Cancelled'])}
+        # At most one open booking per passenger and ride (uq_ride_bookings_open)
+        if booking['status'] == 'Confirmed':
+            if (booking['ride_id'], booking['passenger_id']) in booked:
+                booking['status'] = 'Cancelled'
+            booked.add((booking['ride_id'], booking['passenger_id']))
+        bookings.append(booking)
+    conn.execute(RideBooking.__table__.insert(), bookings)
+
+
+def plan_problems(endpoint, statement, plan):
+    """Full scans or page sorts in a filtered/sorted query plan"""
+    upper = statement.upper()
+    sort_allowed = any(endpoint == allowed and fragment.upper() in upper
+                       for allowed, fragment in ALLOWED_TEMP_SORTS)
+    filtered = ' WHERE ' in upper or ' ORDER BY ' in upper
+    problems = []
+    for detail in plan:
+        match = FULL_SCAN.match(detail)
+        if match and filtered and not match.group(1).startswith('anon_'):
+            problems.append(f'full scan of {match.group(1)}')
+        if detail.startswith(TEMP_SORT) and ' LIMIT ' in upper and not sort_allowed:
+            problems.append('page sorted in a temporary B-tree')
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check list/stats query plans for full table scans')
+    parser.add_argument('--rows', type=int, default=2000, help='rows per table in the seeded database')
+    parser.add_argument('--verbose', action='store_true', help='print every plan')
+    args = parser.parse_args(argv)
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='plancheck-'), 'plancheck.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ.pop('DATABASE_REPLICA_URL', None)
+    os.environ['SCHEDULER_ENABLED'] = 'false'  # no background queries in the captured plans
+
+    from sqlalchemy import create_engine, event
+    from migrations import upgrade
+    from app import app
+    from models import db
+
+    engine = create_engine(os.environ['DATABASE_URL'])
+    upgrade(engine, log=lambda message: None)
+    with engine.begin() as conn:
+        seed(conn, args.rows)
+        conn.exec_driver_sql('ANALYZE')
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    client = app.test_client()
+    client.post('/api/auth/login', json={'username': USER, 'password': PASSWORD})
+
+    failures = 0
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', capture)
+
+    for endpoint in ENDPOINTS:
+        captured.clear()
+        response = client.get(endpoint)
+        if response.status_code != 200:
+            print(f'FAIL {endpoint}: HTTP {response.status_code}')
+            failures += 1
+            continue
+
+        seen = set()
+        for statement, parameters in captured:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            with engine.connect() as conn:
+                plan = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+            problems = plan_problems(endpoint, statement, plan)
+            if problems or args.verbose:
+                print(f"{'FAIL' if problems else 'ok  '} {endpoint}: {' '.join(statement.split())[:160]}")
+                for detail in plan:
+                    print(f'       {detail}')
+            failures += bool(problems)
+
+    print(f'{len(ENDPOINTS)} endpoints checked, {failures} problem(s)')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Query-count check: every route against its budget in query_budgets.json.
+
+Builds a throwaway SQLite database with the migrations, seeds it, replays a
+request to every route through the Flask test client and counts the SQL
+statements each one runs. List endpoints are requested again with page sizes
+of 1 and 100 and with ``fields=card``; their statement count must not change
+with the page size, so a lazy relationship loaded once per row (N+1) fails the
+check even when a small page stays under budget. Exits with status 1 if a
+request fails, a route goes over budget, has no budget, or is not exercised
+here. tests/test_query_budgets.py runs the same check under pytest.
+
+    python -m migrations.querycheck [--rows 500] [--verbose]
+    python -m migrations.querycheck --update   # rewrite the budgets to the counts measured now
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit, parse_qsl, urlunsplit
+
+from migrations.plancheck import seed, USER, PASSWORD
+
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_budgets.json')
+
+# Smallest valid PNG, for the upload routes
+PIXEL_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489'
+    '0000000d4944415478da636460f85f0f0002870180eb47ba920000000049454e44ae426082'
+)
+
+NEW_USER = {'username': 'querycheck', 'email': 'querycheck@college.edu', 'password': 'querycheck-password'}
+LOGIN_ADMIN = {'username': USER, 'password': PASSWORD}
+LOGIN_NEW_USER = {'username': NEW_USER['username'], 'password': NEW_USER['password']}
+
+
+def last_seat(payload):
+    """A ride with one seat left, so booking it fills it for the waitlist requests"""
+    return next(ride['id'] for ride in payload['rides'] if ride['available_seats'] == 1 and ride['driver_id'] != 1)
+
+
+# Archived by the orders/archive request; a list ending here reads only the archive
+ARCHIVED_BEFORE = (date.today() - timedelta(days=180)).isoformat()
+
+
+# (method, path, body, (name, id from the response)) in order: later paths use
+# the ids saved by earlier requests, and deletes come after everything that
+# reads the row. Requests run as the seeded admin unless they log in again.
+REQUESTS = [
+    ('POST', '/api/auth/register', NEW_USER, None),
+    ('GET', '/api/auth/check-session', None, None),
+    ('GET', '/api/auth/me', None, None),
+    ('POST', '/api/auth/logout', None, None),
+    ('POST', '/api/auth/login', LOGIN_ADMIN, None),
+
+    ('GET', '/api/health', None, None),
+    ('GET', '/api/health/live', None, None),
+    ('GET', '/api/health/ready', None, None),
+    ('GET', '/api/metrics', None, None),
+
+    ('POST', '/api/uploads/', PIXEL_PNG, ('photo', lambda payload: payload['photo'])),
+    ('GET', '/api/uploads/{photo}?variant=original', None, None),
+
+    ('GET', '/api/cafeteria/menu', None, None),
+    ('POST', '/api/cafeteria/orders', {'items': [{'name': 'Coffee', 'quantity': 2}, {'name': 'Chicken Burger', 'quantity': 1}]},
+     ('order', lambda payload: payload['order']['id'])),
+    ('GET', '/api/cafeteria/orders', None, None),
+    ('GET', '/api/cafeteria/orders/{order}', None, None),
+    ('GET', '/api/cafeteria/admin/orders?status=Pending', None, None),
+    ('PUT', '/api/cafeteria/orders/{order}/cancel', None, None),
+    ('PUT', '/api/cafeteria/admin/orders/1/status', {'status': 'Preparing'}, None),
+    ('GET', '/api/cafeteria/sales/top-items?sort=revenue', None, None),
+    ('GET', '/api/cafeteria/sales/demand?item=Coffee&weekday=0', None, None),
+    ('GET', '/api/cafeteria/sales/revenue?interval=month&from=2000-01-01', None, None),
+    ('GET', '/api/cafeteria/sales/forecast?item=Coffee', None, None),
+
+    ('POST', '/api/issues/', {'category': 'Plumbing', 'title': 'Leaking tap', 'description': 'Second floor washroom',
+                              'location': 'Block A', 'priority': 'High', 'photo': '{photo}'},
+     ('issue', lambda payload: payload['issue']['id'])),
+    ('GET', '/api/issues/', None, None),
+    ('GET', '/api/issues/my', None, None),
+    ('GET', '/api/issues/{issue}', None, None),
+    ('POST', '/api/issues/{issue}/upvote', None, None),
+    ('PUT', '/api/issues/{issue}/status', {'status': 'In Progress'}, None),
+    ('GET', '/api/issues/stats', None, None),
+
+    ('POST', '/api/lost-found/items', {'type': 'lost', 'name': 'Umbrella', 'description': 'Black umbrella',
+                                       'location': 'Library', 'contact': 'querycheck@college.edu'},
+     ('item', lambda payload: payload['item']['id'])),
+    ('GET', '/api/lost-found/items', None, None),
+    ('GET', '/api/lost-found/items/my', None, None),
+    ('GET', '/api/lost-found/items/{item}', None, None),
+    ('PUT', '/api/lost-found/items/{item}', {'description': 'Black umbrella with a wooden handle'}, None),
+    ('PUT', '/api/lost-found/items/{item}/resolve', None, None),
+    ('GET', '/api/lost-found/stats', None, None),
+
+    ('POST', '/api/feedback/', {'category': 'Cafeteria', 'rating': 4, 'text': 'Good coffee'},
+     ('feedback', lambda payload: payload['feedback']['id'])),
+    ('GET', '/api/feedback/', None, None),
+    ('GET', '/api/feedback/my', None, None),
+    ('GET', '/api/feedback/{feedback}', None, None),
+    ('GET', '/api/feedback/categories', None, None),
+    ('GET', '/api/feedback/stats', None, None),
+
+    ('POST', '/api/transport/rides', {'from_location': 'Campus', 'to_location': 'Airport',
+                                      'departure_time': '2099-01-01T09:00:00', 'total_seats': 3, 'price_per_person': 50},
+     ('ride', lambda payload: payload['ride']['id'])),
+    ('GET', '/api/transport/rides', None, ('bookable', last_seat)),
+    ('GET', '/api/transport/rides/my', None, None),
+    ('GET', '/api/transport/rides/{ride}', None, None),
+    ('GET', '/api/transport/rides/match?from=campus&to=airport&time=2099-01-01T08:45:00&window=30', None, None),
+    ('POST', '/api/transport/rides/{bookable}/book', None, ('booking', lambda payload: payload['booking']['id'])),
+    ('GET', '/api/transport/bookings/my', None, None),
+    # The new user queues for the now full ride and is offered the seat the admin gives up
+    ('POST', '/api/auth/login', LOGIN_NEW_USER, None),
+    ('POST', '/api/transport/rides/{bookable}/waitlist', None, ('waitlisted', lambda payload: payload['booking']['id'])),
+    ('POST', '/api/auth/login', LOGIN_ADMIN, None),
+    ('PUT', '/api/transport/bookings/{booking}/cancel', None, None),
+    ('POST', '/api/auth/login', LOGIN_NEW_USER, None),
+    ('GET', '/api/transport/events', None, None),
+    ('PUT', '/api/transport/bookings/{waitlisted}/confirm', None, None),
+    ('POST', '/api/auth/login', LOGIN_ADMIN, None),
+    ('PUT', '/api/transport/rides/{ride}/cancel', None, None),
+    ('GET', '/api/transport/stats', None, None),
+
+    ('GET', '/api/dashboard/stats', None, None),
+    ('GET', '/api/dashboard/recent-activity', None, None),
+    ('GET', '/api/dashboard/overview', None, None),
+    ('GET', '/api/dashboard/admin/stats', None, None),
+    ('POST', '/api/batch', {'requests': [{'path': '/api/issues/stats'}, {'path': '/api/transport/rides?fields=card'}]}, None),
+    ('GET', '/api/admin/export/issues?format=ndjson', None, None),
+    ('POST', '/api/admin/users/1/cancel-rides', {'dry_run': True}, None),
+    ('POST', '/api/admin/issues/close-resolved', {'older_than_days': 30}, None),
+    ('POST', '/api/admin/orders/archive', {'older_than_days': 90}, None),
+    ('GET', f'/api/cafeteria/admin/orders?status=Completed&from=2000-01-01&to={ARCHIVED_BEFORE}', None, None),
+    ('GET', '/api/cafeteria/orders?status=Completed&from=2000-01-01', None, None),
+
+    ('DELETE', '/api/feedback/{feedback}', None, None),
+    ('DELETE', '/api/lost-found/items/{item}', None, None),
+    ('DELETE', '/api/issues/{issue}', None, None),
+]
+
+# Routes outside the API
+IGNORED_ENDPOINTS = {'static'}
+
+
+def with_args(path, **args):
+    parts = urlsplit(path)
+    query = dict(parse_qsl(parts.query), **args)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def fill(value, ids):
+    if isinstance(value, str):
+        return value.format(**ids)
+    if isinstance(value, dict):
+        return {key: fill(item, ids) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, ids) for item in value]
+    return value
+
+
+def route_key(app, method, path):
+    rule, _ = app.url_map.bind('localhost').match(urlsplit(path).path, method, return_rule=True)
+    return f'{method} {rule.rule}'
+
+
+def all_routes(app):
+    return sorted(f'{method} {rule.rule}' for rule in app.url_map.iter_rules()
+                  if rule.endpoint not in IGNORED_ENDPOINTS
+                  for method in rule.methods - {'HEAD', 'OPTIONS'})
+
+
+def prepare(rows=500):
+    """Migrate and seed a throwaway SQLite database and import the app against it
+
+    The app reads its configuration when it is imported, so this must run
+    before anything else in the process imports ``app``.
+    """
+    if 'app' in sys.modules:
+        raise RuntimeError('querycheck must import the app itself; run it in a fresh process')
+
+    work_dir = tempfile.mkdtemp(prefix='querycheck-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, 'querycheck.db')}"
+    os.environ['UPLOAD_FOLDER'] = os.path.join(work_dir, 'uploads')
+    os.makedirs(os.environ['UPLOAD_FOLDER'])
+    os.environ['AUTO_MIGRATE'] = 'false'
+    os.environ.pop('DATABASE_REPLICA_URL', None)
+    os.environ['SCHEDULER_ENABLED'] = 'false'  # no background writes while counting statements
+    os.environ['RIDE_EVENTS_WSGI'] = 'true'  # count the Flask version of /api/transport/events
+    os.environ['RIDE_EVENTS_STREAM_SECONDS'] = '0'  # which returns after its first check
+
+    from sqlalchemy import create_engine
+    from migrations import upgrade
+    from app import app
+
+    engine = create_engine(os.environ['DATABASE_URL'])
+    upgrade(engine, log=lambda message: None)
+    with engine.begin() as conn:
+        seed(conn, rows)
+        conn.exec_driver_sql('ANALYZE')
+    engine.dispose()
+    return app
+
+
+def replay(app, verbose=False):
+    """Send every request in REQUESTS; returns ({route: most statements seen}, failures)
+
+    A request that fails is recorded and the requests needing an id it would
+    have returned are skipped, so one failure doesn't hide the other routes.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    statements = []
+
+    # On Engine rather than db.engine, so connections opened outside the session (exports) count too
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client = app.test_client()
+    ids = {}
+    measured = {}
+    failures = []
+
+    def send(method, path, body):
+        statements.clear()
+        if isinstance(body, bytes):
+            response = client.open(path, method=method, data=body, content_type='application/octet-stream')
+        else:
+            response = client.open(path, method=method, json=body)
+        response.get_data()
+        if verbose:
+            print(f'{method} {path}: {len(statements)} queries, HTTP {response.status_code}')
+            for statement in statements:
+                print(f"       {' '.join(statement.split())[:160]}")
+        return response, len(statements)
+
+    event.listen(Engine, 'before_cursor_execute', count)
+    try:
+        for method, template, body, save in REQUESTS:
+            try:
+                path, body = fill(template, ids), fill(body, ids)
+            except KeyError as e:
+                failures.append(f'{method} {template}: skipped, needs {{{e.args[0]}}} from a request that failed')
+                continue
+            key = route_key(app, method, path)
+            response, queries = send(method, path, body)
+            if response.status_code >= 400:
+                failures.append(f'{method} {path}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}')
+                continue
+            counts = {path: queries}
+
+            payload = response.get_json(silent=True)
+            if save:
+                try:
+                    ids[save[0]] = save[1](payload)
+                except (KeyError, TypeError, StopIteration):
+                    failures.append(f'{method} {path}: no {{{save[0]}}} in the response')
+            if method == 'GET' and isinstance(payload, dict) and 'pagination' in payload:
+                for variant in (with_args(path, per_page=1), with_args(path, per_page=100),
+                                with_args(path, per_page=100, fields='card')):
+                    counts[variant] = send(method, variant, None)[1]
+                by_size = {counts[with_args(path, per_page=1)], counts[with_args(path, per_page=100)]}
+                if len(by_size) > 1:
+                    failures.append(f'{key}: {min(by_size)} queries for 1 row, {max(by_size)} for 100 (one per row?)')
+
+            measured[key] = max(measured.get(key, 0), *counts.values())
+    finally:
+        event.remove(Engine, 'before_cursor_execute', count)
+    return measured, failures
+
+
+def load_budgets():
+    with open(BUDGET_FILE) as f:
+        return json.load(f)
+
+
+def check_budgets(app, measured, budgets):
+    """Routes that are not exercised, have no budget, or went over it (only the first with budgets None)"""
+    failures = []
+    for key in all_routes(app):
+        if key not in measured:
+            failures.append(f'{key}: not exercised by migrations/querycheck.py')
+        elif budgets is None:
+            continue
+        elif key not in budgets:
+            failures.append(f'{key}: no budget in {os.path.basename(BUDGET_FILE)} ({measured[key]} queries now)')
+        elif measured[key] > budgets[key]:
+            failures.append(f'{key}: {measured[key]} queries, budget {budgets[key]}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the SQL statements per request against query_budgets.json')
+    parser.add_argument('--rows', type=int, default=500, help='rows per table in the seeded database')
+    parser.add_argument('--verbose', action='store_true', help='print the statements of every request')
+    parser.add_argument('--update', action='store_true', help='write the measured counts as the new budgets')
+    args = parser.parse_args()
+
+    app = prepare(args.rows)
+    budgets = load_budgets()
+    measured, failures = replay(app, args.verbose)
+
+    failures += check_budgets(app, measured, None if args.update else budgets)
+    if args.update:
+        with open(BUDGET_FILE, 'w') as f:
+            json.dump(dict(sorted(measured.items())), f, indent=2)
+            f.write('\n')
+        print(f'Wrote {len(measured)} budgets to {BUDGET_FILE}')
+
+    print(f"{'route':<62}{'queries':>8}{'budget':>8}")
+    for key, queries in sorted(measured.items()):
+        print(f"{key:<62}{queries:>8}{budgets.get(key, '-'):>8}")
+    for failure in failures:
+        print(f'FAIL {failure}')
+    print(f'{len(measured)} routes checked, {len(failures)} problem(s)')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Create the base tables (users, issues, orders, feedback, lost & found, rides)"""
+
+from sqlalchemy import (Boolean, Column, DateTime, ForeignKey, Integer, MetaData, Numeric,
+                        String, Table, Text, text)
+from migrations import create_index
+
+# Frozen copy of the schema at this version; later changes belong in new migrations
+metadata = MetaData()
+
+Table(
+    'users', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(80), unique=True, nullable=False),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('password_hash', String(255), nullable=False),
+    Column('is_admin', Boolean, server_default=text('0')),
+    Column('created_at', DateTime, server_default=text('CURRENT_TIMESTAMP'))
+)
+
+Table(
+    'issues', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+    Column('category', String(50), nullable=False),
+    Column('title', String(200), nullable=False),
+    Column('description', Text, nullable=False),
+    Column('location', String(200), nullable=False),
+    Column('priority', String(20), nullable=False),
+    Column('status', String(20), server_default='Pending'),
+    Column('upvotes', Integer, server_default=text('0')),
+    Column('photo_path', String(255)),
+    Column('created_at', DateTime, server_default=text('CURRENT_TIMESTAMP')),
+    Column('updated_at', DateTime, server_default=text('CURRENT_TIMESTAMP'))
+)
+
+Table(
+    'orders', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+    Column('total_amount', Numeric(10, 2), nullable=False),
+    Column('status', String(20), server_default='Pending'),
+    Column('created_at', DateTime, server_default=text('CURRENT_TIMESTAMP'))
+)
+
+Table(
+    'order_items', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('order_id', Integer, ForeignKey('orders.id', ondelete='CASCADE'), nullable=False),
+    Column('item_name', String(100), nullable=False),
+    Column('quantity', Integer, nullable=False),
+    Column('price', Numeric(10, 2), nullable=False)
+)
+
+Table(
+    'feedback', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+    Column('category', String(50), nullable=False),
+    Column('rating', Integer, nullable=False),
+    Column('text', Text, nullable=False),
+    Column('created_at', DateTime, server_default=text('CURRENT_TIMESTAMP'))
+)
+
+Table(
+    'lost_found_items', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+    Column('type', String(10), nullable=False),
+    Column('name', String(100), nullable=False),
+    Column('description', Text, nullable=False),
+    Column('location', String(200), nullable=False),
+    Column('contact', String(100), nullable=False),
+    Column('status', String(20), server_default='Active'),
+    Column('created_at', DateTime, server_default=text('CURRENT_TIMESTAMP'))
+)
+
+Table(
+    'rides', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('driver_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+    Column('from_location', String(200), nullable=False),
+    Column('to_location', String(200), nullable=False),
+    Column('departure_time', DateTime, nullable=False),
+    Column('total_seats', Integer, nullable=False),
+    Column('available_seats', Integer, nullable=False),
+    Column('price_per_person', Numeric(10, 2), nullable=False),
+    Column('status', String(20), server_default='Active'),
+    Column('created_at', DateTime, server_default=text('CURRENT_TIMESTAMP'))
+)
+
+Table(
+    'ride_bookings', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('ride_id', Integer, ForeignKey('rides.id', ondelete='CASCADE'), nullable=False),
+    Column('passenger_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+    Column('status', String(20), server_default='Confirmed'),
+    Column('booked_at', DateTime, server_default=text('CURRENT_TIMESTAMP'))
+)
+
+# Single-column indexes from the original database_setup.sql
+INDEXES = [
+    ('idx_issues_user_id', 'issues', 'user_id'),
+    ('idx_issues_status', 'issues', 'status'),
+    ('idx_issues_category', 'issues', 'category'),
+    ('idx_orders_user_id', 'orders', 'user_id'),
+    ('idx_feedback_user_id', 'feedback', 'user_id'),
+    ('idx_lost_found_user_id', 'lost_found_items', 'user_id'),
+    ('idx_lost_found_type', 'lost_found_items', 'type'),
+    ('idx_rides_driver_id', 'rides', 'driver_id'),
+    ('idx_rides_departure', 'rides', 'departure_time'),
+    ('idx_ride_bookings_passenger', 'ride_bookings', 'passenger_id'),
+]
+
+
+def upgrade(conn):
+    # Tables that already exist (database_setup.sql or db.create_all) are left as they are
+    metadata.create_all(conn, checkfirst=True)
+    for name, table, column in INDEXES:
+        create_index(conn, name, table, column)
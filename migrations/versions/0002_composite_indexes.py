@@ -0,0 +1,51 @@
+"""Add composite indexes matching the filters and sort orders of the hot routes"""
+
+from migrations import create_index
+
+# (index name, table, columns, queries it serves)
+INDEXES = [
+    # issues.get_my_issues, dashboard recent activity / stats
+    ('ix_issues_user_created', 'issues', ('user_id', 'created_at'), 'my issues, recent activity'),
+    ('ix_issues_user_status_created', 'issues', ('user_id', 'status', 'created_at'), 'my issues by status, dashboard stats'),
+    # issues.get_issues ordered by created_at, filtered by status / category
+    ('ix_issues_created', 'issues', ('created_at',), 'issue list, weekly admin stats'),
+    ('ix_issues_status_created', 'issues', ('status', 'created_at'), 'issue list by status, stats counts'),
+    ('ix_issues_category_status', 'issues', ('category', 'status'), 'category filter, category breakdown'),
+    ('ix_issues_category_created', 'issues', ('category', 'created_at'), 'issue list by category'),
+    ('ix_issues_priority', 'issues', ('priority',), 'priority breakdown'),
+
+    # cafeteria.get_user_orders, get_all_orders, dashboard
+    ('ix_orders_user_created', 'orders', ('user_id', 'created_at'), 'my orders, recent activity'),
+    ('ix_orders_status_created', 'orders', ('status', 'created_at'), 'admin orders by status'),
+    ('ix_orders_created', 'orders', ('created_at',), 'admin orders, weekly admin stats'),
+    ('ix_order_items_order', 'order_items', ('order_id',), 'order items per order'),
+
+    # feedback.get_feedback, get_my_feedback, get_feedback_stats
+    ('ix_feedback_user_created', 'feedback', ('user_id', 'created_at'), 'my feedback, recent activity'),
+    ('ix_feedback_created', 'feedback', ('created_at',), 'feedback list'),
+    ('ix_feedback_category_rating', 'feedback', ('category', 'rating'), 'category filter, average rating per category'),
+    ('ix_feedback_category_created', 'feedback', ('category', 'created_at'), 'feedback list by category'),
+    ('ix_feedback_rating_created', 'feedback', ('rating', 'created_at'), 'feedback list by rating, rating breakdown'),
+
+    # lost_found.get_items (status always set, type optional), get_my_items, stats
+    ('ix_lost_found_status_created', 'lost_found_items', ('status', 'created_at'), 'item list'),
+    ('ix_lost_found_type_status_created', 'lost_found_items', ('type', 'status', 'created_at'), 'item list by type, lost/found counts'),
+    ('ix_lost_found_user_created', 'lost_found_items', ('user_id', 'created_at'), 'my items, recent activity'),
+
+    # transport.get_rides, get_my_rides, stats, dashboard overview
+    ('ix_rides_status_departure', 'rides', ('status', 'departure_time'), 'ride search, active ride counts'),
+    ('ix_rides_driver_departure', 'rides', ('driver_id', 'departure_time'), 'my rides, upcoming driving rides'),
+    ('ix_rides_driver_created', 'rides', ('driver_id', 'created_at'), 'recent activity'),
+    ('ix_ride_bookings_passenger_status', 'ride_bookings', ('passenger_id', 'status'), 'booked ride counts, upcoming passenger rides'),
+    ('ix_ride_bookings_passenger_booked', 'ride_bookings', ('passenger_id', 'booked_at'), 'my bookings'),
+    ('ix_ride_bookings_ride_status', 'ride_bookings', ('ride_id', 'status'), 'duplicate booking check, ride cancellation'),
+    ('ix_ride_bookings_status', 'ride_bookings', ('status',), 'confirmed booking count'),
+
+    # dashboard.get_admin_stats weekly new users
+    ('ix_users_created', 'users', ('created_at',), 'weekly new users'),
+]
+
+
+def upgrade(conn):
+    for name, table, columns, _ in INDEXES:
+        create_index(conn, name, table, *columns)
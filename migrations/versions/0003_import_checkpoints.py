@@ -0,0 +1,17 @@
+"""Add import_checkpoints for resumable localStorage imports"""
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+import_checkpoints = Table(
+    'import_checkpoints', metadata,
+    Column('source', String(255), primary_key=True),
+    Column('collection', String(50), primary_key=True),
+    Column('position', Integer, nullable=False),
+    Column('updated_at', DateTime, nullable=False)
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
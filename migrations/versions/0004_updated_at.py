@@ -0,0 +1,26 @@
+"""Add updated_at to edited tables for conditional GET validators"""
+
+from sqlalchemy import Column, DateTime, text
+from sqlalchemy.dialects import mysql
+from migrations import add_column
+
+# MySQL DATETIME is whole seconds by default; two edits within a second would
+# share a validator, so keep microseconds there
+TIMESTAMP = DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+
+# table -> column the new updated_at is backfilled from
+TABLES = {
+    'orders': 'created_at',
+    'lost_found_items': 'created_at',
+    'rides': 'created_at',
+    'ride_bookings': 'booked_at',
+}
+
+
+def upgrade(conn):
+    for table, source in TABLES.items():
+        if add_column(conn, table, Column('updated_at', TIMESTAMP)):
+            conn.execute(text(f'UPDATE {table} SET updated_at = {source}'))
+
+    if conn.dialect.name == 'mysql':
+        conn.execute(text('ALTER TABLE issues MODIFY updated_at DATETIME(6)'))
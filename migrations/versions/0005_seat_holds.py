@@ -0,0 +1,10 @@
+"""Add ride_bookings.hold_expires_at for waitlist seat holds"""
+
+from sqlalchemy import Column, DateTime
+from migrations import add_column, create_index
+
+
+def upgrade(conn):
+    add_column(conn, 'ride_bookings', Column('hold_expires_at', DateTime))
+    # Outstanding holds, loaded by each worker's hold timer on start
+    create_index(conn, 'ix_ride_bookings_status_hold', 'ride_bookings', 'status', 'hold_expires_at')
@@ -0,0 +1,75 @@
+"""Add archive tables and their aggregates for old orders, order items and feedback"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, Numeric, String, Table, Text
+from migrations import create_index
+
+metadata = MetaData()
+
+# Referenced by the foreign keys only; it exists already
+Table('users', metadata, Column('id', Integer, primary_key=True))
+
+ARCHIVE_TABLES = [
+    Table(
+        'orders_archive', metadata,
+        Column('id', Integer, primary_key=True, autoincrement=False),
+        Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        Column('total_amount', Numeric(10, 2), nullable=False),
+        Column('status', String(20)),
+        Column('created_at', DateTime),
+        Column('updated_at', DateTime),
+        Column('archived_at', DateTime, nullable=False)
+    ),
+    Table(
+        'order_items_archive', metadata,
+        Column('id', Integer, primary_key=True, autoincrement=False),
+        Column('order_id', Integer, ForeignKey('orders_archive.id', ondelete='CASCADE'), nullable=False),
+        Column('item_name', String(100), nullable=False),
+        Column('quantity', Integer, nullable=False),
+        Column('price', Numeric(10, 2), nullable=False)
+    ),
+    Table(
+        'feedback_archive', metadata,
+        Column('id', Integer, primary_key=True, autoincrement=False),
+        Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        Column('category', String(50), nullable=False),
+        Column('rating', Integer, nullable=False),
+        Column('text', Text, nullable=False),
+        Column('created_at', DateTime),
+        Column('archived_at', DateTime, nullable=False)
+    ),
+    Table(
+        'order_archive_stats', metadata,
+        Column('status', String(20), primary_key=True),
+        Column('orders', Integer, nullable=False),
+        Column('revenue', Numeric(12, 2), nullable=False)
+    ),
+    Table(
+        'feedback_archive_stats', metadata,
+        Column('category', String(50), primary_key=True),
+        Column('rating', Integer, primary_key=True, autoincrement=False),
+        Column('feedback', Integer, nullable=False)
+    ),
+    Table(
+        'archive_user_stats', metadata,
+        Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True,
+               autoincrement=False),
+        Column('orders', Integer, nullable=False),
+        Column('feedback', Integer, nullable=False)
+    ),
+]
+
+# The live tables' list indexes, for date-filtered lists that reach into the archive
+INDEXES = [
+    ('ix_orders_archive_created', 'orders_archive', ('created_at',)),
+    ('ix_orders_archive_status_created', 'orders_archive', ('status', 'created_at')),
+    ('ix_order_items_archive_order', 'order_items_archive', ('order_id',)),
+    ('ix_feedback_archive_created', 'feedback_archive', ('created_at',)),
+    ('ix_feedback_archive_category_created', 'feedback_archive', ('category', 'created_at')),
+    ('ix_feedback_archive_rating_created', 'feedback_archive', ('rating', 'created_at')),
+]
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=ARCHIVE_TABLES, checkfirst=True)
+    for name, table, columns in INDEXES:
+        create_index(conn, name, table, *columns)
@@ -0,0 +1,18 @@
+"""Add demand_forecasts, the nightly cafeteria demand forecast"""
+
+from sqlalchemy import Column, Date, DateTime, MetaData, Numeric, SmallInteger, String, Table
+
+metadata = MetaData()
+
+demand_forecasts = Table(
+    'demand_forecasts', metadata,
+    Column('day', Date, primary_key=True),
+    Column('hour', SmallInteger, primary_key=True, autoincrement=False),
+    Column('item_name', String(100), primary_key=True),
+    Column('quantity', Numeric(10, 2), nullable=False),
+    Column('generated_at', DateTime, nullable=False)
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[demand_forecasts], checkfirst=True)
@@ -0,0 +1,28 @@
+"""Replace the unique_booking key on ride_bookings with a guard on open bookings only"""
+
+from sqlalchemy import inspect, text
+from migrations import create_index
+
+# RideBooking.OPEN_STATUSES
+OPEN_STATUSES = "'Confirmed', 'Held', 'Waitlisted'"
+
+
+def upgrade(conn):
+    # The original database_setup.sql had UNIQUE KEY unique_booking (ride_id, passenger_id),
+    # which rejects booking a ride or joining its waitlist again after a cancelled booking or
+    # an expired hold. 0001 never created it; databases set up from that script still have it.
+    inspector = inspect(conn)
+    unique = {constraint['name'] for constraint in inspector.get_unique_constraints('ride_bookings')}
+    unique |= {index['name'] for index in inspector.get_indexes('ride_bookings') if index.get('unique')}
+    if 'unique_booking' in unique:
+        if conn.dialect.name == 'mysql':
+            # ix_ride_bookings_ride_status (0002) still backs the ride_id foreign key
+            conn.execute(text('ALTER TABLE ride_bookings DROP INDEX unique_booking'))
+        else:
+            conn.execute(text('ALTER TABLE ride_bookings DROP CONSTRAINT unique_booking'))
+
+    # One open booking per passenger and ride; cancelled, expired and completed ones may repeat.
+    # MySQL has no partial indexes; there book_ride and join_waitlist lock the ride row
+    # before checking for an open booking.
+    create_index(conn, 'uq_ride_bookings_open', 'ride_bookings', 'ride_id', 'passenger_id',
+                 where=f'status IN ({OPEN_STATUSES})', unique=True)
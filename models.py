@@ -1,10 +1,21 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from db_routing import RoutingSession
+from uploads import upload_url
 
 # This will be initialized in app.py
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
-class User(db.Model):
+class Serializable:
+    """to_dict() built from FIELDS: output name -> function of the instance"""
+    FIELDS = {}
+    
+    def to_dict(self, fields=None):
+        # Only the requested fields are read, so deferred columns and lazy relationships stay unloaded
+        return {name: value(self) for name, value in self.FIELDS.items()
+                if fields is None or name in fields}
+
+class User(Serializable, db.Model):
     __tablename__ = 'users'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -22,16 +33,15 @@ class User(db.Model):
     rides_offered = db.relationship('Ride', backref='driver', lazy=True)
     ride_bookings = db.relationship('RideBooking', backref='passenger', lazy=True)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'is_admin': self.is_admin,
-            'created_at': self.created_at.isoformat()
-        }
+    FIELDS = {
+        'id': lambda user: user.id,
+        'username': lambda user: user.username,
+        'email': lambda user: user.email,
+        'is_admin': lambda user: user.is_admin,
+        'created_at': lambda user: user.created_at.isoformat()
+    }
 
-class Issue(db.Model):
+class Issue(Serializable, db.Model):
     __tablename__ = 'issues'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -47,65 +57,65 @@ class Issue(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'username': self.user.username,
-            'category': self.category,
-            'title': self.title,
-            'description': self.description,
-            'location': self.location,
-            'priority': self.priority,
-            'status': self.status,
-            'upvotes': self.upvotes,
-            'photo_path': self.photo_path,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
-
-class Order(db.Model):
+    FIELDS = {
+        'id': lambda issue: issue.id,
+        'user_id': lambda issue: issue.user_id,
+        'username': lambda issue: issue.user.username,
+        'category': lambda issue: issue.category,
+        'title': lambda issue: issue.title,
+        'description': lambda issue: issue.description,
+        'location': lambda issue: issue.location,
+        'priority': lambda issue: issue.priority,
+        'status': lambda issue: issue.status,
+        'upvotes': lambda issue: issue.upvotes,
+        'photo_path': lambda issue: issue.photo_path,
+        'photo_url': lambda issue: upload_url(issue.photo_path),
+        'thumbnail_url': lambda issue: upload_url(issue.photo_path, 'thumb'),
+        'created_at': lambda issue: issue.created_at.isoformat(),
+        'updated_at': lambda issue: issue.updated_at.isoformat()
+    }
+
+class Order(Serializable, db.Model):
     __tablename__ = 'orders'
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    total_amount = db.Column(db.Decimal(10, 2), nullable=False)
+    total_amount = db.Column(db.Numeric(10, 2), nullable=False)
     status = db.Column(db.String(20), default='Pending')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'username': self.user.username,
-            'total_amount': float(self.total_amount),
-            'status': self.status,
-            'created_at': self.created_at.isoformat(),
-            'items': [item.to_dict() for item in self.items]
-        }
-
-class OrderItem(db.Model):
+    FIELDS = {
+        'id': lambda order: order.id,
+        'user_id': lambda order: order.user_id,
+        'username': lambda order: order.user.username,
+        'total_amount': lambda order: float(order.total_amount),
+        'status': lambda order: order.status,
+        'created_at': lambda order: order.created_at.isoformat(),
+        'items': lambda order: [item.to_dict() for item in order.items]
+    }
+
+class OrderItem(Serializable, db.Model):
     __tablename__ = 'order_items'
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
     item_name = db.Column(db.String(100), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
-    price = db.Column(db.Decimal(10, 2), nullable=False)
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'item_name': self.item_name,
-            'quantity': self.quantity,
-            'price': float(self.price),
-            'subtotal': float(self.price * self.quantity)
-        }
-
-class Feedback(db.Model):
+    price = db.Column(db.Numeric(10, 2), nullable=False)
+    
+    FIELDS = {
+        'id': lambda item: item.id,
+        'item_name': lambda item: item.item_name,
+        'quantity': lambda item: item.quantity,
+        'price': lambda item: float(item.price),
+        'subtotal': lambda item: float(item.price * item.quantity)
+    }
+
+class Feedback(Serializable, db.Model):
     __tablename__ = 'feedback'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -115,18 +125,17 @@ class Feedback(db.Model):
     text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'username': self.user.username,
-            'category': self.category,
-            'rating': self.rating,
-            'text': self.text,
-            'created_at': self.created_at.isoformat()
-        }
-
-class LostFoundItem(db.Model):
+    FIELDS = {
+        'id': lambda feedback: feedback.id,
+        'user_id': lambda feedback: feedback.user_id,
+        'username': lambda feedback: feedback.user.username,
+        'category': lambda feedback: feedback.category,
+        'rating': lambda feedback: feedback.rating,
+        'text': lambda feedback: feedback.text,
+        'created_at': lambda feedback: feedback.created_at.isoformat()
+    }
+
+class LostFoundItem(Serializable, db.Model):
     __tablename__ = 'lost_found_items'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -138,22 +147,22 @@ class LostFoundItem(db.Model):
     contact = db.Column(db.String(100), nullable=False)
     status = db.Column(db.String(20), default='Active')  # 'Active', 'Resolved'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'username': self.user.username,
-            'type': self.type,
-            'name': self.name,
-            'description': self.description,
-            'location': self.location,
-            'contact': self.contact,
-            'status': self.status,
-            'created_at': self.created_at.isoformat()
-        }
-
-class Ride(db.Model):
+    FIELDS = {
+        'id': lambda item: item.id,
+        'user_id': lambda item: item.user_id,
+        'username': lambda item: item.user.username,
+        'type': lambda item: item.type,
+        'name': lambda item: item.name,
+        'description': lambda item: item.description,
+        'location': lambda item: item.location,
+        'contact': lambda item: item.contact,
+        'status': lambda item: item.status,
+        'created_at': lambda item: item.created_at.isoformat()
+    }
+
+class Ride(Serializable, db.Model):
     __tablename__ = 'rides'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -163,44 +172,154 @@ class Ride(db.Model):
     departure_time = db.Column(db.DateTime, nullable=False)
     total_seats = db.Column(db.Integer, nullable=False)
     available_seats = db.Column(db.Integer, nullable=False)
-    price_per_person = db.Column(db.Decimal(10, 2), nullable=False)
+    price_per_person = db.Column(db.Numeric(10, 2), nullable=False)
     status = db.Column(db.String(20), default='Active')  # 'Active', 'Completed', 'Cancelled'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     bookings = db.relationship('RideBooking', backref='ride', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'driver_id': self.driver_id,
-            'driver_name': self.driver.username,
-            'from_location': self.from_location,
-            'to_location': self.to_location,
-            'departure_time': self.departure_time.isoformat(),
-            'total_seats': self.total_seats,
-            'available_seats': self.available_seats,
-            'price_per_person': float(self.price_per_person),
-            'status': self.status,
-            'created_at': self.created_at.isoformat(),
-            'passengers': [booking.passenger.username for booking in self.bookings]
-        }
-
-class RideBooking(db.Model):
+    FIELDS = {
+        'id': lambda ride: ride.id,
+        'driver_id': lambda ride: ride.driver_id,
+        'driver_name': lambda ride: ride.driver.username,
+        'from_location': lambda ride: ride.from_location,
+        'to_location': lambda ride: ride.to_location,
+        'departure_time': lambda ride: ride.departure_time.isoformat(),
+        'total_seats': lambda ride: ride.total_seats,
+        'available_seats': lambda ride: ride.available_seats,
+        'price_per_person': lambda ride: float(ride.price_per_person),
+        'status': lambda ride: ride.status,
+        'created_at': lambda ride: ride.created_at.isoformat(),
+        'passengers': lambda ride: [booking.passenger.username for booking in ride.bookings
+                                    if booking.status in RideBooking.BOOKED_STATUSES]
+    }
+    
+    def touch(self):
+        """Bump updated_at when one of the ride's bookings changes, so the ride's ETags change too"""
+        self.updated_at = datetime.utcnow()
+
+class RideBooking(Serializable, db.Model):
     __tablename__ = 'ride_bookings'
     
     id = db.Column(db.Integer, primary_key=True)
     ride_id = db.Column(db.Integer, db.ForeignKey('rides.id'), nullable=False)
     passenger_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    status = db.Column(db.String(20), default='Confirmed')  # 'Confirmed', 'Cancelled'
+    # 'Confirmed', 'Cancelled', 'Completed' (ride departed), 'Waitlisted', 'Held' (seat held until
+    # hold_expires_at), 'Expired' (hold lapsed, or still waitlisted at departure)
+    status = db.Column(db.String(20), default='Confirmed')
+    hold_expires_at = db.Column(db.DateTime)
     booked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Seats taken, now or on a ride that has departed
+    BOOKED_STATUSES = ('Confirmed', 'Completed')
+    # Bookings a passenger still has on an upcoming ride, seat or not
+    OPEN_STATUSES = ('Confirmed', 'Held', 'Waitlisted')
+    
+    FIELDS = {
+        'id': lambda booking: booking.id,
+        'ride_id': lambda booking: booking.ride_id,
+        'passenger_id': lambda booking: booking.passenger_id,
+        'passenger_name': lambda booking: booking.passenger.username,
+        'status': lambda booking: booking.status,
+        'hold_expires_at': lambda booking: booking.hold_expires_at.isoformat() if booking.hold_expires_at else None,
+        'booked_at': lambda booking: booking.booked_at.isoformat()
+    }
+
+# Orders and feedback older than ARCHIVE_AFTER_DAYS, moved out of the live tables
+# by archive.py. Same columns (and ids) plus archived_at, and the same FIELDS,
+# so archived rows serialize like live ones.
+class OrderArchive(Serializable, db.Model):
+    __tablename__ = 'orders_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    total_amount = db.Column(db.Numeric(10, 2), nullable=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+    
+    # Relationships
+    user = db.relationship('User')
+    items = db.relationship('OrderItemArchive', backref='order', lazy=True)
+    
+    FIELDS = Order.FIELDS
+
+class OrderItemArchive(Serializable, db.Model):
+    __tablename__ = 'order_items_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders_archive.id'), nullable=False)
+    item_name = db.Column(db.String(100), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Numeric(10, 2), nullable=False)
+    
+    FIELDS = OrderItem.FIELDS
+
+class FeedbackArchive(Serializable, db.Model):
+    __tablename__ = 'feedback_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    rating = db.Column(db.Integer, nullable=False)
+    text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+    
+    # Relationships
+    user = db.relationship('User')
+    
+    FIELDS = Feedback.FIELDS
+
+# Aggregates over the archive tables, kept up to date as rows are archived, so
+# the stats endpoints never read archived rows
+class OrderArchiveStats(db.Model):
+    __tablename__ = 'order_archive_stats'
+    
+    status = db.Column(db.String(20), primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+class FeedbackArchiveStats(db.Model):
+    __tablename__ = 'feedback_archive_stats'
+    
+    category = db.Column(db.String(50), primary_key=True)
+    rating = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    feedback = db.Column(db.Integer, nullable=False, default=0)
+
+class ArchiveUserStats(db.Model):
+    __tablename__ = 'archive_user_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True, autoincrement=False)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    feedback = db.Column(db.Integer, nullable=False, default=0)
+
+# Cafeteria sales per UTC hour an order was placed, item and order status, kept
+# current by the order views (sales.py). An order counts once for each item it
+# contains, under its current status.
+class OrderSalesHourly(db.Model):
+    __tablename__ = 'order_sales_hourly'
+    
+    day = db.Column(db.Date, primary_key=True)
+    hour = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)  # 0-23
+    item_name = db.Column(db.String(100), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    weekday = db.Column(db.SmallInteger, nullable=False)  # 0 = Monday
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+# Forecast quantity per item and UTC hour for the coming days, replaced nightly
+# by forecast.py from order_sales_hourly
+class DemandForecast(db.Model):
+    __tablename__ = 'demand_forecasts'
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'ride_id': self.ride_id,
-            'passenger_id': self.passenger_id,
-            'passenger_name': self.passenger.username,
-            'status': self.status,
-            'booked_at': self.booked_at.isoformat()
-        }
+    day = db.Column(db.Date, primary_key=True)
+    hour = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)  # 0-23
+    item_name = db.Column(db.String(100), primary_key=True)
+    quantity = db.Column(db.Numeric(10, 2), nullable=False)
+    generated_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,161 @@
+"""
+In-memory commute-matching index of active, future rides.
+
+Rides are grouped by (origin area, destination area, departure hour). Each
+group is a list of (departure_time, ride_id) kept sorted, so "rides between
+these areas within ±N minutes of 08:30" is a few dict lookups and bisects in
+memory instead of a substring scan of the rides table.
+
+Locations are free text, so an area is the normalized place name: lowercase
+words without punctuation or filler, with common spellings mapped by
+AREA_ALIASES ("Main Gate, Campus" and "campus main gate" are the same area).
+
+The index is built from the database on first use and kept current by the
+offer, book and cancel views of this process. Changes made in other worker
+processes are picked up on the next rebuild, every RIDE_INDEX_REFRESH_SECONDS;
+matches are re-read from the database, so a stale entry is never returned.
+"""
+
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from flask import current_app
+from functools import lru_cache
+from models import Ride, db
+import re
+import threading
+import time
+
+FILLER_WORDS = {'the', 'near', 'opp', 'opposite', 'road', 'rd'}
+
+AREA_ALIASES = {
+    'campus main gate': 'main gate',
+    'main gate campus': 'main gate',
+    'college main gate': 'main gate',
+    'city center': 'city centre',
+    'railway station': 'station',
+    'train station': 'station',
+    'bus stand': 'bus terminal',
+    'bus station': 'bus terminal',
+    'airport terminal': 'airport',
+}
+
+EPOCH = datetime(1970, 1, 1)
+BUCKET = timedelta(hours=1)
+
+
+@lru_cache(maxsize=4096)
+def area(location):
+    words = [word for word in re.findall(r'[a-z0-9]+', location.lower()) if word not in FILLER_WORDS]
+    name = ' '.join(words)
+    return AREA_ALIASES.get(name, name)
+
+
+def hour_bucket(moment):
+    return (moment - EPOCH) // BUCKET
+
+
+class RideIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.buckets = {}  # (origin, destination, hour) -> sorted [(departure_time, ride_id)]
+        self.rides = {}    # ride_id -> (bucket key, departure_time, available_seats)
+        self.built_at = None
+
+    def __len__(self):
+        return len(self.rides)
+
+    def _remove(self, ride_id):
+        entry = self.rides.pop(ride_id, None)
+        if entry is None:
+            return
+        key, departure, _ = entry
+        entries = self.buckets[key]
+        entries.pop(bisect_left(entries, (departure, ride_id)))
+        if not entries:
+            del self.buckets[key]
+
+    def _add(self, ride):
+        key = (area(ride.from_location), area(ride.to_location), hour_bucket(ride.departure_time))
+        insort(self.buckets.setdefault(key, []), (ride.departure_time, ride.id))
+        self.rides[ride.id] = (key, ride.departure_time, ride.available_seats)
+
+    def update(self, ride):
+        """Add, move or drop one ride after it was offered, booked or cancelled"""
+        with self.lock:
+            self._remove(ride.id)
+            if ride.status == 'Active' and ride.departure_time > datetime.utcnow():
+                self._add(ride)
+
+    def set_seats(self, ride_id, available_seats):
+        """Record a booking or cancellation without reloading the ride"""
+        with self.lock:
+            entry = self.rides.get(ride_id)
+            if entry is not None:
+                self.rides[ride_id] = entry[:2] + (available_seats,)
+
+    def remove(self, ride_id):
+        with self.lock:
+            self._remove(ride_id)
+
+    def invalidate(self):
+        """Rebuild on next use, after rides were changed in bulk"""
+        self.built_at = None
+
+    def rebuild(self, rides):
+        # Built aside and swapped in, so matching is not blocked meanwhile
+        fresh = RideIndex()
+        for ride in rides:
+            fresh._add(ride)
+        with self.lock:
+            self.buckets, self.rides = fresh.buckets, fresh.rides
+            self.built_at = time.monotonic()
+
+    def match(self, origin, destination, when, window_minutes, limit):
+        """[(ride_id, minutes from ``when``)] with a free seat, closest first"""
+        window = timedelta(minutes=window_minutes)
+        earliest = max(when - window, datetime.utcnow())
+        latest = when + window
+        origin, destination = area(origin), area(destination)
+
+        found = []
+        with self.lock:
+            for hour in range(hour_bucket(earliest), hour_bucket(latest) + 1):
+                entries = self.buckets.get((origin, destination, hour), ())
+                i = bisect_left(entries, (earliest,))
+                while i < len(entries) and entries[i][0] <= latest:
+                    departure, ride_id = entries[i]
+                    if self.rides[ride_id][2] > 0:
+                        found.append((abs(departure - when), ride_id, departure))
+                    i += 1
+        found.sort()
+        return [(ride_id, round((departure - when).total_seconds() / 60)) for _, ride_id, departure in found[:limit]]
+
+
+ride_index = RideIndex()
+
+
+def load_active_rides():
+    return db.session.query(Ride.id, Ride.from_location, Ride.to_location, Ride.departure_time,
+                            Ride.available_seats)\
+                     .filter(Ride.status == 'Active')\
+                     .filter(Ride.departure_time > datetime.utcnow())\
+                     .all()
+
+
+def current_index():
+    """The index, rebuilt first when it is missing or older than RIDE_INDEX_REFRESH_SECONDS"""
+    max_age = current_app.config['RIDE_INDEX_REFRESH_SECONDS']
+    built_at = ride_index.built_at
+    if built_at is not None and time.monotonic() - built_at < max_age:
+        return ride_index
+
+    # One thread rebuilds; the others keep using the previous index if there is one
+    if not ride_index.build_lock.acquire(blocking=built_at is None):
+        return ride_index
+    try:
+        if ride_index.built_at == built_at:
+            ride_index.rebuild(load_active_rides())
+    finally:
+        ride_index.build_lock.release()
+    return ride_index
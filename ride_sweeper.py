@@ -0,0 +1,53 @@
+"""
+Scheduled job: move departed rides from 'Active' to 'Completed'.
+
+Without it departed rides stay 'Active' forever, so the Active range of
+ix_rides_status_departure that every ride search and count walks keeps growing
+with history. Each run marks departed active rides Completed and their
+confirmed bookings Completed (holds and waitlist entries Expired),
+RIDE_SWEEP_CHUNK_SIZE rides per transaction and at most RIDE_SWEEP_MAX_CHUNKS
+chunks per run, so a large backlog is worked off over several runs without
+holding long locks.
+"""
+
+from datetime import datetime
+from flask import current_app
+from models import Ride, RideBooking, db
+from ride_index import ride_index
+import logging
+
+logger = logging.getLogger('college_portal.scheduler')
+
+
+def complete_departed_rides():
+    chunk_size = current_app.config['RIDE_SWEEP_CHUNK_SIZE']
+    max_chunks = current_app.config['RIDE_SWEEP_MAX_CHUNKS']
+    rides = bookings = 0
+
+    for _ in range(max_chunks):
+        ride_ids = [row.id for row in db.session.query(Ride.id)
+                                                .filter(Ride.status == 'Active')
+                                                .filter(Ride.departure_time <= datetime.utcnow())
+                                                .order_by(Ride.departure_time)
+                                                .limit(chunk_size)]
+        if not ride_ids:
+            break
+
+        # Re-check the status so a ride cancelled meanwhile stays Cancelled
+        rides += Ride.query.filter(Ride.id.in_(ride_ids), Ride.status == 'Active')\
+                           .update({'status': 'Completed'}, synchronize_session=False)
+        bookings += RideBooking.query.filter(RideBooking.ride_id.in_(ride_ids), RideBooking.status == 'Confirmed')\
+                                     .update({'status': 'Completed'}, synchronize_session=False)
+        # Seats still held or waited for when the ride left were never taken
+        RideBooking.query.filter(RideBooking.ride_id.in_(ride_ids), RideBooking.status.in_(('Held', 'Waitlisted')))\
+                         .update({'status': 'Expired', 'hold_expires_at': None}, synchronize_session=False)
+        db.session.commit()
+
+        for ride_id in ride_ids:
+            ride_index.remove(ride_id)
+        if len(ride_ids) < chunk_size:
+            break
+
+    if rides:
+        logger.info('Completed %d departed rides and %d bookings', rides, bookings)
+    return {'rides': rides, 'bookings': bookings}
@@ -0,0 +1,272 @@
+"""
+Ride waitlists and short-lived seat holds.
+
+Passengers queue for a full ride with a 'Waitlisted' booking instead of polling
+the ride list. A seat given up on a ride with a waitlist - a confirmed booking
+or a hold cancelled, or a hold lapsing - is offered to the first passenger in
+line as a hold ('Held' until hold_expires_at) in the same transaction, so it
+is never briefly free for someone else to take. The passenger confirms within
+RIDE_HOLD_SECONDS or the seat moves on; with nobody waiting it goes back to
+available_seats.
+
+Each worker expires holds with a timer: a heap of (hold_expires_at, booking id)
+and a thread that sleeps until the earliest one is due, so nothing scans the
+bookings. Holds this worker offers are pushed onto its heap, and on start it
+loads every outstanding hold, so a hold offered by a worker that has since
+exited still expires. Expiry is a conditional UPDATE, so when several workers
+have the same hold only one passes the seat on.
+
+Passengers hear about holds on a server-sent event stream
+(GET /api/transport/events). Events from this worker are pushed as they
+happen; the stream also re-reads the passenger's holds every
+RIDE_EVENTS_KEEPALIVE_SECONDS, which picks up holds offered by other workers.
+asgi.py serves the stream on its event loop; event_stream() below is the
+Flask version, which holds a worker thread per client and so is only routed
+with RIDE_EVENTS_WSGI for threaded or async gunicorn workers.
+"""
+
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import current_app, request
+from models import RideBooking, db
+from ride_index import ride_index
+import heapq
+import json
+import logging
+import queue
+import threading
+import time
+import metrics
+
+logger = logging.getLogger('college_portal.waitlist')
+
+Hold = namedtuple('Hold', 'booking_id ride_id passenger_id expires_at')
+
+
+def hold_payload(hold):
+    return {'booking_id': hold.booking_id, 'ride_id': hold.ride_id, 'expires_at': hold.expires_at.isoformat()}
+
+
+def release_seat(ride):
+    """Give a freed seat on ``ride`` to the first waitlisted passenger, or back to the ride
+
+    Runs in the caller's transaction. Returns the new Hold, or None when the seat
+    went back to available_seats; pass it to announce() after committing.
+    """
+    expires_at = datetime.utcnow() + timedelta(seconds=current_app.config['RIDE_HOLD_SECONDS'])
+    # A locking read sees the latest committed status (a plain SELECT under REPEATABLE READ
+    # keeps returning its snapshot), and skips a passenger another release is claiming
+    waiting = db.session.query(RideBooking.id, RideBooking.passenger_id)\
+                        .filter_by(ride_id=ride.id, status='Waitlisted')\
+                        .order_by(RideBooking.id)\
+                        .with_for_update(skip_locked=True)\
+                        .first()
+
+    # Still conditional, for databases without row locks
+    claimed = waiting is not None and RideBooking.query.filter_by(id=waiting.id, status='Waitlisted')\
+        .update({'status': 'Held', 'hold_expires_at': expires_at}, synchronize_session=False)
+    if not claimed:
+        ride.available_seats += 1
+        return None
+    return Hold(waiting.id, ride.id, waiting.passenger_id, expires_at)
+
+
+def announce(hold):
+    """Start the timer for a committed hold and tell its passenger"""
+    if hold is None:
+        return
+    timer = current_app.extensions.get('hold_timer')
+    if timer is not None:
+        timer.schedule(hold.booking_id, hold.expires_at)
+    notifier.publish(hold.passenger_id, 'hold_offered', hold_payload(hold))
+    metrics.inc('ride_holds_total', (('outcome', 'offered'),))
+
+
+def expire_hold(booking_id):
+    """Pass a lapsed hold on to the next passenger; a hold confirmed or cancelled meanwhile is left alone"""
+    now = datetime.utcnow()
+    expired = RideBooking.query.filter(RideBooking.id == booking_id,
+                                       RideBooking.status == 'Held',
+                                       RideBooking.hold_expires_at <= now)\
+                               .update({'status': 'Expired'}, synchronize_session=False)
+    if not expired:
+        db.session.rollback()
+        return None
+
+    booking = RideBooking.query.get(booking_id)
+    ride = booking.ride
+    ride.touch()
+    hold = None
+    if ride.status == 'Active' and ride.departure_time > now:
+        hold = release_seat(ride)
+    passenger_id, ride_id, available_seats = booking.passenger_id, ride.id, ride.available_seats
+    db.session.commit()
+
+    ride_index.set_seats(ride_id, available_seats)
+    notifier.publish(passenger_id, 'hold_expired', {'booking_id': booking_id, 'ride_id': ride_id})
+    metrics.inc('ride_holds_total', (('outcome', 'expired'),))
+    announce(hold)
+    return hold
+
+
+def outstanding_holds(passenger_id=None):
+    """[(booking id, ride id, hold_expires_at)] of bookings still Held"""
+    query = db.session.query(RideBooking.id, RideBooking.ride_id, RideBooking.hold_expires_at)\
+                      .filter(RideBooking.status == 'Held')
+    if passenger_id is not None:
+        query = query.filter(RideBooking.passenger_id == passenger_id)
+    return query.all()
+
+
+class HoldTimer:
+    """Expires this worker's seat holds as they fall due"""
+
+    def __init__(self, app):
+        self.app = app
+        self.queue = []  # heap of (hold_expires_at, booking id)
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def schedule(self, booking_id, expires_at):
+        with self.lock:
+            heapq.heappush(self.queue, (expires_at, booking_id))
+        self.wakeup.set()
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self.loop, name='hold-timer', daemon=True)
+        self.thread.start()
+
+    def load(self):
+        """Schedule every outstanding hold, including those offered by other workers"""
+        with self.app.app_context():
+            try:
+                for booking_id, _, expires_at in outstanding_holds():
+                    self.schedule(booking_id, expires_at)
+            except Exception:
+                logger.exception('Loading seat holds failed')
+            finally:
+                db.session.remove()
+
+    def loop(self):
+        self.load()
+        while True:
+            with self.lock:
+                delay = (self.queue[0][0] - datetime.utcnow()).total_seconds() if self.queue else None
+                booking_id = heapq.heappop(self.queue)[1] if delay is not None and delay <= 0 else None
+            if booking_id is None:
+                self.wakeup.wait(delay)
+                self.wakeup.clear()
+                continue
+
+            self.expire(booking_id)
+
+    def expire(self, booking_id):
+        with self.app.app_context():
+            try:
+                expire_hold(booking_id)
+            except Exception:
+                db.session.rollback()
+                logger.exception('Expiring seat hold %s failed', booking_id)
+            finally:
+                db.session.remove()
+
+
+class Notifier:
+    """Per-user event queues feeding this worker's event streams"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}  # user id -> set of queues
+
+    @contextmanager
+    def subscribe(self, user_id, events=None):
+        """Register a queue (anything with put()) for the user's events while the block runs"""
+        if events is None:
+            events = queue.SimpleQueue()
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add(events)
+        try:
+            yield events
+        finally:
+            with self.lock:
+                listeners = self.subscribers[user_id]
+                listeners.discard(events)
+                if not listeners:
+                    del self.subscribers[user_id]
+
+    def publish(self, user_id, event, data):
+        with self.lock:
+            listeners = list(self.subscribers.get(user_id, ()))
+        for events in listeners:
+            events.put((event, data))
+
+
+notifier = Notifier()
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def unannounced_holds(holds, user_id, announced):
+    """hold_offered messages for (booking id, ride id, hold_expires_at) rows not yet sent on this stream"""
+    for booking_id, ride_id, expires_at in holds:
+        if booking_id not in announced:
+            announced.add(booking_id)
+            yield format_event('hold_offered', hold_payload(Hold(booking_id, ride_id, user_id, expires_at)))
+
+
+def pushed_event(event, data, announced):
+    """The message for an event published on this worker, or None for a hold already sent"""
+    if event == 'hold_offered':
+        if data['booking_id'] in announced:
+            return None
+        announced.add(data['booking_id'])
+    return format_event(event, data)
+
+
+def event_stream(user_id):
+    """Server-sent events for one passenger, for RIDE_EVENTS_STREAM_SECONDS"""
+    keepalive = current_app.config['RIDE_EVENTS_KEEPALIVE_SECONDS']
+    closes_at = time.monotonic() + current_app.config['RIDE_EVENTS_STREAM_SECONDS']
+    announced = set()
+
+    with notifier.subscribe(user_id) as events:
+        yield 'retry: 3000\n\n'
+        while True:
+            # Holds offered before the stream opened, or by another worker
+            yield from unannounced_holds(outstanding_holds(user_id), user_id, announced)
+            # Don't keep a connection checked out while waiting
+            db.session.remove()
+
+            remaining = closes_at - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event, data = events.get(timeout=min(keepalive, remaining))
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+
+            message = pushed_event(event, data, announced)
+            if message is not None:
+                yield message
+
+
+def init_waitlist(app):
+    """Create the app's hold timer; like the scheduler, it starts on each worker's first request"""
+    timer = HoldTimer(app)
+    app.extensions['hold_timer'] = timer
+
+    if app.config.get('SCHEDULER_ENABLED', True):
+        @app.before_request
+        def start_hold_timer():
+            if timer.thread is None and request.blueprint != 'health':
+                timer.start()
+
+    return timer
@@ -3,7 +3,7 @@
 College Portal Backend - Production Runner
 """
 
-from app import app
+from app import app, prepare_database
 import os
 
 if __name__ == '__main__':
@@ -22,8 +22,17 @@ if __name__ == '__main__':
     print(f"Debug: {debug}")
     print(f"Environment: {os.environ.get('FLASK_ENV', 'production')}")
     
-    app.run(
-        host=host,
-        port=port,
-        debug=debug
-    )
+    # Apply pending migrations before serving rather than on the first request
+    prepare_database()
+    
+    # SERVER_MODE=asgi serves stats/list endpoints on an event loop via uvicorn
+    if os.environ.get('SERVER_MODE', 'wsgi').lower() == 'asgi':
+        import uvicorn
+        print("Mode: ASGI")
+        uvicorn.run('asgi:application', host=host, port=port, reload=debug)
+    else:
+        app.run(
+            host=host,
+            port=port,
+            debug=debug
+        )
@@ -0,0 +1,322 @@
+"""
+Cafeteria sales analytics from an hourly rollup.
+
+order_sales_hourly has one row per UTC day and hour an order was placed, item
+and order status, with the number of orders containing the item, the quantity
+and the revenue. Placing an order adds its items in the same transaction;
+cancelling it or changing its status moves them from the old status row to the
+new one. Both are a single upsert, so concurrent orders in the same hour add up
+instead of conflicting. A status change is a conditional UPDATE on the old
+status, so of two concurrent changes to one order only the first moves its
+items. Archiving orders leaves the rollup alone.
+
+The reports below read only the rollup: a year is at most 24 * 365 rows per
+item and status, however many orders there were. Days and hours are UTC, like
+created_at. Unless a status is asked for, cancelled orders are left out.
+"""
+
+from flask import Blueprint, request, jsonify, session
+from sqlalchemy import func, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from models import DemandForecast, Order, OrderArchive, OrderItem, OrderItemArchive, OrderSalesHourly, User, db
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import groupby
+import forecast
+
+sales_bp = Blueprint('sales', __name__)
+
+KEY = ('day', 'hour', 'item_name', 'status')
+TOTALS = ('orders', 'quantity', 'revenue')
+
+SORT_COLUMNS = ('quantity', 'revenue', 'orders')
+
+REVENUE_INTERVALS = ('hour', 'day', 'month')
+
+def require_auth(f):
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+def sales_rows(placed_at, items, status, sign=1):
+    """Rollup increments for order items placed at ``placed_at`` (sign -1 takes them out)"""
+    totals = {}
+    for item in items:
+        quantity, revenue = totals.get(item.item_name, (0, Decimal('0')))
+        totals[item.item_name] = (quantity + item.quantity, revenue + item.price * item.quantity)
+
+    return [{'day': placed_at.date(), 'hour': placed_at.hour, 'weekday': placed_at.weekday(),
+             'item_name': item_name, 'status': status,
+             'orders': sign, 'quantity': sign * quantity, 'revenue': sign * revenue}
+            for item_name, (quantity, revenue) in totals.items()]
+
+def add_to_rollup(rows):
+    """Add increments to order_sales_hourly in one INSERT ... ON DUPLICATE KEY / ON CONFLICT statement"""
+    if not rows:
+        return
+    table = OrderSalesHourly.__table__
+    dialect = db.engine.dialect.name
+
+    if dialect == 'mysql':
+        stmt = mysql.insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update({name: table.c[name] + stmt.inserted[name] for name in TOTALS})
+    else:
+        stmt = (postgresql if dialect == 'postgresql' else sqlite).insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=list(table.primary_key.columns),
+                                          set_={name: table.c[name] + stmt.excluded[name] for name in TOTALS})
+    db.session.execute(stmt)
+
+def record_order(order, items):
+    """Count a new order's items; call before committing it"""
+    add_to_rollup(sales_rows(order.created_at, items, order.status))
+
+def record_status_change(order, old_status):
+    """Move an order's items from ``old_status`` to its current status; call before committing"""
+    if order.status == old_status:
+        return
+    add_to_rollup(sales_rows(order.created_at, order.items, old_status, -1) +
+                  sales_rows(order.created_at, order.items, order.status))
+
+def change_status(order, new_status):
+    """Set an order's status unless it changed since ``order`` was read, and move its items; call before committing
+
+    Returns False, changing nothing, when another request changed the status first.
+    """
+    old_status = order.status
+    changed = Order.query.filter_by(id=order.id, status=old_status)\
+                   .update({'status': new_status}, synchronize_session='evaluate')
+    if changed:
+        record_status_change(order, old_status)
+    return bool(changed)
+
+def rebuild_rollup(conn):
+    """Recount order_sales_hourly from live and archived orders, after orders were inserted directly"""
+    totals = {}
+    for orders, items in ((Order.__table__, OrderItem.__table__),
+                          (OrderArchive.__table__, OrderItemArchive.__table__)):
+        rows = conn.execution_options(stream_results=True, yield_per=5000).execute(
+            select(items.c.order_id, orders.c.status, orders.c.created_at,
+                   items.c.item_name, items.c.quantity, items.c.price)
+            .join_from(items, orders, items.c.order_id == orders.c.id)
+            .where(orders.c.created_at.isnot(None))
+            .order_by(items.c.order_id)
+        )
+        for _, lines in groupby(rows, key=lambda row: row.order_id):
+            lines = list(lines)
+            for row in sales_rows(lines[0].created_at, lines, lines[0].status or 'Pending'):
+                entry = totals.setdefault(tuple(row[name] for name in KEY), dict(row, orders=0, quantity=0, revenue=0))
+                for name in TOTALS:
+                    entry[name] += row[name]
+
+    table = OrderSalesHourly.__table__
+    conn.execute(table.delete())
+    values = list(totals.values())
+    for start in range(0, len(values), 5000):
+        conn.execute(table.insert(), values[start:start + 5000])
+    return len(values)
+
+def day_range(args, default_days=30):
+    """(first day, last day) from ``from`` / ``to`` dates, both inclusive; the last default_days by default
+
+    Raises ValueError for a malformed or reversed range.
+    """
+    last = date.fromisoformat(args['to']) if args.get('to') else datetime.utcnow().date()
+    first = date.fromisoformat(args['from']) if args.get('from') else last - timedelta(days=default_days - 1)
+    if first > last:
+        raise ValueError('from is after to')
+    return first, last
+
+def sales_query(columns, first, last, status=None, item=None):
+    """Rollup rows between two days with the report filters applied"""
+    query = db.session.query(*columns).filter(OrderSalesHourly.day.between(first, last))
+    if status:
+        query = query.filter(OrderSalesHourly.status == status)
+    else:
+        query = query.filter(OrderSalesHourly.status != 'Cancelled')
+    if item:
+        query = query.filter(OrderSalesHourly.item_name == item)
+    return query
+
+def range_payload(first, last):
+    return {'from': first.isoformat(), 'to': last.isoformat()}
+
+@sales_bp.route('/top-items', methods=['GET'])
+@require_auth
+def get_top_items():
+    try:
+        # Check if user is admin
+        user = User.query.get(session['user_id'])
+        if not user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+
+        try:
+            first, last = day_range(request.args)
+        except ValueError:
+            return jsonify({'error': 'Invalid date range'}), 400
+
+        sort = request.args.get('sort', 'quantity')
+        if sort not in SORT_COLUMNS:
+            return jsonify({'error': f"Invalid sort, expected one of: {', '.join(SORT_COLUMNS)}"}), 400
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+
+        totals = [func.sum(OrderSalesHourly.orders).label('orders'),
+                  func.sum(OrderSalesHourly.quantity).label('quantity'),
+                  func.sum(OrderSalesHourly.revenue).label('revenue')]
+        rows = sales_query([OrderSalesHourly.item_name] + totals, first, last, request.args.get('status'))\
+                   .group_by(OrderSalesHourly.item_name)\
+                   .order_by(func.sum(getattr(OrderSalesHourly, sort)).desc(), OrderSalesHourly.item_name)\
+                   .limit(limit)\
+                   .all()
+
+        return jsonify({
+            'items': [{
+                'item_name': row.item_name,
+                'orders': int(row.orders),
+                'quantity': int(row.quantity),
+                'revenue': float(row.revenue)
+            } for row in rows],
+            **range_payload(first, last)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to retrieve top items'}), 500
+
+@sales_bp.route('/demand', methods=['GET'])
+@require_auth
+def get_demand_curve():
+    try:
+        # Check if user is admin
+        user = User.query.get(session['user_id'])
+        if not user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+
+        try:
+            first, last = day_range(request.args)
+        except ValueError:
+            return jsonify({'error': 'Invalid date range'}), 400
+
+        weekday = request.args.get('weekday', type=int)
+        if weekday is not None and not 0 <= weekday <= 6:
+            return jsonify({'error': 'weekday must be 0 (Monday) to 6 (Sunday)'}), 400
+
+        query = sales_query([OrderSalesHourly.hour, func.sum(OrderSalesHourly.quantity)], first, last,
+                            request.args.get('status'), request.args.get('item'))
+        if weekday is not None:
+            query = query.filter(OrderSalesHourly.weekday == weekday)
+        quantities = dict(query.group_by(OrderSalesHourly.hour).all())
+
+        # Averages are per day in the range (per matching weekday when one is given)
+        days = (last - first).days + 1
+        if weekday is not None:
+            days = sum(1 for offset in range(days) if (first + timedelta(days=offset)).weekday() == weekday)
+
+        return jsonify({
+            'item': request.args.get('item'),
+            'weekday': weekday,
+            'days': days,
+            'hours': [{
+                'hour': hour,
+                'quantity': int(quantities.get(hour, 0)),
+                'average': round(int(quantities.get(hour, 0)) / days, 2) if days else 0
+            } for hour in range(24)],
+            **range_payload(first, last)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to retrieve demand curve'}), 500
+
+@sales_bp.route('/revenue', methods=['GET'])
+@require_auth
+def get_revenue():
+    try:
+        # Check if user is admin
+        user = User.query.get(session['user_id'])
+        if not user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+
+        try:
+            first, last = day_range(request.args)
+        except ValueError:
+            return jsonify({'error': 'Invalid date range'}), 400
+
+        interval = request.args.get('interval', 'day')
+        if interval not in REVENUE_INTERVALS:
+            return jsonify({'error': f"Invalid interval, expected one of: {', '.join(REVENUE_INTERVALS)}"}), 400
+
+        groups = [OrderSalesHourly.day] + ([OrderSalesHourly.hour] if interval == 'hour' else [])
+        rows = sales_query(groups + [func.sum(OrderSalesHourly.quantity), func.sum(OrderSalesHourly.revenue)],
+                           first, last, request.args.get('status'), request.args.get('item'))\
+                   .group_by(*groups)\
+                   .order_by(*groups)\
+                   .all()
+
+        # Months are summed from the day rows; at most a few hundred per year
+        periods = {}
+        for row in rows:
+            if interval == 'hour':
+                period = f'{row[0].isoformat()}T{row[1]:02d}:00'
+            elif interval == 'month':
+                period = row[0].strftime('%Y-%m')
+            else:
+                period = row[0].isoformat()
+            quantity, revenue = periods.get(period, (0, 0))
+            periods[period] = (quantity + int(row[-2]), revenue + row[-1])
+
+        return jsonify({
+            'interval': interval,
+            'item': request.args.get('item'),
+            'revenue': [{
+                'period': period,
+                'quantity': quantity,
+                'revenue': float(revenue)
+            } for period, (quantity, revenue) in periods.items()],
+            'total_quantity': sum(quantity for quantity, _ in periods.values()),
+            'total_revenue': float(sum(revenue for _, revenue in periods.values())),
+            **range_payload(first, last)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to retrieve revenue'}), 500
+
+@sales_bp.route('/forecast', methods=['GET'])
+@require_auth
+def get_forecast():
+    try:
+        # Check if user is admin
+        user = User.query.get(session['user_id'])
+        if not user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+
+        # Without numpy the nightly job never fills demand_forecasts
+        if forecast.np is None:
+            return jsonify({'error': 'Demand forecasts require numpy to be installed'}), 501
+
+        try:
+            day = date.fromisoformat(request.args['day']) if request.args.get('day') else datetime.utcnow().date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date format'}), 400
+
+        query = DemandForecast.query.filter_by(day=day)
+        if request.args.get('item'):
+            query = query.filter_by(item_name=request.args['item'])
+
+        hours, generated_at = {}, None
+        for row in query:
+            hours.setdefault(row.item_name, [0.0] * 24)[row.hour] = float(row.quantity)
+            generated_at = row.generated_at
+
+        return jsonify({
+            'day': day.isoformat(),
+            'generated_at': generated_at.isoformat() if generated_at else None,
+            'items': sorted(({
+                'item_name': item_name,
+                'hours': quantities,
+                'total': round(sum(quantities), 2)
+            } for item_name, quantities in hours.items()), key=lambda item: -item['total'])
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to retrieve forecast'}), 500
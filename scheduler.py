@@ -0,0 +1,171 @@
+"""
+Background jobs run on an interval, or daily at a fixed UTC time.
+
+Each worker process runs one daemon thread, started on the first request it
+serves (so it survives gunicorn's fork) when SCHEDULER_ENABLED is set. Health
+probes don't start it: jobs wait for a request that has migrated the schema. The
+thread sleeps until the next job is due and runs it inside an app context.
+With several workers every one of them schedules the same jobs; on MySQL a
+job runs under a named lock (GET_LOCK) and workers that don't get it skip that
+round, so each run happens once. Jobs must be safe to run again after a crash.
+
+    python -m scheduler list
+    python -m scheduler run complete_departed_rides
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import request
+from sqlalchemy import text
+from models import db
+import heapq
+import logging
+import sys
+import threading
+import time
+import metrics
+
+logger = logging.getLogger('college_portal.scheduler')
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class Job:
+    def __init__(self, name, func, interval=None, at=None):
+        if (interval is None) == (at is None):
+            raise ValueError('A job needs either interval (seconds) or at ("HH:MM" UTC)')
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.at = at
+        self.last_run = None
+        self.last_result = None
+        self.last_error = None
+
+    def next_run(self, now):
+        """Wall-clock time of the next run after ``now``"""
+        if self.interval is not None:
+            return now + self.interval
+        hour, minute = (int(part) for part in self.at.split(':'))
+        due = datetime.utcfromtimestamp(now).replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if (due - EPOCH).total_seconds() <= now:
+            due += timedelta(days=1)
+        return (due - EPOCH).total_seconds()
+
+
+class Scheduler:
+    def __init__(self, app):
+        self.app = app
+        self.jobs = {}
+        self.queue = []  # heap of (due time, job name)
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def add(self, name, func, interval=None, at=None):
+        job = Job(name, func, interval, at)
+        with self.lock:
+            self.jobs[name] = job
+            heapq.heappush(self.queue, (job.next_run(time.time()), name))
+        self.wakeup.set()
+        return job
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self.loop, name='scheduler', daemon=True)
+        self.thread.start()
+
+    def loop(self):
+        while True:
+            with self.lock:
+                due, name = self.queue[0] if self.queue else (None, None)
+            delay = None if due is None else due - time.time()
+            if delay is None or delay > 0:
+                self.wakeup.wait(delay)
+                self.wakeup.clear()
+                continue
+
+            with self.lock:
+                heapq.heappop(self.queue)
+                job = self.jobs[name]
+                heapq.heappush(self.queue, (job.next_run(time.time()), name))
+            self.run(name)
+
+    def run(self, name):
+        """Run one job now in an app context; returns its result (None if another worker has it)"""
+        job = self.jobs[name]
+        started = time.perf_counter()
+        with self.app.app_context():
+            try:
+                with job_lock(name) as acquired:
+                    if not acquired:
+                        metrics.inc('scheduler_runs_total', (('job', name), ('outcome', 'skipped')))
+                        return None
+                    job.last_result = job.func()
+                job.last_error = None
+                outcome = 'ok'
+            except Exception as e:
+                logger.exception('Scheduled job %s failed', name)
+                job.last_error = str(e)
+                outcome = 'error'
+            finally:
+                db.session.remove()
+
+        job.last_run = datetime.utcnow()
+        metrics.inc('scheduler_runs_total', (('job', name), ('outcome', outcome)))
+        metrics.observe('scheduler_job_seconds', (('job', name),), time.perf_counter() - started)
+        return job.last_result
+
+
+@contextmanager
+def job_lock(name):
+    """Yield whether this worker holds the job's MySQL named lock; other dialects run a single process"""
+    if db.engine.dialect.name != 'mysql':
+        yield True
+        return
+    lock_name = f'college_portal_job_{name}'
+    with db.engine.connect() as conn:
+        acquired = bool(conn.execute(text('SELECT GET_LOCK(:name, 0)'), {'name': lock_name}).scalar())
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': lock_name})
+
+
+def init_scheduler(app):
+    """Create the app's scheduler; its thread starts on the first request of each worker"""
+    scheduler = Scheduler(app)
+    app.extensions['scheduler'] = scheduler
+
+    if app.config.get('SCHEDULER_ENABLED', True):
+        @app.before_request
+        def start_scheduler():
+            if scheduler.thread is None and request.blueprint != 'health':
+                scheduler.start()
+
+    return scheduler
+
+
+def main():
+    from app import app
+    scheduler = app.extensions['scheduler']
+
+    if len(sys.argv) == 3 and sys.argv[1] == 'run' and sys.argv[2] in scheduler.jobs:
+        logging.basicConfig(level=logging.INFO)
+        print(scheduler.run(sys.argv[2]))
+        return 0 if scheduler.jobs[sys.argv[2]].last_error is None else 1
+
+    if sys.argv[1:] == ['list']:
+        for job in scheduler.jobs.values():
+            print(f"{job.name:<32}{f'every {job.interval:g}s' if job.interval else f'daily at {job.at} UTC'}")
+        return 0
+
+    print('usage: python -m scheduler list | run <job>', file=sys.stderr)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
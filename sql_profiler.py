@@ -0,0 +1,131 @@
+"""
+Per-request SQL profiling and slow-query log.
+
+Every request counts its statements and total database time. Statements slower
+than SQL_SLOW_QUERY_MS are always written to the ``college_portal.sql`` logger
+as one JSON object per line. A sample of requests (SQL_PROFILE_SAMPLE_RATE)
+additionally keeps the durations of its SQL_PROFILE_TOP_N slowest statements
+and reports them in a ``Server-Timing`` response header. The header carries
+only counts and durations: statement text goes to the slow-query log, never to
+the client.
+"""
+
+import heapq
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_query_logger = logging.getLogger('college_portal.sql')
+
+# Profile of the native async handler being served (asgi.py), which has no Flask request
+async_profile = ContextVar('async_profile', default=None)
+
+
+class SqlProfile:
+    """SQL statistics collected while serving one request"""
+
+    def __init__(self, top_n=0, slow_query_ms=float('inf'), context=None):
+        self.count = 0
+        self.total_time = 0.0
+        self.top_n = top_n
+        self.slow_query_ms = slow_query_ms
+        # method, path and endpoint for the slow-query log
+        self.context = context or {}
+        self._slowest = []
+
+    def record(self, duration):
+        self.count += 1
+        self.total_time += duration
+        if self.top_n:
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, duration)
+            elif duration > self._slowest[0]:
+                heapq.heapreplace(self._slowest, duration)
+
+    @property
+    def slowest(self):
+        return sorted(self._slowest, reverse=True)
+
+    def server_timing(self):
+        entries = [f'db;dur={self.total_time * 1000:.2f};desc="{self.count} queries"']
+        for i, duration in enumerate(self.slowest, 1):
+            entries.append(f'sql-{i};dur={duration * 1000:.2f}')
+        return ', '.join(entries)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get('query_start_time')
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+
+    profile = g.get('sql_profile') if has_request_context() else async_profile.get()
+    if profile is None:
+        return
+    profile.record(duration)
+
+    if duration * 1000 >= profile.slow_query_ms:
+        slow_query_logger.warning(json.dumps({
+            'event': 'slow_query',
+            'duration_ms': round(duration * 1000, 2),
+            **profile.context,
+            'statement': ' '.join(statement.split())[:2000],
+            'executemany': executemany
+        }))
+
+
+def new_profile(config, method, path, endpoint):
+    """(profile, sampled) for one request; sampled requests keep their slowest statements"""
+    sampled = random.random() < config['SQL_PROFILE_SAMPLE_RATE']
+    context = {'method': method, 'path': path, 'endpoint': endpoint}
+    return SqlProfile(config['SQL_PROFILE_TOP_N'] if sampled else 0, config['SQL_SLOW_QUERY_MS'], context), sampled
+
+
+def handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    conn = exception_context.connection
+    start_times = conn.info.get('query_start_time') if conn is not None else None
+    if start_times:
+        start_times.pop()
+
+
+def start_profile():
+    g.sql_profile, g.sql_profile_sampled = new_profile(current_app.config, request.method, request.path,
+                                                       request.endpoint)
+
+
+def add_server_timing(response):
+    profile = g.get('sql_profile')
+    if profile is not None and g.get('sql_profile_sampled'):
+        response.headers.add('Server-Timing', profile.server_timing())
+    return response
+
+
+def init_sql_profiler(app):
+    """Install the SQLAlchemy event hooks and per-request profiling on the app"""
+    if not app.config.get('SQL_PROFILING_ENABLED', True):
+        return
+
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(Engine, 'handle_error', handle_error)
+
+    log_file = app.config.get('SQL_SLOW_QUERY_LOG')
+    if log_file:
+        handler = logging.FileHandler(log_file)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        slow_query_logger.addHandler(handler)
+    slow_query_logger.setLevel(logging.WARNING)
+
+    app.before_request(start_profile)
+    app.after_request(add_server_timing)
@@ -0,0 +1,63 @@
+"""
+Serve the built frontend (see build_assets.py) with precompressed siblings.
+
+Fingerprinted files (``styles.3fa9c1d2e0.css``) never change, so they are sent
+with a one-year immutable cache lifetime; HTML pages are revalidated on every
+load so a new build is picked up immediately. When the browser accepts it, the
+``.br`` or ``.gz`` file written at build time is sent instead of compressing
+on the fly.
+"""
+
+from flask import current_app, jsonify, request, send_file
+from werkzeug.security import safe_join
+import mimetypes
+import os
+import re
+
+MANIFEST = 'asset-manifest.json'
+FINGERPRINTED = re.compile(r'\.[0-9a-f]{10}\.\w+$')
+
+# Preferred first; each is only used if the sibling file exists
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def fingerprint_name(filename, digest):
+    root, extension = os.path.splitext(filename)
+    return f'{root}.{digest[:10]}{extension}'
+
+
+def serve_asset(filename='index.html'):
+    folder = os.path.abspath(current_app.config['STATIC_DIST_FOLDER'])
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({'error': 'Endpoint not found'}), 404
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if request.accept_encodings[name] and os.path.isfile(path + suffix):
+            path, encoding = path + suffix, name
+            break
+
+    immutable = FINGERPRINTED.search(filename) is not None
+    response = send_file(path, mimetype=mimetype, conditional=True,
+                         max_age=IMMUTABLE_MAX_AGE if immutable else 0)
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_static_assets(app):
+    """Serve STATIC_DIST_FOLDER at / when it is configured and has been built"""
+    folder = app.config.get('STATIC_DIST_FOLDER')
+    if not folder or not os.path.isfile(os.path.join(folder, MANIFEST)):
+        return
+    app.add_url_rule('/', 'static_assets', serve_asset)
+    app.add_url_rule('/<path:filename>', 'static_assets', serve_asset)
@@ -0,0 +1,31 @@
+"""
+SQL statements per request against migrations/query_budgets.json.
+
+Replays migrations/querycheck.py's sample request for every route against a
+seeded SQLite database. The check imports the app against that database, so
+run this module in its own pytest process:
+
+    python -m pytest tests/test_query_budgets.py
+"""
+
+import pytest
+
+from migrations import querycheck
+
+
+@pytest.fixture(scope='module')
+def replayed():
+    app = querycheck.prepare()
+    measured, failures = querycheck.replay(app)
+    return app, measured, failures
+
+
+def test_requests_succeed_without_n_plus_one(replayed):
+    _, _, failures = replayed
+    assert not failures, '\n'.join(failures)
+
+
+def test_routes_within_budget(replayed):
+    app, measured, _ = replayed
+    failures = querycheck.check_budgets(app, measured, querycheck.load_budgets())
+    assert not failures, '\n'.join(failures)
@@ -0,0 +1,21 @@
+"""
+Query plans of the list, stats and dashboard endpoints (migrations/plancheck.py).
+
+plancheck imports the app against its own seeded SQLite database, and the app
+reads its configuration once per process, so the check runs in a child process
+rather than next to the query budget test.
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_filtered_and_sorted_queries_use_indexes():
+    result = subprocess.run(
+        [sys.executable, '-c', 'import sys; from migrations import plancheck; sys.exit(plancheck.main(["--rows", "500"]))'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
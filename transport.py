@@ -1,7 +1,13 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, current_app, request, jsonify, session, stream_with_context
 from models import Ride, RideBooking, User, db
+from sqlalchemy.exc import IntegrityError
+from fieldsets import column_fields, parse_fields, project
+from conditional import check_row, is_current, list_version, not_modified, paginate, row_response, with_validators
+from ride_index import current_index, ride_index
+from ride_waitlist import announce, event_stream, release_seat
 from datetime import datetime
 from decimal import Decimal
+import metrics
 
 transport_bp = Blueprint('transport', __name__)
 
@@ -59,6 +65,7 @@ def offer_ride():
         
         db.session.add(ride)
         db.session.commit()
+        ride_index.update(ride)
         
         return jsonify({
             'message': 'Ride offered successfully',
@@ -78,7 +85,12 @@ def get_rides():
         to_location = request.args.get('to')
         date = request.args.get('date')
         
-        query = Ride.query.filter_by(status='Active')\
+        try:
+            fields = parse_fields(Ride, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = project(Ride.query, Ride, fields).filter_by(status='Active')\
                          .filter(Ride.available_seats > 0)\
                          .filter(Ride.departure_time > datetime.utcnow())
         
@@ -95,11 +107,14 @@ def get_rides():
             except ValueError:
                 return jsonify({'error': 'Invalid date format'}), 400
         
-        rides = query.order_by(Ride.departure_time)\
-                    .paginate(page=page, per_page=per_page, error_out=False)
+        total, etag = list_version(query, Ride)
+        if is_current(etag):
+            return not_modified(etag)
         
-        return jsonify({
-            'rides': [ride.to_dict() for ride in rides.items],
+        rides = paginate(query.order_by(Ride.departure_time), page, per_page, total)
+        
+        return with_validators(jsonify({
+            'rides': [ride.to_dict(fields) for ride in rides.items],
             'pagination': {
                 'page': rides.page,
                 'pages': rides.pages,
@@ -108,11 +123,55 @@ def get_rides():
                 'has_next': rides.has_next,
                 'has_prev': rides.has_prev
             }
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve rides'}), 500
 
+@transport_bp.route('/rides/match', methods=['GET'])
+def match_rides():
+    """Rides between two areas leaving within ±window minutes of a time, closest first"""
+    try:
+        from_location = request.args.get('from', '').strip()
+        to_location = request.args.get('to', '').strip()
+        window = request.args.get('window', 30, type=int)
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        
+        if not from_location or not to_location or not request.args.get('time'):
+            return jsonify({'error': 'from, to and time are required'}), 400
+        
+        try:
+            when = datetime.fromisoformat(request.args['time'].replace('Z', '+00:00')).replace(tzinfo=None)
+        except ValueError:
+            return jsonify({'error': 'Invalid time format'}), 400
+        
+        if window < 0 or window > 180:
+            return jsonify({'error': 'Window must be between 0 and 180 minutes'}), 400
+        
+        try:
+            fields = parse_fields(Ride, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        matches = current_index().match(from_location, to_location, when, window, limit)
+        
+        # The index may lag other workers; the rows are the source of truth
+        rides = {}
+        if matches:
+            query = project(Ride.query, Ride, fields).filter(Ride.id.in_([ride_id for ride_id, _ in matches]))\
+                                                     .filter_by(status='Active')\
+                                                     .filter(Ride.available_seats > 0)
+            rides = {ride.id: ride for ride in query}
+        
+        return jsonify({
+            'rides': [dict(rides[ride_id].to_dict(fields), minutes_from_requested=minutes)
+                      for ride_id, minutes in matches if ride_id in rides],
+            'window_minutes': window
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to match rides'}), 500
+
 @transport_bp.route('/rides/my', methods=['GET'])
 @require_auth
 def get_my_rides():
@@ -121,12 +180,21 @@ def get_my_rides():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
-        rides = Ride.query.filter_by(driver_id=user_id)\
-                         .order_by(Ride.departure_time.desc())\
-                         .paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            fields = parse_fields(Ride, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = project(Ride.query, Ride, fields).filter_by(driver_id=user_id)
         
-        return jsonify({
-            'rides': [ride.to_dict() for ride in rides.items],
+        total, etag = list_version(query, Ride)
+        if is_current(etag):
+            return not_modified(etag)
+        
+        rides = paginate(query.order_by(Ride.departure_time.desc()), page, per_page, total)
+        
+        return with_validators(jsonify({
+            'rides': [ride.to_dict(fields) for ride in rides.items],
             'pagination': {
                 'page': rides.page,
                 'pages': rides.pages,
@@ -135,7 +203,7 @@ def get_my_rides():
                 'has_next': rides.has_next,
                 'has_prev': rides.has_prev
             }
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve rides'}), 500
@@ -143,12 +211,16 @@ def get_my_rides():
 @transport_bp.route('/rides/<int:ride_id>', methods=['GET'])
 def get_ride(ride_id):
     try:
+        cached = check_row(Ride, ride_id)
+        if cached is not None:
+            return cached
+        
         ride = Ride.query.get(ride_id)
         
         if not ride:
             return jsonify({'error': 'Ride not found'}), 404
         
-        return jsonify({'ride': ride.to_dict()}), 200
+        return row_response({'ride': ride.to_dict()}, ride), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve ride'}), 500
@@ -159,7 +231,8 @@ def book_ride(ride_id):
     try:
         user_id = session['user_id']
         
-        ride = Ride.query.get(ride_id)
+        # Locked, so the open booking check below can't race another booking for this ride
+        ride = Ride.query.filter_by(id=ride_id).with_for_update().first()
         if not ride:
             return jsonify({'error': 'Ride not found'}), 404
         
@@ -178,12 +251,10 @@ def book_ride(ride_id):
         if ride.departure_time <= datetime.utcnow():
             return jsonify({'error': 'Ride has already departed'}), 400
         
-        # Check if user has already booked this ride
-        existing_booking = RideBooking.query.filter_by(
-            ride_id=ride_id, 
-            passenger_id=user_id,
-            status='Confirmed'
-        ).first()
+        # Check if user has already booked this ride (or holds or waits for a seat on it)
+        existing_booking = RideBooking.query.filter_by(ride_id=ride_id, passenger_id=user_id)\
+                                            .filter(RideBooking.status.in_(RideBooking.OPEN_STATUSES))\
+                                            .first()
         
         if existing_booking:
             return jsonify({'error': 'You have already booked this ride'}), 400
@@ -197,9 +268,11 @@ def book_ride(ride_id):
         
         # Update available seats
         ride.available_seats -= 1
+        available_seats = ride.available_seats
         
         db.session.add(booking)
         db.session.commit()
+        ride_index.set_seats(ride_id, available_seats)
         
         return jsonify({
             'message': 'Ride booked successfully',
@@ -207,10 +280,72 @@ def book_ride(ride_id):
             'ride': ride.to_dict()
         }), 201
         
+    except IntegrityError:
+        # uq_ride_bookings_open: a concurrent request booked it first
+        db.session.rollback()
+        return jsonify({'error': 'You have already booked this ride'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to book ride'}), 500
 
+@transport_bp.route('/rides/<int:ride_id>/waitlist', methods=['POST'])
+@require_auth
+def join_waitlist(ride_id):
+    """Queue for a seat on a full ride; the next seat given up is held for the first in line"""
+    try:
+        user_id = session['user_id']
+        
+        # Locked, like in book_ride
+        ride = Ride.query.filter_by(id=ride_id).with_for_update().first()
+        if not ride:
+            return jsonify({'error': 'Ride not found'}), 404
+        
+        if ride.driver_id == user_id:
+            return jsonify({'error': 'Cannot book your own ride'}), 400
+        
+        if ride.status != 'Active':
+            return jsonify({'error': 'Ride is not available'}), 400
+        
+        if ride.departure_time <= datetime.utcnow():
+            return jsonify({'error': 'Ride has already departed'}), 400
+        
+        if ride.available_seats > 0:
+            return jsonify({'error': 'Ride has available seats, book it instead'}), 400
+        
+        existing_booking = RideBooking.query.filter_by(ride_id=ride_id, passenger_id=user_id)\
+                                            .filter(RideBooking.status.in_(RideBooking.OPEN_STATUSES))\
+                                            .first()
+        if existing_booking:
+            return jsonify({'error': 'You have already booked this ride'}), 400
+        
+        booking = RideBooking(
+            ride_id=ride_id,
+            passenger_id=user_id,
+            status='Waitlisted'
+        )
+        
+        db.session.add(booking)
+        ride.touch()
+        db.session.commit()
+        
+        # Seats are offered in booking id order
+        position = RideBooking.query.filter_by(ride_id=ride_id, status='Waitlisted')\
+                                    .filter(RideBooking.id <= booking.id)\
+                                    .count()
+        
+        return jsonify({
+            'message': 'Added to the waitlist',
+            'booking': booking.to_dict(),
+            'position': position
+        }), 201
+        
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'You have already booked this ride'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to join waitlist'}), 500
+
 @transport_bp.route('/bookings/my', methods=['GET'])
 @require_auth
 def get_my_bookings():
@@ -219,17 +354,28 @@ def get_my_bookings():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
-        bookings = RideBooking.query.filter_by(passenger_id=user_id)\
-                                  .order_by(RideBooking.booked_at.desc())\
-                                  .paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            fields = parse_fields(RideBooking, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = project(RideBooking.query, RideBooking, fields).filter_by(passenger_id=user_id)
+        
+        # Each booking nests its ride, so ride edits change the list too
+        total, etag = list_version(query.join(RideBooking.ride), RideBooking, Ride)
+        if is_current(etag):
+            return not_modified(etag)
+        
+        bookings = paginate(query.order_by(RideBooking.booked_at.desc()), page, per_page, total)
         
         booking_data = []
         for booking in bookings.items:
-            booking_dict = booking.to_dict()
-            booking_dict['ride'] = booking.ride.to_dict()
+            booking_dict = booking.to_dict(fields)
+            if fields is None or 'ride' in fields:
+                booking_dict['ride'] = booking.ride.to_dict()
             booking_data.append(booking_dict)
         
-        return jsonify({
+        return with_validators(jsonify({
             'bookings': booking_data,
             'pagination': {
                 'page': bookings.page,
@@ -239,7 +385,7 @@ def get_my_bookings():
                 'has_next': bookings.has_next,
                 'has_prev': bookings.has_prev
             }
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve bookings'}), 500
@@ -254,18 +400,32 @@ def cancel_booking(booking_id):
         if not booking:
             return jsonify({'error': 'Booking not found'}), 404
         
-        if booking.status != 'Confirmed':
+        if booking.status not in RideBooking.OPEN_STATUSES:
             return jsonify({'error': 'Booking cannot be cancelled'}), 400
         
         # Check if ride hasn't departed yet
         if booking.ride.departure_time <= datetime.utcnow():
             return jsonify({'error': 'Cannot cancel booking for departed ride'}), 400
         
-        # Cancel booking and restore seat
-        booking.status = 'Cancelled'
-        booking.ride.available_seats += 1
+        # Conditional on the status just read, so a hold that expires meanwhile
+        # isn't released twice
+        cancelled = RideBooking.query.filter_by(id=booking_id, status=booking.status)\
+                                     .update({'status': 'Cancelled', 'hold_expires_at': None},
+                                             synchronize_session=False)
+        if not cancelled:
+            db.session.rollback()
+            return jsonify({'error': 'Booking cannot be cancelled'}), 400
+        
+        # A confirmed or held seat goes to the waitlist, or back to the ride
+        booking.ride.touch()
+        hold = None
+        if booking.status != 'Waitlisted':
+            hold = release_seat(booking.ride)
+        ride_id, available_seats = booking.ride_id, booking.ride.available_seats
         
         db.session.commit()
+        ride_index.set_seats(ride_id, available_seats)
+        announce(hold)
         
         return jsonify({
             'message': 'Booking cancelled successfully',
@@ -276,6 +436,43 @@ def cancel_booking(booking_id):
         db.session.rollback()
         return jsonify({'error': 'Failed to cancel booking'}), 500
 
+@transport_bp.route('/bookings/<int:booking_id>/confirm', methods=['PUT'])
+@require_auth
+def confirm_hold(booking_id):
+    """Take the seat held for a waitlisted passenger before the hold expires"""
+    try:
+        user_id = session['user_id']
+        
+        booking = RideBooking.query.filter_by(id=booking_id, passenger_id=user_id).first()
+        if not booking:
+            return jsonify({'error': 'Booking not found'}), 404
+        
+        confirmed = RideBooking.query.filter(RideBooking.id == booking_id,
+                                             RideBooking.status == 'Held',
+                                             RideBooking.hold_expires_at > datetime.utcnow())\
+                                     .update({'status': 'Confirmed', 'hold_expires_at': None},
+                                             synchronize_session=False)
+        if confirmed:
+            booking.ride.touch()
+        # Reloads booking, with the status the update left
+        db.session.commit()
+        
+        if not confirmed:
+            if booking.status in ('Held', 'Expired'):
+                return jsonify({'error': 'Seat hold has expired'}), 400
+            return jsonify({'error': 'Booking has no seat hold'}), 400
+        
+        metrics.inc('ride_holds_total', (('outcome', 'confirmed'),))
+        
+        return jsonify({
+            'message': 'Booking confirmed successfully',
+            'booking': booking.to_dict()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to confirm booking'}), 500
+
 @transport_bp.route('/rides/<int:ride_id>/cancel', methods=['PUT'])
 @require_auth
 def cancel_ride(ride_id):
@@ -296,21 +493,40 @@ def cancel_ride(ride_id):
         # Cancel ride and all associated bookings
         ride.status = 'Cancelled'
         
-        # Cancel all confirmed bookings for this ride
-        RideBooking.query.filter_by(ride_id=ride_id, status='Confirmed')\
-                        .update({'status': 'Cancelled'})
+        # Cancel all open bookings for this ride (seats, holds, waitlist) in one statement
+        cancelled_bookings = RideBooking.query.filter_by(ride_id=ride_id)\
+                                              .filter(RideBooking.status.in_(RideBooking.OPEN_STATUSES))\
+                                              .update({'status': 'Cancelled', 'hold_expires_at': None},
+                                                      synchronize_session=False)
         
+        # Snapshot the ride's own columns before commit expires them, instead of
+        # reloading the ride with its bookings and every passenger afterwards
+        db.session.flush()
+        snapshot = ride.to_dict(column_fields(Ride))
         db.session.commit()
+        ride_index.remove(ride_id)
         
         return jsonify({
             'message': 'Ride cancelled successfully',
-            'ride': ride.to_dict()
+            'ride': snapshot,
+            'cancelled_bookings': cancelled_bookings
         }), 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to cancel ride'}), 500
 
+@transport_bp.route('/events', methods=['GET'])
+@require_auth
+def ride_events():
+    """Server-sent events: seat holds offered to and expired for the current user"""
+    # Each stream holds a worker thread for minutes; asgi.py serves it on the event loop instead
+    if not current_app.config['RIDE_EVENTS_WSGI']:
+        return jsonify({'error': 'Ride events are served by the ASGI server (uvicorn asgi:application)'}), 501
+    return Response(stream_with_context(event_stream(session['user_id'])),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @transport_bp.route('/stats', methods=['GET'])
 def get_transport_stats():
     try:
@@ -318,7 +534,7 @@ def get_transport_stats():
         active_rides = Ride.query.filter_by(status='Active')\
                                 .filter(Ride.departure_time > datetime.utcnow())\
                                 .count()
-        total_bookings = RideBooking.query.filter_by(status='Confirmed').count()
+        total_bookings = RideBooking.query.filter(RideBooking.status.in_(RideBooking.BOOKED_STATUSES)).count()
         
         return jsonify({
             'total_rides': total_rides,
@@ -0,0 +1,297 @@
+"""
+Photo uploads: streamed to disk, stored by content hash, resized in the background.
+
+An upload is written to a temporary file in fixed-size chunks while its SHA-256
+is computed, then moved to ``originals/<hh>/<sha256>.<ext>``. Uploading the same
+bytes again reuses the stored file. Resized, re-encoded JPEG and WebP variants
+are generated by a thread pool (Pillow releases the GIL while resizing and
+encoding) and served in place of the original once they exist.
+"""
+
+from flask import Blueprint, current_app, request, jsonify, session, send_file
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+uploads_bp = Blueprint('uploads', __name__)
+logger = logging.getLogger('college_portal.uploads')
+
+CHUNK_SIZE = 64 * 1024
+
+# Longest side in pixels; 'large' replaces the original for normal viewing
+VARIANTS = {
+    'thumb': 320,
+    'medium': 800,
+    'large': 1600,
+}
+DEFAULT_VARIANT = 'large'
+
+# Leading bytes of each accepted image type -> stored extension
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+]
+MIMETYPES = {'jpg': 'image/jpeg', 'png': 'image/png', 'gif': 'image/gif', 'webp': 'image/webp'}
+
+UPLOAD_KEY = re.compile(r'^([0-9a-f]{64})\.(jpg|png|gif|webp)$')
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_oversized = set()  # over UPLOAD_MAX_PIXELS; not retried by this process
+_pending_lock = threading.Lock()
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def require_auth(f):
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+
+def sniff_extension(head):
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def is_upload_key(key):
+    return bool(key) and UPLOAD_KEY.match(key) is not None
+
+
+def original_path(folder, key):
+    return os.path.join(folder, 'originals', key[:2], key)
+
+
+def variant_path(folder, key, variant, extension):
+    digest = UPLOAD_KEY.match(key).group(1)
+    return os.path.join(folder, 'variants', digest[:2], f'{digest}_{variant}.{extension}')
+
+
+def upload_folder():
+    # Absolute, so os.path checks and send_file agree whatever the working directory
+    return os.path.abspath(current_app.config['UPLOAD_FOLDER'])
+
+
+def upload_exists(key):
+    return is_upload_key(key) and os.path.exists(original_path(upload_folder(), key))
+
+
+def upload_url(key, variant=None):
+    """URL the frontend should use for a stored photo"""
+    if not key:
+        return None
+    return f'/api/uploads/{key}' + (f'?variant={variant}' if variant else '')
+
+
+def save_stream(stream, folder, max_bytes):
+    """Copy a request body to disk in chunks, hashing as it goes; returns (key, path, created)"""
+    tmp_dir = os.path.join(folder, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                if len(head) < 16:
+                    head += chunk[:16 - len(head)]
+                digest.update(chunk)
+                f.write(chunk)
+
+        extension = sniff_extension(head)
+        if extension is None or extension not in current_app.config['ALLOWED_EXTENSIONS']:
+            os.remove(tmp_path)
+            return None, None, False
+
+        key = f'{digest.hexdigest()}.{extension}'
+        path = original_path(folder, key)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return key, path, False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return key, path, True
+
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _save_atomic(image, path, format, **options):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # A unique temp file, so workers generating the same variant never write into each other's
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, format, **options)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def generate_variants(folder, key, max_pixels):
+    """Write every size as a progressive JPEG and a WebP; EXIF metadata is dropped"""
+    try:
+        with Image.open(original_path(folder, key)) as source:
+            # Only the header has been read; a small, highly compressed file can decode to gigabytes
+            width, height = source.size
+            if width * height > max_pixels:
+                with _pending_lock:
+                    _oversized.add(key)
+                metrics.inc('upload_variants_total', (('result', 'too_large'),))
+                logger.warning('Not generating variants for %s: %dx%d is over %d pixels', key, width, height,
+                               max_pixels)
+                return
+
+            sizes = sorted(VARIANTS.items(), key=lambda item: -item[1])
+            # JPEGs can be decoded at a fraction of their size when that still covers the largest variant
+            source.draft('RGB', (sizes[0][1], sizes[0][1]))
+            # Apply the camera orientation before the EXIF data is discarded; this is the one working
+            # copy, shrunk in place from the largest size to the smallest
+            image = ImageOps.exif_transpose(source)
+            for variant, longest_side in sizes:
+                image.thumbnail((longest_side, longest_side), Image.LANCZOS)
+                _save_atomic(image, variant_path(folder, key, variant, 'webp'), 'WEBP', quality=80, method=4)
+                _save_atomic(image if image.mode in ('RGB', 'L') else image.convert('RGB'),
+                             variant_path(folder, key, variant, 'jpg'), 'JPEG',
+                             quality=82, optimize=True, progressive=True)
+        metrics.inc('upload_variants_total', (('result', 'ok'),))
+    except Exception:
+        metrics.inc('upload_variants_total', (('result', 'error'),))
+        logger.exception('Failed to generate variants for %s', key)
+    finally:
+        with _pending_lock:
+            _pending.discard(key)
+
+
+def get_executor(workers):
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upload-variants')
+    return _executor
+
+
+def schedule_variants(key):
+    """Queue variant generation unless it is done, in progress, or Pillow is missing"""
+    if Image is None:
+        return False
+    folder = upload_folder()
+    # Sizes are written from the largest down, so the smallest JPEG means the set is complete
+    if os.path.exists(variant_path(folder, key, min(VARIANTS, key=VARIANTS.get), 'jpg')):
+        return False
+
+    with _pending_lock:
+        if key in _pending or key in _oversized:
+            return False
+        _pending.add(key)
+    get_executor(current_app.config['UPLOAD_WORKERS']).submit(generate_variants, folder, key,
+                                                              current_app.config['UPLOAD_MAX_PIXELS'])
+    return True
+
+
+@uploads_bp.route('/', methods=['POST'])
+@require_auth
+def upload_photo():
+    """Accept a photo as a raw image body or a multipart ``file`` field"""
+    try:
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        folder = upload_folder()
+
+        try:
+            key, path, created = save_stream(stream, folder, current_app.config['MAX_CONTENT_LENGTH'])
+        except UploadTooLarge:
+            return jsonify({'error': 'File too large'}), 413
+
+        if key is None:
+            allowed = ', '.join(sorted(current_app.config['ALLOWED_EXTENSIONS']))
+            return jsonify({'error': f'Unsupported file type. Allowed: {allowed}'}), 400
+
+        metrics.record_cache('upload_dedup', not created)
+        schedule_variants(key)
+
+        return jsonify({
+            'message': 'Photo uploaded successfully',
+            'photo': key,
+            'url': upload_url(key),
+            'thumbnail_url': upload_url(key, 'thumb'),
+            'duplicate': not created
+        }), 201 if created else 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to upload photo'}), 500
+
+
+@uploads_bp.route('/<key>', methods=['GET'])
+def get_photo(key):
+    """Serve a variant (WebP when the browser accepts it), or the original until it is ready"""
+    if not is_upload_key(key):
+        return jsonify({'error': 'Photo not found'}), 404
+
+    folder = upload_folder()
+    original = original_path(folder, key)
+    if not os.path.exists(original):
+        return jsonify({'error': 'Photo not found'}), 404
+
+    variant = request.args.get('variant', DEFAULT_VARIANT)
+    if variant != 'original' and variant not in VARIANTS:
+        return jsonify({'error': f'Unknown variant. Available: original, {", ".join(VARIANTS)}'}), 400
+
+    if variant != 'original':
+        extensions = ['webp', 'jpg'] if request.accept_mimetypes['image/webp'] else ['jpg']
+        for extension in extensions:
+            path = variant_path(folder, key, variant, extension)
+            if os.path.exists(path):
+                response = send_file(path, mimetype=MIMETYPES[extension], conditional=True,
+                                     max_age=current_app.config['UPLOAD_CACHE_SECONDS'])
+                response.cache_control.immutable = True
+                response.vary.add('Accept')
+                return response
+
+        # Not generated yet (or lost on restart): queue it and serve the original briefly
+        schedule_variants(key)
+        response = send_file(original, mimetype=MIMETYPES[key.rsplit('.', 1)[1]], conditional=True, max_age=60)
+        response.vary.add('Accept')
+        return response
+
+    response = send_file(original, mimetype=MIMETYPES[key.rsplit('.', 1)[1]], conditional=True,
+                         max_age=current_app.config['UPLOAD_CACHE_SECONDS'])
+    response.cache_control.immutable = True
+    return response